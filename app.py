@@ -3,32 +3,105 @@ PACPL Screener - Flask REST API
 Provides endpoints for scanning stocks and managing configuration
 """
 
+import logging
 from flask import Flask, jsonify, request, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
 import config
-from screener_logic import scan_all_stocks, scan_stocks_generator
+import screener_logic
+from screener_logic import format_sse
+from sse_codec import CompactStream
+from scan_coordinator import ScanCoordinator
+from scan_scheduler import ScanScheduler
+from live_feed import LiveScanner, start_feed
+from universes import get_universe, merge_universes, sector_views, universe_names
 import license_manager
+import metrics
+
+logging.basicConfig(
+    level=getattr(logging, config.LOG_LEVEL, logging.INFO),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+log = logging.getLogger(__name__)
 
 license_manager.init_licenses()
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
-# Global stock list (can be updated via API)
+# Global stock list (can be updated via API), the "default" universe
 current_stocks = config.DEFAULT_STOCKS.copy()
 
 
+def scan_universes():
+    """
+    Universes pre-scanned together on each bar close: the stock list,
+    SCAN_UNIVERSES and (SECTOR_VIEWS) a view per sector of their stocks
+    """
+    universes = {'default': current_stocks}
+    for name in config.SCAN_UNIVERSES:
+        universes[name] = get_universe(name)
+    if config.SECTOR_VIEWS:
+        for name, symbols in sector_views(merge_universes(universes)).items():
+            universes.setdefault(name, symbols)
+    return universes
+
+
+def universe_stocks(name=None):
+    """
+    Stock list of a universe (default: current_stocks), as the scheduler
+    scans it, or None if there is no such universe
+    """
+    if not name:
+        return current_stocks
+    universes = scan_universes()
+    if name in universes:
+        return universes[name]
+    try:
+        return get_universe(name)
+    except ValueError:
+        return None
+
+# Shared scans: concurrent clients join the scan of the current bar
+# (bars follow the data provider's clock, which a replay runs faster)
+provider = screener_logic.PROVIDER
+coordinator = ScanCoordinator(clock=provider.now)
+
+# Background pre-scans on bar close; endpoints serve its latest snapshot
+scheduler = ScanScheduler(coordinator, scan_universes, config.TIMEFRAMES,
+                          clock=provider.now, sleep=provider.sleep)
+if config.SCHEDULER_ENABLED and not config.LIVE_FEED:
+    scheduler.start()
+
+# Pushed bars (LIVE_FEED): each update re-evaluates only its symbol and
+# new signals go to /api/live/stream
+live = None
+if config.LIVE_FEED:
+    live = LiveScanner(config.TIMEFRAMES, clock=provider.now, coordinator=coordinator)
+    start_feed(live, provider, lambda: current_stocks)
+
+
 @app.route('/')
 def index():
     """Serve the main dashboard page"""
     return send_from_directory('static', 'index.html')
 
 
+def run_signals(run):
+    """
+    Signal results of a finished scan; with SIGNAL_STATE every signal
+    active on its stocks (the scan itself only carries new triggers)
+    """
+    if config.SIGNAL_STATE:
+        events, _ = screener_logic.SIGNAL_STATES.changes(symbols=run.key[0])
+        return [event['data'] for event in events]
+    return run.signals()
+
+
 @app.route('/api/scan', methods=['GET'])
 def scan():
     """
-    Scan all configured stocks for PACPL signals
+    Scan all configured stocks (or ?universe=<name>) for PACPL signals
     Returns: JSON with active signals
     """
     key = request.args.get('license_key')
@@ -37,14 +110,27 @@ def scan():
     if not valid:
         return jsonify({'success': False, 'error': message}), 403
 
+    stocks = universe_stocks(request.args.get('universe'))
+    if stocks is None:
+        return jsonify({'success': False, 'error': 'Unknown universe'}), 404
+
     try:
-        # Scan all stocks
-        results = scan_all_stocks(current_stocks)
+        # Serve the scheduler's latest snapshot if it covers the stocks,
+        # otherwise scan all stocks (or join the scan already running for this bar)
+        snapshot = scheduler.get_snapshot(stocks, config.TIMEFRAMES)
+        if snapshot is not None:
+            results = run_signals(snapshot)
+            timestamp = scheduler.snapshot_at.strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            run = coordinator.get_run(stocks, config.TIMEFRAMES)
+            run.wait()
+            results = run_signals(run)
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         response = {
             'success': True,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'total_stocks': len(current_stocks),
+            'timestamp': timestamp,
+            'total_stocks': len(stocks),
             'signals_found': len(results),
             'signals': results
         }
@@ -69,6 +155,24 @@ def get_stocks():
     })
 
 
+@app.route('/api/universes', methods=['GET'])
+def get_universes():
+    """
+    Universes that can be scanned and streamed (?universe=<name>); the
+    scheduled ones are pre-scanned together on every bar close
+    """
+    scanned = scan_universes()
+    names = list(scanned) + [name for name in universe_names() if name not in scanned]
+    return jsonify({
+        'success': True,
+        'universes': [{
+            'name': name,
+            'stocks': len(scanned[name] if name in scanned else get_universe(name)),
+            'scheduled': name in scanned,
+        } for name in names]
+    })
+
+
 @app.route('/api/stocks', methods=['POST'])
 def update_stocks():
     """
@@ -290,6 +394,21 @@ def generate_license_route():
     data = request.get_json()
     user_name = data.get('username', 'Customer')
     days = data.get('days', 30)
+    try:
+        # str() first so 2.5 or true are rejected rather than truncated
+        count = int(str(data.get('count', 1)))
+    except ValueError:
+        count = 0
+    if not 1 <= count <= license_manager.MAX_BATCH_KEYS:
+        return jsonify({
+            'success': False,
+            'message': f'count must be a whole number from 1 to {license_manager.MAX_BATCH_KEYS}'
+        }), 400
+    
+    if count > 1:
+        # Batch issuance: one transaction for all keys
+        keys, expiry = license_manager.generate_keys(user_name, count, days)
+        return jsonify({'success': True, 'keys': keys, 'expiry': expiry})
     
     key, expiry = license_manager.generate_key(user_name, days)
     return jsonify({'success': True, 'key': key, 'expiry': expiry})
@@ -299,7 +418,18 @@ def list_licenses_route():
     admin_pass = request.headers.get('Admin-Password')
     if admin_pass != "PACPL-ADMIN-99":
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
-    return jsonify({'success': True, 'licenses': license_manager.load_licenses()})
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    licenses, total = license_manager.list_licenses(
+        page, per_page, expiring_before=request.args.get('expiring_before')
+    )
+    return jsonify({
+        'success': True,
+        'licenses': licenses,
+        'page': page,
+        'per_page': per_page,
+        'total': total
+    })
 def get_config():
     """
     Get PACPL configuration parameters
@@ -318,10 +448,77 @@ def get_config():
     })
 
 
+def open_scan_stream(args, last_event_id=None):
+    """
+    Pick the scan a /api/scan/stream request follows
+    Returns: (run, index of its first event to send, encoder turning
+    (index, event) into SSE messages), or None for an unknown universe
+    """
+    timeframes = config.TIMEFRAMES
+    compact = args.get('compact') == '1'
+    since = args.get('since', type=int)
+    stocks = universe_stocks(args.get('universe'))
+    if stocks is None:
+        return None
+
+    # A reconnecting EventSource sends the id of the last event it got:
+    # carry on in that scan from the next event instead of starting over.
+    # Otherwise replay the scheduler's finished snapshot if there is one,
+    # or subscribe to the shared scan for the universe's stocks
+    # (late joiners get the events so far, then live ones)
+    resumed = coordinator.resume(last_event_id)
+    if resumed is not None:
+        run, start = resumed
+    else:
+        run, start = scheduler.get_snapshot(stocks, timeframes), 0
+        if run is None:
+            run = coordinator.get_run(stocks, timeframes)
+
+    # With signal states a scan carries only transitions: open with the
+    # signals active before it (or what changed since the client's last
+    # sequence number) and skip the transitions that already covers
+    prefix, seq = [], None
+    if config.SIGNAL_STATE:
+        seq = 0
+        if resumed is None:
+            prefix, seq = screener_logic.SIGNAL_STATES.changes(since, run.key[0])
+
+    def fresh(event):
+        return seq is None or event.get('seq', seq + 1) > seq
+
+    # Each message is tagged with its event id; the prefix follows start
+    if compact:
+        stream = CompactStream(run.id, timeframes, since, seq=seq)
+        stream.catch_up(run.events[:start])
+
+        def encode(index, event):
+            messages = stream.encode(event, run.event_id(index)) if fresh(event) else []
+            if index == 0:
+                messages += [m for e in prefix for m in stream.encode(e)]
+            return messages
+    else:
+        def encode(index, event):
+            messages = []
+            if fresh(event):
+                if index == 0 and seq is not None:
+                    event = {**event, 'seq': seq}
+                messages.append(format_sse(event, run.event_id(index)))
+            if index == 0:
+                messages += [format_sse(e) for e in prefix]
+            return messages
+    return run, start, encode
+
+
 @app.route('/api/scan/stream')
 def scan_stream():
     """
     Stream scan results using Server-Sent Events (SSE)
+    ?universe=<name> follows a named universe instead of the stock list
+    (see universes.py)
+    ?compact=1 sends the compact encoding (see sse_codec), and with
+    ?since=<scan id> only what changed since that scan (with SIGNAL_STATE,
+    ?since=<sequence number> the transitions after that one)
+    (asgi.py serves this route without holding a thread per stream)
     """
     key = request.args.get('license_key')
     device_id = request.args.get('device_id')
@@ -329,14 +526,15 @@ def scan_stream():
     if not valid:
         return jsonify({'success': False, 'error': message}), 403
 
-    timeframes = config.TIMEFRAMES
-    
+    opened = open_scan_stream(request.args, request.headers.get('Last-Event-ID'))
+    if opened is None:
+        return jsonify({'success': False, 'error': 'Unknown universe'}), 404
+    run, start, encode = opened
+
     def generate():
-        # Use the generator function
-        # Using current_stocks list
         # Yielding events as formatted SSE
-        for event in scan_stocks_generator(current_stocks, timeframes):
-            yield event
+        for index, event in enumerate(run.subscribe(start=start), start):
+            yield from encode(index, event)
             
     resp = Response(stream_with_context(generate()), mimetype='text/event-stream')
     resp.headers['Cache-Control'] = 'no-cache'
@@ -345,10 +543,100 @@ def scan_stream():
 
 
 
+def open_live_stream(args, last_event_id=None):
+    """
+    Pick the live run a /api/live/stream request follows
+    Returns: (run, index of its first event to send, encoder), or None if
+    there is no live feed
+    """
+    if live is None:
+        return None
+    run, start = live.current_run(), 0
+    # Reconnecting clients carry on after the last signal they got
+    run_id, _, index = (last_event_id or '').partition('-')
+    if run_id == str(run.id) and index.isdigit():
+        start = int(index) + 1
+    return run, start, lambda index, event: [format_sse(event, run.event_id(index))]
+
+
+@app.route('/api/live/stream')
+def live_stream():
+    """
+    Signals triggered by pushed bars, as they happen (LIVE_FEED)
+    The stream starts with the session's signals so far and stays open
+    """
+    key = request.args.get('license_key')
+    device_id = request.args.get('device_id')
+    valid, message = license_manager.validate_license(key, device_id)
+    if not valid:
+        return jsonify({'success': False, 'error': message}), 403
+
+    opened = open_live_stream(request.args, request.headers.get('Last-Event-ID'))
+    if opened is None:
+        return jsonify({'success': False, 'error': 'Live feed is off'}), 404
+    run, start, encode = opened
+
+    def generate():
+        for index, event in enumerate(run.subscribe(start=start), start):
+            yield from encode(index, event)
+
+    resp = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+@app.route('/api/live', methods=['GET'])
+def live_status():
+    """
+    Live feed state: symbols seen, evaluations, queued updates
+    """
+    return jsonify({
+        'success': True,
+        'enabled': live is not None,
+        'live': live.status() if live is not None else None
+    })
+
+
+@app.route('/api/scheduler', methods=['GET'])
+def scheduler_status():
+    """
+    Background scheduler state: last run duration and next run time
+    """
+    return jsonify({
+        'success': True,
+        'scheduler': scheduler.status()
+    })
+
+
+@app.route('/api/symbols/health', methods=['GET'])
+def symbol_health_route():
+    """
+    Symbols that failed to fetch: which are being skipped, why, and for how long
+    """
+    report = screener_logic.SYMBOL_HEALTH.report()
+    return jsonify({
+        'success': True,
+        'skipping': sum(1 for row in report if row['skipping']),
+        'symbols': report
+    })
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_route():
+    """
+    Per-stage scan timing counters (fetch, levels, orb, signals, serialize, ...)
+    """
+    return jsonify({
+        'success': True,
+        'metrics': metrics.snapshot()
+    })
+
+
 @app.route('/api/test/stream')
 def test_stream_route():
     def generate():
-        print("DEBUG: test_stream_route generator started")
+        log.debug("test_stream_route generator started")
         yield ": start\n\n"
         for i in range(10):
             import time
@@ -0,0 +1,185 @@
+"""
+PACPL Screener - ASGI Entry Point
+Event-loop serving mode: /api/scan/stream and /api/live/stream run on
+asyncio, so an open stream is a coroutine waiting on its run rather than a
+worker thread.
+Scans still run in the coordinator's threads, apart from connection
+handling. Every other route is passed to the Flask app on a thread pool.
+
+    gunicorn -k uvicorn_worker.UvicornWorker --timeout 300 asgi:app
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import json
+import logging
+import sys
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+
+import config
+import license_manager
+import app as web
+
+log = logging.getLogger(__name__)
+
+# Stream path -> (app function picking the run to follow (run, start,
+# encode), error when it returns None)
+STREAMS = {
+    '/api/scan/stream': ('open_scan_stream', 'Unknown universe'),
+    '/api/live/stream': ('open_live_stream', 'Live feed is off'),
+}
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+class ScreenerASGI:
+    """
+    ASGI app: the event streams natively, the rest through the WSGI app
+    """
+
+    def __init__(self, wsgi_app, threads=None):
+        self.wsgi_app = wsgi_app
+        # Blocking work (license checks, Flask routes) runs here
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=threads or config.ASGI_THREADS, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            if scope['path'] in STREAMS and scope['method'] == 'GET':
+                await self.stream(scope, receive, send)
+            else:
+                await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _json(self, send, status, body):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+    async def stream(self, scope, receive, send):
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1')))
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+
+        valid, message = await self._blocking(
+            license_manager.validate_license, args.get('license_key'), args.get('device_id'))
+        if not valid:
+            await self._json(send, 403, {'success': False, 'error': message})
+            return
+
+        opener, missing = STREAMS[scope['path']]
+        opened = await self._blocking(getattr(web, opener), args, headers.get('last-event-id'))
+        if opened is None:
+            await self._json(send, 404, {'success': False, 'error': missing})
+            return
+        run, start, encode = opened
+        await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS})
+
+        async def forward():
+            index = start
+            async for event in run.subscribe_async(start):
+                for message in encode(index, event):
+                    await send({'type': 'http.response.body', 'body': message.encode(),
+                                'more_body': True})
+                index += 1
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        # Stop forwarding as soon as the client goes away
+        tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(disconnected())]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                log.error("Stream %s failed: %s", scope['path'], task.exception())
+
+    async def wsgi(self, scope, receive, send):
+        """
+        Run a Flask request on the thread pool (responses are buffered)
+        """
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        status, headers, content = await self._blocking(self._call_wsgi, scope, body)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    def _call_wsgi(self, scope, body):
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            key = name.decode('latin-1').upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = 'HTTP_' + key
+            value = value.decode('latin-1')
+            if key in environ:
+                # A repeated header is one comma-separated value (PEP 3333);
+                # cookies are joined like a single Cookie header
+                value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ', ') + value
+            environ[key] = value
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                                   for k, v in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
+
+
+app = ScreenerASGI(web.app)
@@ -0,0 +1,315 @@
+"""
+PACPL Screener - Async Fetch Pipeline
+Downloads per-symbol OHLCV from the Yahoo chart API with a bounded number
+of requests in flight, a per-host token bucket and jittered retries, and
+hands finished chunks to the scan's evaluation stage while the rest are
+still downloading
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+import screener_logic
+from metrics import timed
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30
+
+
+class FetchError(Exception):
+    """A download still failed after all retries"""
+
+
+class SymbolNotFound(FetchError):
+    """The provider doesn't know the symbol"""
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts of up to `capacity`
+    Tokens are reserved up front, so concurrent callers queue fairly;
+    safe to share between threads and event loops
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return how long to wait before using it
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def parse_chart(payload):
+    """
+    Convert a chart API response into an OHLCV frame indexed in exchange time
+    Returns None if the response has no bars
+    """
+    chart = payload.get('chart') or {}
+    if chart.get('error'):
+        raise SymbolNotFound(chart['error'].get('description', 'no data'))
+    result = (chart.get('result') or [None])[0]
+    if not result or not result.get('timestamp'):
+        return None
+
+    quote = result['indicators']['quote'][0]
+    tz = result.get('meta', {}).get('exchangeTimezoneName', 'Asia/Kolkata')
+    index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(tz).as_unit('ns')
+    df = pd.DataFrame({
+        'Open': quote.get('open'),
+        'High': quote.get('high'),
+        'Low': quote.get('low'),
+        'Close': quote.get('close'),
+        'Volume': quote.get('volume'),
+    }, index=pd.DatetimeIndex(index, name='Datetime'), dtype=float)
+    # Bars the exchange didn't trade come back as nulls
+    df = df.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    return df if not df.empty else None
+
+
+class AsyncFetcher:
+    """
+    Chart API client driven by asyncio
+    Requests go through one pooled requests.Session (connections are kept
+    alive and reused) on a thread pool of `concurrency` workers
+    """
+
+    def __init__(self, base_url=None, concurrency=None, rate=None, burst=None,
+                 retries=None, backoff=None, timeout=None):
+        self.base_url = (base_url or config.CHART_API_URL).rstrip('/')
+        self.concurrency = concurrency or config.FETCH_CONCURRENCY
+        self.rate = rate or config.FETCH_RATE
+        self.burst = burst or config.FETCH_BURST
+        self.retries = config.FETCH_RETRIES if retries is None else retries
+        self.backoff = config.FETCH_BACKOFF if backoff is None else backoff
+        self.timeout = timeout or config.FETCH_TIMEOUT
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'Mozilla/5.0'
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix='fetch')
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._semaphores = {}
+        self._semaphores_lock = threading.Lock()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def _semaphore(self):
+        """
+        The running event loop's limit on requests in flight
+        asyncio primitives belong to one loop, so each loop (each concurrent
+        scan) waits on its own `concurrency` slots; the shared thread pool
+        still runs at most `concurrency` requests at once across all of them
+        """
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            sem = self._semaphores.get(loop)
+            if sem is None:
+                # Forget the loops of finished scans
+                for old in [old for old in self._semaphores if old.is_closed()]:
+                    del self._semaphores[old]
+                sem = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+            return sem
+
+    def _get(self, url, params):
+        """
+        Blocking request, run on the thread pool
+        Returns: (status, Retry-After header, frame or None)
+        """
+        resp = self.session.get(url, params=params, timeout=self.timeout)
+        if resp.status_code == 404:
+            return 404, None, None
+        if resp.status_code != 200:
+            return resp.status_code, resp.headers.get('Retry-After'), None
+        return 200, None, parse_chart(resp.json())
+
+    def _retry_delay(self, attempt, retry_after=None):
+        # Exponential backoff with jitter so retries don't arrive in lockstep
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        try:
+            delay = max(delay, min(float(retry_after), MAX_RETRY_AFTER))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    async def fetch(self, symbol, timeframe, start=None, days=5):
+        """
+        Download bars for one symbol; only bars from `start` on if given
+        Returns a frame, or None if there are no bars in the window
+        Raises SymbolNotFound for unknown symbols, FetchError when retries run out
+        """
+        url = f"{self.base_url}/{symbol}"
+        params = {'interval': timeframe, 'includePrePost': 'false'}
+        if start is not None:
+            params['period1'] = int(start.timestamp())
+            params['period2'] = int(time.time()) + 60
+        else:
+            params['range'] = "5d" if timeframe == "1m" else f"{days}d"
+
+        loop = asyncio.get_running_loop()
+        bucket = self.bucket(url)
+        error = None
+        for attempt in range(self.retries + 1):
+            async with self._semaphore():
+                await bucket.acquire()
+                try:
+                    with timed('fetch'):
+                        status, retry_after, df = await loop.run_in_executor(
+                            self._executor, self._get, url, params)
+                except (requests.RequestException, ValueError) as e:
+                    status, retry_after, error = None, None, e
+            if status == 200:
+                return df
+            if status == 404:
+                raise SymbolNotFound(symbol)
+            if status is not None:
+                error = f"HTTP {status}"
+                if status not in RETRY_STATUSES:
+                    break
+            if attempt < self.retries:
+                log.debug("Retrying %s (%s) after %s", symbol, timeframe, error)
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        raise FetchError(f"{symbol} ({timeframe}): {error}")
+
+    async def fetch_symbol(self, symbol, timeframe, days=5):
+        """
+        Fetch one series through the bar store, like get_stock_data
+        Returns: DataFrame, or None if the symbol has no data
+        """
+        store = screener_logic.BAR_STORE
+        start = store.fetch_start(symbol, timeframe) if store is not None else None
+        try:
+            df = await self.fetch(symbol, timeframe, start=start, days=days)
+        except SymbolNotFound as e:
+            log.debug("No data for %s", symbol)
+            screener_logic.SYMBOL_HEALTH.record_failure(symbol, 'not_found', str(e))
+            return None
+        except FetchError as e:
+            log.warning("Error fetching data for %s", e)
+            screener_logic.SYMBOL_HEALTH.record_failure(symbol, 'error', str(e))
+            return None
+
+        if df is None:
+            if start is not None:
+                # Nothing new since the last scan
+                return store.get(symbol, timeframe)
+            screener_logic.SYMBOL_HEALTH.record_failure(symbol, 'no_data', timeframe)
+            return None
+        screener_logic.SYMBOL_HEALTH.record_success(symbol)
+        return store.merge(symbol, timeframe, df) if store is not None else df
+
+
+_FETCHER = None
+_FETCHER_LOCK = threading.Lock()
+
+
+def get_fetcher():
+    """
+    Shared fetcher, so connections and rate limits carry over between scans
+    """
+    global _FETCHER
+    with _FETCHER_LOCK:
+        if _FETCHER is None:
+            _FETCHER = AsyncFetcher()
+        return _FETCHER
+
+
+def iter_async_frames(stock_list, timeframes, chunk_size=None, fetcher=None):
+    """
+    Yield (chunk, frames) pairs like iter_batched_frames, where frames maps
+    symbol -> {timeframe: DataFrame}
+    Downloads run on an event loop in a background thread; a chunk is
+    yielded as soon as `chunk_size` symbols are complete, so signal
+    evaluation of one chunk overlaps with downloading the next
+    """
+    if chunk_size is None:
+        chunk_size = config.BATCH_SIZE
+    if fetcher is None:
+        fetcher = get_fetcher()
+
+    fetch_list, derived = screener_logic.plan_timeframes(timeframes)
+    symbols = [s for s in dict.fromkeys(stock_list)]
+    out = queue.Queue()
+    finished = object()
+
+    async def fetch_stock(symbol):
+        if symbol in screener_logic.SYMBOL_HEALTH:
+            frames = {tf: None for tf in fetch_list}
+        else:
+            results = await asyncio.gather(*(fetcher.fetch_symbol(symbol, tf) for tf in fetch_list))
+            frames = dict(zip(fetch_list, results))
+        return symbol, screener_logic.derive_timeframes(frames, derived)
+
+    async def produce():
+        chunk, frames = [], {}
+        for next_done in asyncio.as_completed([fetch_stock(s) for s in symbols]):
+            symbol, by_tf = await next_done
+            chunk.append(symbol)
+            frames[symbol] = by_tf
+            if len(chunk) >= chunk_size:
+                out.put((chunk, frames))
+                chunk, frames = [], {}
+        if chunk:
+            out.put((chunk, frames))
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except Exception as e:
+            out.put(e)
+        finally:
+            out.put(finished)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    while True:
+        item = out.get()
+        if item is finished:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
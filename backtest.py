@@ -0,0 +1,340 @@
+"""
+PACPL Screener - Vectorized Backtester
+Replays the PACPL rules of check_signals at every bar of every session
+in the local bar cache, and simulates the entry / SL / TP of
+enrich_signals_with_targets for the first occurrence of each signal in a
+session.
+
+Sessions are the rows of a (session x bar of session) matrix, so each
+rule is a few NumPy operations over every bar of a chunk of symbols.
+
+    python backtest.py --timeframe 1m --start 2025-10-01 --end 2026-09-30
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import *
+from panel_engine import SIGNAL_RULES, ATR_LENGTH
+from screener_logic import SessionIndex, timeframe_minutes, resample_ohlcv
+from bar_store import BarStore
+
+log = logging.getLogger(__name__)
+
+SIGNAL_TYPES = {flag: (signal_type, signal_dir) for flag, signal_type, signal_dir in SIGNAL_RULES}
+
+TRADE_COLUMNS = ['symbol', 'date', 'time', 'flag', 'signal_type', 'signal_dir',
+                 'entry', 'sl', 'tp', 'risk', 'outcome', 'exit', 'r', 'bars_to_fill', 'bars_held']
+
+
+def load_frames(symbols, timeframe="1m", start=None, end=None, store=None):
+    """
+    Bar history of every symbol from the bar cache (None if nothing is stored)
+    Timeframes that aren't stored are resampled from the 1m files
+    """
+    store = store or BarStore(cache_dir=BAR_STORE_DIR)
+    frames = {}
+    for symbol in symbols:
+        df = store.history(symbol, timeframe, start, end)
+        if df is None and timeframe != "1m":
+            df = store.history(symbol, "1m", start, end)
+            if df is not None:
+                df = resample_ohlcv(df, timeframe)
+        frames[symbol] = df
+    return frames
+
+
+def _wilder_atr(high, low, close):
+    """
+    ATR(14) at every bar, computed like check_signals (0 until 15 bars)
+    """
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    atr = pd.Series(tr).ewm(alpha=1 / ATR_LENGTH, adjust=False).mean().to_numpy(copy=True)
+    atr[:ATR_LENGTH] = 0.0
+    return atr
+
+
+def build_sessions(frames, timeframe):
+    """
+    Lay the bars of many symbols out as one row per (symbol, session)
+    Rows of a symbol are consecutive and in date order; shorter sessions
+    are right-padded with NaN
+    """
+    symbols, parts = [], []
+    for symbol, df in frames.items():
+        if df is None or len(df) < 2:
+            continue
+        index = pd.DatetimeIndex(df.index)
+        session = SessionIndex(index)
+        n = len(df)
+        day = np.searchsorted(session.starts, np.arange(n), side='right') - 1
+        ohlc = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float).T
+        parts.append({
+            'symbol': len(symbols),
+            'sessions': len(session),
+            'day': day,
+            'col': np.arange(n) - session.starts[day],
+            'ohlc': ohlc,
+            'atr': _wilder_atr(ohlc[1], ohlc[2], ohlc[3]),
+            'mins': index.hour.to_numpy() * 60 + index.minute.to_numpy(),
+            'time': index,
+        })
+        symbols.append(symbol)
+
+    if not parts:
+        return None
+
+    bases = np.cumsum([0] + [p['sessions'] for p in parts])
+    rows = int(bases[-1])
+    width = int(max(p['col'].max() for p in parts)) + 1
+    row = np.concatenate([base + p['day'] for base, p in zip(bases, parts)])
+    col = np.concatenate([p['col'] for p in parts])
+
+    def scatter(values, fill=np.nan, dtype=float):
+        out = np.full((rows, width), fill, dtype=dtype)
+        out[row, col] = values
+        return out
+
+    ohlc = np.concatenate([p['ohlc'] for p in parts], axis=1)
+    times = np.concatenate([p['time'].tz_localize(None).values for p in parts])
+    return {
+        'symbols': symbols,
+        'timeframe': timeframe,
+        'symbol': np.repeat([p['symbol'] for p in parts], [p['sessions'] for p in parts]),
+        'count': np.bincount(row, minlength=rows),
+        'open': scatter(ohlc[0]), 'high': scatter(ohlc[1]),
+        'low': scatter(ohlc[2]), 'close': scatter(ohlc[3]),
+        'atr': scatter(np.concatenate([p['atr'] for p in parts])),
+        'mins': scatter(np.concatenate([p['mins'] for p in parts]), -1, np.int64),
+        'time': scatter(times, np.datetime64('NaT'), 'datetime64[ns]'),
+    }
+
+
+def signal_flags(sessions):
+    """
+    Every check_signals flag at every bar, as if that bar were the last one
+    Returns: dict of flag -> bool (session x bar) matrix
+    """
+    o, h, l, c = sessions['open'], sessions['high'], sessions['low'], sessions['close']
+    rows, width = c.shape
+    pos = np.arange(width)
+    count = sessions['count']
+    valid = pos[None, :] < count[:, None]
+
+    # Previous session of the same symbol
+    has_prev = np.zeros(rows, dtype=bool)
+    has_prev[1:] = sessions['symbol'][1:] == sessions['symbol'][:-1]
+    prev = np.maximum(np.arange(rows) - 1, 0)
+    pdc = np.where(has_prev, c[prev, np.maximum(count[prev] - 1, 0)], np.nan)
+    pdh = np.where(has_prev, np.fmax.reduce(h[prev], axis=1), np.nan)
+    pdl = np.where(has_prev, np.fmin.reduce(l[prev], axis=1), np.nan)
+
+    # Opening range of the bars so far, frozen once it is complete
+    tf_mins = timeframe_minutes(sessions['timeframe']) or 5
+    orb_bars = min(max(1, int(ORB_MINS / tf_mins)), width)
+    cum_high = np.fmax.accumulate(h, axis=1)
+    cum_low = np.fmin.accumulate(l, axis=1)
+    in_orb = pos[None, :] < orb_bars
+    orb_high = np.where(in_orb, cum_high, cum_high[:, [orb_bars - 1]])
+    orb_low = np.where(in_orb, cum_low, cum_low[:, [orb_bars - 1]])
+
+    # Gap classification (detect_gap treats pdc == 0 as no gap at all)
+    valid_gap = has_prev & (pdc != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap_pct = np.where(valid_gap, ((o[:, 0] - pdc) / pdc) * 100.0, 0.0)
+    large_up = (valid_gap & (gap_pct >= LARGE_GAP))[:, None]
+    large_down = (valid_gap & (gap_pct <= -LARGE_GAP))[:, None]
+    small = (valid_gap & ~(large_up[:, 0] | large_down[:, 0]))[:, None]
+    gap_up = (gap_pct > 0)[:, None]
+    gap_down = (gap_pct < 0)[:, None]
+
+    sustain_bars = max(1, SUSTAIN_MINS // 5)
+    beyond_sustain = (pos + 1 >= sustain_bars)[None, :]
+    active = valid & has_prev[:, None] & (sessions['mins'] >= AFTER_918_MINS)
+
+    with np.errstate(invalid='ignore'):
+        above_orb = c > orb_high
+        below_orb = c < orb_low
+        broke_pdh = np.logical_or.accumulate(c > pdh[:, None], axis=1)
+        broke_pdl = np.logical_or.accumulate(c < pdl[:, None], axis=1)
+        band_up = (pdh * (1 + TOL_PCT / 100.0))[:, None]
+        band_dn = (pdl * (1 - TOL_PCT / 100.0))[:, None]
+        retest_long = broke_pdh & (l <= band_up) & (c > pdh[:, None])
+        retest_short = broke_pdl & (h >= band_dn) & (c < pdl[:, None])
+
+    return {
+        'follow_long': active & large_up & beyond_sustain & above_orb,
+        'follow_short': active & large_down & beyond_sustain & below_orb,
+        'fade_short': active & small & gap_up & below_orb,
+        'fade_long': active & small & gap_down & above_orb,
+        'reversal_long': active & large_down & beyond_sustain & above_orb,
+        'reversal_short': active & large_up & beyond_sustain & below_orb,
+        'trend_long': active & small & gap_up & above_orb,
+        'trend_short': active & small & gap_down & below_orb,
+        'pdh_retest_long': active & retest_long,
+        'pdl_retest_short': active & retest_short,
+    }
+
+
+def simulate(sessions, flag, rows, bars):
+    """
+    Trade the signal `flag` raised at (rows, bars) like the dashboard card:
+    a stop entry beyond the signal bar, then SL / TP, else out at the close
+    A bar touching both SL and TP counts as a loss
+    Returns: dict of per-trade arrays
+    """
+    h, l, c = sessions['high'][rows], sessions['low'][rows], sessions['close'][rows]
+    width = h.shape[1]
+    pos = np.arange(width)[None, :]
+    count = sessions['count'][rows]
+    direction = 1.0 if SIGNAL_TYPES[flag][1] == 'LONG' else -1.0
+    is_long = direction > 0
+
+    # enrich_signals_with_targets
+    signal_high = h[np.arange(len(rows)), bars]
+    signal_low = l[np.arange(len(rows)), bars]
+    atr = sessions['atr'][rows, bars]
+    entry = signal_high + ENTRY_BUFFER if is_long else signal_low - ENTRY_BUFFER
+    risk = np.where(atr > 0, atr * SL_ATR_MULT, entry * 0.005)
+    sl = np.round(entry - direction * risk, 2)
+    tp = np.round(entry + direction * risk * REWARD_RISK, 2)
+    entry, risk = np.round(entry, 2), np.round(risk, 2)
+
+    live = pos < count[:, None]
+    with np.errstate(invalid='ignore'):
+        touch_entry = (h >= entry[:, None]) if is_long else (l <= entry[:, None])
+        fills = live & (pos > bars[:, None]) & touch_entry
+        filled = fills.any(axis=1)
+        fill_bar = np.where(filled, fills.argmax(axis=1), width)
+
+        holding = live & (pos >= fill_bar[:, None])
+        hit_sl = holding & ((l <= sl[:, None]) if is_long else (h >= sl[:, None]))
+        hit_tp = holding & ((h >= tp[:, None]) if is_long else (l <= tp[:, None]))
+    sl_bar = np.where(hit_sl.any(axis=1), hit_sl.argmax(axis=1), width)
+    tp_bar = np.where(hit_tp.any(axis=1), hit_tp.argmax(axis=1), width)
+    last_bar = count - 1
+
+    won = filled & (tp_bar < sl_bar)
+    lost = filled & ~won & (sl_bar < width)
+    exit_price = np.where(won, tp, np.where(lost, sl, c[np.arange(len(rows)), last_bar]))
+    exit_bar = np.where(won, tp_bar, np.where(lost, sl_bar, last_bar))
+
+    outcome = np.where(~filled, 'unfilled', np.where(won, 'tp', np.where(lost, 'sl', 'close')))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.where(filled, (exit_price - entry) * direction / risk, np.nan)
+    return {
+        'entry': entry, 'sl': sl, 'tp': tp, 'risk': risk,
+        'outcome': outcome,
+        'exit': np.where(filled, exit_price, np.nan),
+        'r': r,
+        'bars_to_fill': np.where(filled, fill_bar - bars, -1),
+        'bars_held': np.where(filled, exit_bar - fill_bar, -1),
+    }
+
+
+def backtest_sessions(sessions):
+    """
+    Trades for the first bar of each session at which each signal fires
+    Returns: DataFrame with TRADE_COLUMNS
+    """
+    flags = signal_flags(sessions)
+    parts = []
+    for flag, fired in flags.items():
+        rows = np.flatnonzero(fired.any(axis=1))
+        if not len(rows):
+            continue
+        bars = fired[rows].argmax(axis=1)
+        trades = simulate(sessions, flag, rows, bars)
+        signal_time = sessions['time'][rows, bars]
+        trades.update({
+            'symbol': np.asarray(sessions['symbols'])[sessions['symbol'][rows]],
+            'date': signal_time.astype('datetime64[D]'),
+            'time': signal_time,
+            'flag': flag,
+            'signal_type': SIGNAL_TYPES[flag][0],
+            'signal_dir': SIGNAL_TYPES[flag][1],
+        })
+        parts.append(pd.DataFrame(trades, columns=TRADE_COLUMNS))
+    if not parts:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def run_backtest(frames, timeframe="1m", chunk_size=None):
+    """
+    Backtest a universe: frames is a dict of symbol -> bar history
+    Symbols are evaluated chunk_size at a time to bound memory
+    Returns: DataFrame of trades, sorted by time
+    """
+    chunk_size = chunk_size or BACKTEST_CHUNK
+    symbols = list(frames)
+    parts = []
+    for i in range(0, len(symbols), chunk_size):
+        sessions = build_sessions({s: frames[s] for s in symbols[i:i + chunk_size]}, timeframe)
+        if sessions is not None:
+            parts.append(backtest_sessions(sessions))
+    if not parts:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    trades = pd.concat(parts, ignore_index=True)
+    return trades.sort_values(['time', 'symbol', 'flag'], ignore_index=True)
+
+
+def summarize(trades, by='flag'):
+    """
+    Hit rate and R-multiples per signal (by='flag') or signal type
+    hit_rate: share of filled trades that reached TP
+    """
+    filled = trades[trades['outcome'] != 'unfilled']
+    groups = trades.groupby(by)
+    summary = pd.DataFrame({
+        'signals': groups.size(),
+        'filled': filled.groupby(by).size(),
+        'tp': filled[filled['outcome'] == 'tp'].groupby(by).size(),
+        'sl': filled[filled['outcome'] == 'sl'].groupby(by).size(),
+        'close': filled[filled['outcome'] == 'close'].groupby(by).size(),
+        'avg_r': filled.groupby(by)['r'].mean(),
+        'total_r': filled.groupby(by)['r'].sum(),
+    }).fillna({'filled': 0, 'tp': 0, 'sl': 0, 'close': 0, 'total_r': 0.0})
+    for column in ['filled', 'tp', 'sl', 'close']:
+        summary[column] = summary[column].astype(int)
+    summary['hit_rate'] = (summary['tp'] / summary['filled']).where(summary['filled'] > 0)
+    summary['win_rate'] = filled.groupby(by)['r'].apply(lambda r: (r > 0).mean())
+    return summary.round(3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the PACPL signals on the bar cache")
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--start', help='First day (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Last day (YYYY-MM-DD)')
+    parser.add_argument('--symbols', nargs='*', help='Default: the configured stock list')
+    parser.add_argument('--trades', help='Write every trade to this CSV file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
+    started = time.perf_counter()
+    frames = load_frames(args.symbols or DEFAULT_STOCKS, args.timeframe, args.start, args.end)
+    missing = [s for s, df in frames.items() if df is None]
+    if missing:
+        log.warning("No cached bars for %d symbols", len(missing))
+    loaded = time.perf_counter()
+
+    trades = run_backtest(frames, args.timeframe)
+    done = time.perf_counter()
+    bars = sum(len(df) for df in frames.values() if df is not None)
+    print(f"{bars} bars of {len(frames) - len(missing)} symbols: "
+          f"loaded in {loaded - started:.1f}s, backtested in {done - loaded:.1f}s")
+    print(summarize(trades, 'flag').to_string())
+    print()
+    print(summarize(trades, 'signal_type').to_string())
+    if args.trades:
+        trades.to_csv(args.trades, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+PACPL Screener - Incremental Bar Store
+Keeps downloaded OHLCV history per (symbol, timeframe) so each scan only
+needs to fetch the bars after the last stored timestamp
+
+On disk, each trading day of a series is one NumPy file
+(cache_dir/<timeframe>/<symbol>/<YYYY-MM-DD>.npy) that is memory-mapped
+on load. Completed days are kept forever; only the current session's
+file is rewritten as new bars arrive.
+"""
+
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DAY_FILE_SUFFIX = '.npy'
+
+
+class BarStore:
+    """
+    In-memory bar history with optional day-partitioned files on disk
+    tz: exchange timezone, used to split bars into trading days
+    clock: callable returning the current market time (default: wall clock)
+    """
+
+    def __init__(self, days=5, cache_dir=None, tz='Asia/Kolkata', clock=None):
+        self.days = days
+        self.cache_dir = cache_dir
+        self.tz = tz
+        self.clock = clock
+        self._bars = {}
+        self._lock = threading.Lock()
+        # One lock per series, held for a whole merge (memory and disk)
+        self._series_locks = {}
+
+    def _series_lock(self, symbol, timeframe):
+        with self._lock:
+            return self._series_locks.setdefault((symbol, timeframe), threading.Lock())
+
+    def _series_dir(self, symbol, timeframe):
+        safe = symbol.replace('&', '_').replace('/', '_')
+        return os.path.join(self.cache_dir, timeframe, safe)
+
+    def stored_days(self, symbol, timeframe):
+        """
+        Trading days with a file on disk, oldest first
+        """
+        if not self.cache_dir:
+            return []
+        try:
+            names = os.listdir(self._series_dir(symbol, timeframe))
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-len(DAY_FILE_SUFFIX)] for n in names if n.endswith(DAY_FILE_SUFFIX))
+
+    def get(self, symbol, timeframe):
+        """
+        Return a copy of the stored bars, or None
+        """
+        with self._lock:
+            df = self._bars.get((symbol, timeframe))
+        if df is None and self.cache_dir:
+            df = self.load(symbol, timeframe)
+        return df.copy() if df is not None else None
+
+    def last_timestamp(self, symbol, timeframe):
+        """
+        Timestamp of the newest stored bar, or None
+        """
+        with self._lock:
+            df = self._bars.get((symbol, timeframe))
+        if df is None and self.cache_dir:
+            df = self.load(symbol, timeframe)
+        if df is None or df.empty:
+            return None
+        return df.index[-1]
+
+    def fetch_start(self, symbol, timeframe):
+        """
+        Where the next download should start: the last stored bar (it may
+        have been incomplete when fetched), or None if a full download is
+        needed because nothing usable is stored
+        """
+        last = self.last_timestamp(symbol, timeframe)
+        if last is None:
+            return None
+        now = self.clock() if self.clock else pd.Timestamp.now(tz=last.tz)
+        if now - last > pd.Timedelta(days=self.days):
+            return None
+        return last
+
+    def merge(self, symbol, timeframe, new_bars):
+        """
+        Merge freshly downloaded bars into the store
+        Newer copies of a bar replace older ones, and history is trimmed to
+        the last `days` sessions. Failing to write the cache directory is
+        logged, not raised
+        Returns: a copy of the merged frame
+        """
+        columns = [c for c in OHLCV_COLUMNS if c in new_bars.columns]
+        new_bars = new_bars[columns]
+        if new_bars.index.tz is None:
+            new_bars = new_bars.tz_localize(self.tz)
+
+        with self._series_lock(symbol, timeframe):
+            return self._merge(symbol, timeframe, new_bars)
+
+    def _merge(self, symbol, timeframe, new_bars):
+        if self.cache_dir and (symbol, timeframe) not in self._bars:
+            # Merge into the history on disk, not over it
+            self.load(symbol, timeframe)
+
+        with self._lock:
+            old = self._bars.get((symbol, timeframe))
+            if old is not None and not old.empty:
+                merged = pd.concat([old, new_bars])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            else:
+                merged = new_bars.sort_index()
+
+            history = merged
+            sessions = merged.index.normalize().unique()
+            if len(sessions) > self.days:
+                merged = merged[merged.index >= sessions[-self.days]]
+
+            self._bars[(symbol, timeframe)] = merged
+
+        if self.cache_dir:
+            # Only the days the download touched (normally just today);
+            # days trimmed from memory still go to disk
+            touched = new_bars.index.tz_convert(self.tz).normalize().unique()
+            try:
+                self.save(symbol, timeframe, history, days=touched)
+            except OSError as e:
+                log.warning("Error writing bar cache %s %s: %s", symbol, timeframe, e)
+
+        return merged.copy()
+
+    def save(self, symbol, timeframe, df, days=None):
+        """
+        Write one file per trading day of a series to the cache directory
+        days: the days to write (default: every day in df)
+        """
+        series_dir = self._series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+
+        local = df.index.tz_convert(self.tz).normalize()
+        if days is None:
+            days = local.unique()
+        for day in days:
+            bars = df[local == day]
+            if bars.empty:
+                continue
+            # Row 0: epoch seconds, rows 1-5: OHLCV
+            data = np.empty((1 + len(OHLCV_COLUMNS), len(bars)), dtype=np.float64)
+            data[0] = bars.index.as_unit('s').asi8
+            for i, col in enumerate(OHLCV_COLUMNS, 1):
+                data[i] = bars[col].to_numpy(dtype=np.float64) if col in bars.columns else np.nan
+
+            path = os.path.join(series_dir, day.strftime('%Y-%m-%d') + DAY_FILE_SUFFIX)
+            # Unique per writer: other threads and worker processes may be
+            # writing the same day
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, data)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _read_day(self, path):
+        data = np.load(path, mmap_mode='r')
+        index = pd.DatetimeIndex(
+            data[0].astype('datetime64[s]'), name='Datetime'
+        ).tz_localize('UTC').tz_convert(self.tz)
+        # Column block is a view of the mapped file, not a parsed copy
+        return pd.DataFrame(data[1:].T, index=index, columns=OHLCV_COLUMNS, copy=False)
+
+    def load(self, symbol, timeframe):
+        """
+        Load the last `days` trading days of one series from the cache
+        directory into memory
+        """
+        days = self.stored_days(symbol, timeframe)[-self.days:]
+        if not days:
+            return None
+        series_dir = self._series_dir(symbol, timeframe)
+        try:
+            parts = [self._read_day(os.path.join(series_dir, day + DAY_FILE_SUFFIX)) for day in days]
+        except Exception as e:
+            log.warning("Error reading bar cache %s: %s", series_dir, e)
+            return None
+        # A single day would be cached as a view of its mapped file, which
+        # keeps the file open and blocks save() replacing it on Windows
+        df = pd.concat(parts) if len(parts) > 1 else parts[0].copy()
+        with self._lock:
+            df = self._bars.setdefault((symbol, timeframe), df)
+        return df
+
+    def history(self, symbol, timeframe, start=None, end=None):
+        """
+        Every stored day of a series between start and end (YYYY-MM-DD,
+        inclusive), for backtests; not kept in memory
+        """
+        days = [d for d in self.stored_days(symbol, timeframe)
+                if (start is None or d >= start) and (end is None or d <= end)]
+        if not days:
+            return None
+        series_dir = self._series_dir(symbol, timeframe)
+        return pd.concat([self._read_day(os.path.join(series_dir, day + DAY_FILE_SUFFIX))
+                          for day in days])
+
+    def clear(self):
+        with self._lock:
+            self._bars.clear()
@@ -0,0 +1,176 @@
+"""
+PACPL Screener - Offline Benchmarks
+Times the scan entry points on a seeded synthetic market (no network)
+and checks them against a saved JSON baseline
+
+    python benchmark.py                                  # run and print
+    python benchmark.py --save benchmark_baseline.json   # record a baseline
+    python benchmark.py --compare benchmark_baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+import screener_logic
+from bar_store import BarStore
+from signal_state import SignalStateStore
+from symbol_health import SymbolHealth
+from synthetic_market import SyntheticMarket
+
+SIZES = [50, 180, 500]
+
+# Entry point -> function(symbols, timeframes) running it to completion
+CASES = {
+    'scan_stock': lambda symbols, tfs: [screener_logic.scan_stock(s, tfs[0]) for s in symbols],
+    'scan_stock_dual_tf': lambda symbols, tfs: [screener_logic.scan_stock_dual_tf(s, tfs) for s in symbols],
+    'scan_all_stocks': lambda symbols, tfs: screener_logic.scan_all_stocks(symbols, tfs),
+    'scan_stocks_generator': lambda symbols, tfs: list(screener_logic.scan_stocks_generator(symbols, tfs)),
+}
+
+# Slower than baseline by more than this share (and NOISE_SECS) is a regression
+TOLERANCE = 0.25
+NOISE_SECS = 0.05
+
+
+def symbols_for(size):
+    return [f"SYN{i:03d}.NS" for i in range(size)]
+
+
+@contextlib.contextmanager
+def use_market(market):
+    """
+    Serve screener_logic's data from `market` (any provider), with fresh
+    in-memory caches
+    """
+    saved = {name: getattr(screener_logic, name) for name in (
+        'PROVIDER', 'TICKER_HISTORY', 'BATCH_DOWNLOADER', 'SYMBOL_HEALTH', 'BAR_STORE',
+        'DAILY_LEVELS_CACHE', 'INDICATOR_STATES', 'SIGNAL_STATES', 'FETCH_MODE')}
+    screener_logic.PROVIDER = market
+    screener_logic.TICKER_HISTORY = market.history
+    screener_logic.BATCH_DOWNLOADER = market.download
+    screener_logic.SYMBOL_HEALTH = SymbolHealth()
+    screener_logic.BAR_STORE = BarStore(clock=market.now) if config.BAR_STORE_ENABLED else None
+    screener_logic.DAILY_LEVELS_CACHE = {}
+    screener_logic.INDICATOR_STATES = {}
+    screener_logic.SIGNAL_STATES = SignalStateStore()
+    screener_logic.FETCH_MODE = "batch"
+    try:
+        yield market
+    finally:
+        for name, value in saved.items():
+            setattr(screener_logic, name, value)
+
+
+def time_case(case, size, market, repeat=3, timeframes=None):
+    """
+    Cold: first scan with empty caches; warm: the next scan of the same
+    bars, served from the bar store and incremental indicators
+    Returns: dict of median seconds per mode
+    """
+    timeframes = timeframes or config.TIMEFRAMES
+    symbols = symbols_for(size)
+    # Generate the bars up front; only the scan is timed
+    for symbol in symbols:
+        market.bars(symbol)
+
+    cold, warm = [], []
+    for _ in range(repeat):
+        with use_market(market):
+            started = time.perf_counter()
+            CASES[case](symbols, timeframes)
+            cold.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            CASES[case](symbols, timeframes)
+            warm.append(time.perf_counter() - started)
+    return {
+        'cold_s': round(statistics.median(cold), 4),
+        'warm_s': round(statistics.median(warm), 4),
+        'cold_ms_per_symbol': round(statistics.median(cold) / size * 1000, 3),
+    }
+
+
+def run(cases=None, sizes=None, repeat=3, seed=0, log=print):
+    """
+    Time every case at every size
+    Returns: JSON-ready dict with the environment and the timings
+    """
+    market = SyntheticMarket(seed=seed, days=5, today_bars=200)
+    results = {}
+    for case in cases or CASES:
+        for size in sizes or SIZES:
+            timing = time_case(case, size, market, repeat)
+            results.setdefault(case, {})[str(size)] = timing
+            log(f"{case:>22} {size:>4} symbols: cold {timing['cold_s']:.3f}s  warm {timing['warm_s']:.3f}s")
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'settings': {
+            'seed': seed, 'repeat': repeat, 'timeframes': config.TIMEFRAMES,
+            'panel_engine': config.PANEL_ENGINE, 'eval_processes': config.EVAL_PROCESSES,
+            'incremental_indicators': config.INCREMENTAL_INDICATORS,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    """
+    Timings slower than the baseline beyond tolerance
+    Returns: list of (case, size, mode, baseline seconds, current seconds)
+    """
+    regressions = []
+    for case, sizes in current['results'].items():
+        for size, timing in sizes.items():
+            base = baseline.get('results', {}).get(case, {}).get(size)
+            if base is None:
+                continue
+            for mode in ('cold_s', 'warm_s'):
+                if timing[mode] > base[mode] * (1 + tolerance) and timing[mode] - base[mode] > NOISE_SECS:
+                    regressions.append((case, int(size), mode[:-2], base[mode], timing[mode]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scan benchmarks on synthetic data")
+    parser.add_argument('--cases', nargs='*', choices=list(CASES))
+    parser.add_argument('--sizes', nargs='*', type=int)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    current = run(args.cases, args.sizes, args.repeat, args.seed)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for case, size, mode, before, after in regressions:
+            print(f"REGRESSION {case} {size} symbols ({mode}): {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", args.compare)
+
+
+if __name__ == '__main__':
+    main()
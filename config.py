@@ -18,16 +18,77 @@ ORB_MINS = 15            # Opening Range Minutes
 TOL_PCT = 0.05           # PDH/PDL Retest Tolerance %
 RETEST_LOOK = 12         # PDH/PDL Retest Lookback (bars)
 
+# Targets (enrich_signals_with_targets)
+ENTRY_BUFFER = 1.0       # Entry this far beyond the signal bar's high / low
+SL_ATR_MULT = 2.0        # Risk = ATR(14) x this (0.5% of entry without ATR)
+REWARD_RISK = 1.5        # TP = entry + risk x this
+
 # Dual Timeframe settings
 TIMEFRAMES = ["1m", "2m"]  # 1-minute and 2-minute timeframes (Yahoo Finance compatible)
 REFRESH_INTERVAL = 600      # Refresh every 10 minutes (600 seconds)
 
+# Data fetch settings
+BATCH_SIZE = 50             # Symbols per bulk yfinance download request
+DERIVE_TIMEFRAMES = True    # Fetch only the finest timeframe and resample the rest locally
+BAR_STORE_ENABLED = True    # Keep bar history between scans and only fetch new bars
+BAR_STORE_DIR = "bar_cache" # Day-partitioned bar files kept across restarts (None = memory only)
+FETCH_MODE = "batch"        # "batch": bulk yfinance downloads, "async": concurrent chart API requests
+FETCH_CONCURRENCY = 8       # Max requests in flight across all scans (async mode)
+FETCH_RATE = 4.0            # Requests per second per host (async mode)
+FETCH_BURST = 8             # Requests allowed back to back before the rate limit applies
+FETCH_RETRIES = 3           # Retries on 429 / 5xx / connection errors
+FETCH_BACKOFF = 0.5         # First retry delay in seconds, doubled (with jitter) each attempt
+FETCH_TIMEOUT = 10          # Seconds per request
+CHART_API_URL = "https://query2.finance.yahoo.com/v8/finance/chart"
+
+# Market data provider (providers.py)
+DATA_PROVIDER = "yfinance"  # "yfinance": live downloads, "replay": play back a recorded session
+REPLAY_DIR = BAR_STORE_DIR  # Recorded 1m day files to replay (the bar store writes them while live)
+REPLAY_DATE = None          # Session to replay (YYYY-MM-DD, None = the latest recorded)
+REPLAY_START = None         # Time of day the replay starts (HH:MM, None = session open)
+REPLAY_SPEED = 60           # 1 = real time, 60 = a minute per second, 0 = as fast as the scans go
+
+# Symbols returning no data are skipped for a while instead of forever
+SYMBOL_FAIL_TTL = 300               # Skip after the first failure (seconds), doubled per repeat
+SYMBOL_FAIL_MAX_TTL = 86400         # Longest skip
+SYMBOL_HEALTH_FILE = "symbol_health.json"  # Shared by all workers (None = per process)
+
+# Signal evaluation
+PANEL_ENGINE = True         # Evaluate each chunk of stocks at once with NumPy arrays
+INCREMENTAL_INDICATORS = True  # Update ATR / ORB / PDH-PDL breaks from new bars only
+SCAN_WORKERS = 5            # Threads scanning stocks when PANEL_ENGINE is off
+EVAL_PROCESSES = 0          # Worker processes evaluating signals (0 = evaluate in the scan thread)
+SIGNAL_STATE = True         # Signals stay active from first trigger to SL / TP; scans send only the changes
+
 # Trading session time (IST)
 SESSION_START = "09:15"
 SESSION_END = "15:30"
 AFTER_918_MINS = 558     # 9:18 AM in minutes (9*60 + 18)
 
+# Background scan scheduler
+SCHEDULER_ENABLED = True    # Pre-scan on every bar close during the session (off while LIVE_FEED is on)
+SCHEDULER_DELAY_SECS = 5    # Wait after a bar closes so the provider has published it
+SCAN_UNIVERSES = ["fno", "nifty50"]  # Universes (universes.py) pre-scanned with the stock list, shared symbols once
+SECTOR_VIEWS = True         # Also stream each sector of the pre-scanned stocks (?universe=sector:<sector>)
+
+# Push ingestion (live_feed.py): bars arrive as events and only their symbol is re-evaluated
+LIVE_FEED = None            # None: poll on bar close, "tcp": bars pushed to LIVE_FEED_PORT, "replay": the replay provider
+LIVE_FEED_HOST = "127.0.0.1"  # Interface the TCP feed listens on
+LIVE_FEED_PORT = 9100       # One JSON bar per line (see live_feed.py)
+
 # Server settings
 HOST = "0.0.0.0"
 PORT = 5000
 DEBUG = True
+
+# Scan stream (/api/scan/stream)
+SSE_PROGRESS_EVERY = 25     # Compact stream: one progress event per this many scanned stocks
+SSE_REPLAY_RUNS = 16        # Recent scans kept for resuming dropped streams (Last-Event-ID)
+ASGI_THREADS = 16           # asgi.py: threads for license checks and non-stream (Flask) routes
+
+# Backtesting (backtest.py)
+BACKTEST_CHUNK = 25         # Symbols evaluated together (bounds memory: chunk x days x bars per day)
+
+# Logging and instrumentation
+LOG_LEVEL = "INFO"          # DEBUG logs every signal check (slow, for troubleshooting only)
+METRICS_ENABLED = True      # Per-stage scan timing counters, served on /api/metrics
@@ -0,0 +1,195 @@
+"""
+PACPL Screener - Process Pool Evaluation Stage
+Evaluates signals in worker processes so the signal maths runs on every
+core instead of sharing the GIL with the fetch threads. Each chunk's bars
+are packed into one shared-memory block; workers map it instead of
+receiving pickled DataFrames.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import threading
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+import config
+from metrics import timed
+
+log = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ROW_WIDTH = 1 + len(OHLCV_COLUMNS)   # int64 timestamp + float64 OHLCV, 8 bytes each
+
+
+def pack_frames(frames):
+    """
+    Copy a chunk's frames into one shared-memory block
+    frames: dict of symbol -> {timeframe: DataFrame or None}
+    Returns: (SharedMemory, layout) where layout lists
+             (symbol, timeframe, offset, rows, tz) per series (offset None if no frame)
+    """
+    layout = []
+    offset = 0
+    for symbol, tf_frames in frames.items():
+        for tf, df in tf_frames.items():
+            if df is None or df.empty:
+                layout.append((symbol, tf, None, 0, None))
+                continue
+            layout.append((symbol, tf, offset, len(df), str(df.index.tz) if df.index.tz else None))
+            offset += len(df) * ROW_WIDTH * 8
+
+    shm = SharedMemory(create=True, size=max(offset, 1))
+    for symbol, tf, start, rows, tz in layout:
+        if start is None:
+            continue
+        df = frames[symbol][tf]
+        stamps = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=start)
+        stamps[:] = df.index.as_unit('ns').asi8
+        values = np.ndarray((len(OHLCV_COLUMNS), rows), dtype=np.float64,
+                            buffer=shm.buf, offset=start + rows * 8)
+        for i, col in enumerate(OHLCV_COLUMNS):
+            values[i] = df[col].to_numpy(dtype=np.float64) if col in df.columns else np.nan
+        del stamps, values
+    return shm, layout
+
+
+def unpack_frames(buf, layout):
+    """
+    Rebuild the frames of a layout from a shared-memory buffer
+    The frames own their data, so the block can be closed afterwards
+    """
+    frames = {}
+    for symbol, tf, start, rows, tz in layout:
+        tf_frames = frames.setdefault(symbol, {})
+        if start is None:
+            tf_frames[tf] = None
+            continue
+        stamps = np.ndarray((rows,), dtype=np.int64, buffer=buf, offset=start).copy()
+        values = np.ndarray((len(OHLCV_COLUMNS), rows), dtype=np.float64,
+                            buffer=buf, offset=start + rows * 8).copy()
+        index = pd.DatetimeIndex(stamps.view('datetime64[ns]'), name='Datetime')
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        tf_frames[tf] = pd.DataFrame(dict(zip(OHLCV_COLUMNS, values)), index=index)
+    return frames
+
+
+def evaluate_packed(shm_name, layout, timeframes, panel):
+    """
+    Worker task: evaluate the stocks of a layout from shared memory
+    Returns: list of (symbol, result) pairs, result is None if the stock failed
+    """
+    import screener_logic
+
+    # Spawned workers share the parent's resource tracker, and the parent
+    # unlinks the block once every task of the chunk is done
+    shm = SharedMemory(name=shm_name)
+    try:
+        frames = unpack_frames(shm.buf, layout)
+    finally:
+        shm.close()
+
+    if panel:
+        from panel_engine import scan_panel_dual_tf
+        return list(scan_panel_dual_tf(frames, timeframes).items())
+
+    results = []
+    for symbol, tf_frames in frames.items():
+        try:
+            results.append((symbol, screener_logic.scan_stock_dual_tf(symbol, timeframes, tf_frames)))
+        except Exception:
+            log.exception("%s generated an exception", symbol)
+            results.append((symbol, None))
+    return results
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(processes=None):
+    """
+    Shared worker pool, started on first use
+    Workers are spawned rather than forked, since the server has threads running
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes or config.EVAL_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _POOL
+
+
+def shutdown_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(cancel_futures=True)
+            _POOL = None
+
+
+def evaluate_chunks(chunks, timeframes, pool=None, panel=None, max_pending=2):
+    """
+    Evaluate a stream of (chunk, frames) pairs on the process pool
+    Chunks are submitted as they arrive, so the next chunk downloads while
+    workers evaluate the previous ones; at most `max_pending` chunks are
+    held in shared memory at a time
+    Yields: (symbol, result) pairs as workers finish
+    """
+    if pool is None:
+        pool = get_pool()
+    if panel is None:
+        panel = config.PANEL_ENGINE
+    workers = getattr(pool, '_max_workers', None) or config.EVAL_PROCESSES or 1
+
+    pending = []   # (SharedMemory, {future: symbols}) per chunk, oldest first
+
+    def drain(entry):
+        shm, futures = entry
+        try:
+            for future, part in futures.items():
+                try:
+                    with timed('eval_wait'):
+                        results = future.result()
+                except Exception:
+                    log.exception("Evaluation worker failed")
+                    # Report the stocks of the failed task as failed, not missing
+                    results = [(symbol, None) for symbol in part]
+                yield from results
+        finally:
+            shm.close()
+            shm.unlink()
+
+    try:
+        for chunk, frames in chunks:
+            with timed('pack'):
+                shm, layout = pack_frames(frames)
+            # Split the chunk's stocks evenly between the workers
+            symbols = list(frames)
+            step = max(1, -(-len(symbols) // workers))
+            futures = {}
+            for i in range(0, len(symbols), step):
+                part = set(symbols[i:i + step])
+                part_layout = [entry for entry in layout if entry[0] in part]
+                future = pool.submit(evaluate_packed, shm.name, part_layout, list(timeframes), panel)
+                futures[future] = symbols[i:i + step]
+            pending.append((shm, futures))
+
+            while len(pending) >= max_pending:
+                yield from drain(pending.pop(0))
+
+        while pending:
+            yield from drain(pending.pop(0))
+    finally:
+        # Generator closed early: free the blocks still in flight
+        for shm, futures in pending:
+            for future in futures:
+                future.cancel()
+            concurrent.futures.wait(futures)
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,254 @@
+"""
+PACPL Screener - Incremental Indicator State
+Keeps Wilder's ATR, the opening range and the PDH/PDL break flags of one
+(symbol, timeframe) up to date bar by bar, so a scan only does O(1) work
+per new bar instead of recomputing over the whole history
+"""
+
+import copy
+import math
+import threading
+import pandas as pd
+
+from config import ORB_MINS
+
+ATR_LENGTH = 14
+
+
+class IndicatorState:
+    """
+    Indicator values as of the last committed (closed) bar
+    The newest bar of a frame may still be forming, so it is never
+    committed: advance() applies it to a throwaway copy instead
+    Scans and the live feed share states, so advance() holds the state's
+    lock and update() skips bars that are not newer than the last one
+    """
+
+    FIELDS = [
+        'orb_mins', 'length', 'last_ts', 'last_close', 'count', 'tf_mins', 'first_ts',
+        'atr', 'prev_close', 'day', 'session_bars', 'session_high', 'session_low',
+        'session_close', 'pdc', 'pdh', 'pdl', 'orb_high', 'orb_low', 'broke_pdh', 'broke_pdl',
+    ]
+
+    def __init__(self, orb_mins=ORB_MINS, length=ATR_LENGTH):
+        self.orb_mins = orb_mins
+        self.length = length
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.last_ts = None
+        self.last_close = None
+        self.count = 0
+        self.tf_mins = None
+        self.first_ts = None
+        self.atr = math.nan
+        self.prev_close = math.nan
+        self.day = None
+        self.session_bars = 0
+        self.session_high = None
+        self.session_low = None
+        self.session_close = None
+        self.pdc = None
+        self.pdh = None
+        self.pdl = None
+        self.orb_high = None
+        self.orb_low = None
+        self.broke_pdh = False
+        self.broke_pdl = False
+
+    @property
+    def orb_bars(self):
+        tf_mins = self.tf_mins or 5
+        return max(1, int(self.orb_mins / tf_mins))
+
+    def update(self, ts, high, low, close):
+        """
+        Commit one closed bar (ignored unless newer than the last one)
+        """
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+        # Candle size from the first two bars, like calculate_orb
+        if self.first_ts is None:
+            self.first_ts = ts
+        elif self.tf_mins is None:
+            self.tf_mins = int((ts - self.first_ts).total_seconds() / 60)
+
+        # Wilder's RMA of true range, same recurrence as pandas ewm(adjust=False)
+        tr = high - low
+        if self.prev_close == self.prev_close:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        if self.atr != self.atr:
+            self.atr = tr
+        elif self.atr != tr:
+            alpha = 1.0 / self.length
+            old_wt = 1.0 - alpha
+            self.atr = (old_wt * self.atr + alpha * tr) / (old_wt + alpha)
+        self.prev_close = close
+
+        # New session: yesterday's range becomes PDC/PDH/PDL
+        day = ts.date()
+        if day != self.day:
+            if self.day is not None:
+                self.pdc = self.session_close
+                self.pdh = self.session_high
+                self.pdl = self.session_low
+            self.day = day
+            self.session_bars = 0
+            self.session_high = high
+            self.session_low = low
+            self.orb_high = None
+            self.orb_low = None
+            self.broke_pdh = False
+            self.broke_pdl = False
+        else:
+            self.session_high = max(self.session_high, high)
+            self.session_low = min(self.session_low, low)
+        self.session_close = close
+        self.session_bars += 1
+
+        if self.session_bars <= self.orb_bars:
+            self.orb_high = high if self.orb_high is None else max(self.orb_high, high)
+            self.orb_low = low if self.orb_low is None else min(self.orb_low, low)
+
+        if self.pdh is not None and close > self.pdh:
+            self.broke_pdh = True
+        if self.pdl is not None and close < self.pdl:
+            self.broke_pdl = True
+
+        self.last_ts = ts
+        self.last_close = close
+        self.count += 1
+
+    def _in_sync(self, df):
+        """
+        True if the last committed bar is still in df unchanged
+        """
+        if self.last_ts is None:
+            return False
+        pos = df.index.searchsorted(self.last_ts)
+        return (pos < len(df) and df.index[pos] == self.last_ts
+                and df['Close'].iloc[pos] == self.last_close)
+
+    def _bootstrap(self, df):
+        """
+        Build the state from a whole history at once (vectorized)
+        """
+        from screener_logic import SessionIndex
+
+        self.reset()
+        if len(df) == 0:
+            return
+
+        high = df['High'].to_numpy(dtype=float)
+        low = df['Low'].to_numpy(dtype=float)
+        close = df['Close'].to_numpy(dtype=float)
+
+        self.first_ts = df.index[0]
+        if len(df) > 1:
+            self.tf_mins = int((df.index[1] - df.index[0]).total_seconds() / 60)
+
+        prev_close = df['Close'].shift(1)
+        tr = pd.concat([df['High'] - df['Low'], (df['High'] - prev_close).abs(),
+                        (df['Low'] - prev_close).abs()], axis=1).max(axis=1)
+        self.atr = float(tr.ewm(alpha=1 / self.length, adjust=False).mean().iloc[-1])
+        self.prev_close = float(close[-1])
+
+        session = SessionIndex(df.index)
+        today = session.today()
+        if len(session) >= 2:
+            prev = session.previous()
+            self.pdc = float(close[prev][-1])
+            self.pdh = float(high[prev].max())
+            self.pdl = float(low[prev].min())
+
+        self.day = df.index[-1].date()
+        self.session_bars = len(close[today])
+        self.session_high = float(high[today].max())
+        self.session_low = float(low[today].min())
+        self.session_close = float(close[-1])
+        orb = slice(today.start, today.start + self.orb_bars)
+        self.orb_high = float(high[orb].max())
+        self.orb_low = float(low[orb].min())
+        if self.pdh is not None:
+            self.broke_pdh = bool((close[today] > self.pdh).any())
+            self.broke_pdl = bool((close[today] < self.pdl).any())
+
+        self.last_ts = df.index[-1]
+        self.last_close = float(close[-1])
+        self.count = len(df)
+
+    def advance(self, df):
+        """
+        Bring the state up to date with df and return the indicator values
+        as of df's last bar
+        Only bars newer than the last committed one are processed; if df
+        doesn't continue the stored history the state is rebuilt from it
+        """
+        if len(df) == 0:
+            return None
+
+        closed = df.iloc[:-1]
+        with self._lock:
+            if self._in_sync(closed):
+                start = closed.index.searchsorted(self.last_ts, side='right')
+                new_bars = closed.iloc[start:]
+                for ts, h, l, c in zip(new_bars.index, new_bars['High'].to_numpy(),
+                                       new_bars['Low'].to_numpy(), new_bars['Close'].to_numpy()):
+                    self.update(ts, float(h), float(l), float(c))
+                current = copy.copy(self)
+            elif self.last_ts is not None and len(closed) and closed.index[-1] < self.last_ts:
+                # An older frame than another thread already committed:
+                # evaluate it without rewinding the state
+                current = IndicatorState(self.orb_mins, self.length)
+                current._bootstrap(closed)
+            else:
+                self._bootstrap(closed)
+                current = copy.copy(self)
+
+        # Apply the (possibly forming) last bar to the copy only
+        last = df.iloc[-1]
+        current.update(df.index[-1], float(last['High']), float(last['Low']), float(last['Close']))
+        return current.values()
+
+    def values(self):
+        return {
+            'atr': self.atr,
+            'orb_high': self.orb_high,
+            'orb_low': self.orb_low,
+            'pdc': self.pdc,
+            'pdh': self.pdh,
+            'pdl': self.pdl,
+            'broke_pdh': self.broke_pdh,
+            'broke_pdl': self.broke_pdl,
+        }
+
+    def to_dict(self):
+        """
+        JSON-friendly copy of the state, for saving between scans
+        """
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, pd.Timestamp):
+                value = {'ts': value.isoformat()}
+            elif name == 'day' and value is not None:
+                value = value.isoformat()
+            elif isinstance(value, float) and math.isnan(value):
+                value = None
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['orb_mins'], data['length'])
+        for name in cls.FIELDS:
+            value = data.get(name)
+            if isinstance(value, dict) and 'ts' in value:
+                value = pd.Timestamp(value['ts'])
+            elif name == 'day' and value is not None:
+                value = pd.Timestamp(value).date()
+            elif name in ('atr', 'prev_close') and value is None:
+                value = math.nan
+            setattr(state, name, value)
+        return state
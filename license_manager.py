@@ -1,60 +1,171 @@
 import json
 import os
+import sqlite3
+import threading
+import uuid
 from datetime import datetime, timedelta
 
-LICENSE_FILE = "licenses.json"
+# Next to this module, whatever the working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LICENSE_DB = os.path.join(BASE_DIR, "licenses.db")
+LICENSE_FILE = os.path.join(BASE_DIR, "licenses.json")   # Old JSON store, imported into LICENSE_DB once
+MAX_BATCH_KEYS = 1000   # Most keys one generate_keys() request may issue
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS licenses (
+    key TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    expiry TEXT NOT NULL,           -- YYYY-MM-DD
+    created_at TEXT NOT NULL,       -- YYYY-MM-DD
+    device_id TEXT                  -- NULL until first use
+);
+CREATE INDEX IF NOT EXISTS idx_licenses_expiry ON licenses (expiry);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# One connection per thread (and per worker process), opened on first use
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != LICENSE_DB:
+        conn = sqlite3.connect(LICENSE_DB, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers (validation) run while another worker writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.path = LICENSE_DB
+    return conn
 
 def init_licenses():
-    if not os.path.exists(LICENSE_FILE):
-        with open(LICENSE_FILE, "w") as f:
-            json.dump({}, f)
+    _connect()
+    migrate_json()
+
+def migrate_json(path=None):
+    """
+    Import licenses.json into the database, once
+    Returns the number of licenses imported
+    """
+    path = path or LICENSE_FILE
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        done = conn.execute("SELECT value FROM meta WHERE name = 'json_migrated'").fetchone()
+        if done is not None or not os.path.exists(path):
+            conn.execute("COMMIT")
+            return 0
+        with open(path, "r") as f:
+            licenses = json.load(f)
+        conn.executemany(
+            "INSERT OR IGNORE INTO licenses (key, user, expiry, created_at, device_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(key, lic.get("user", ""), lic["expiry"], lic.get("created_at", lic["expiry"]),
+              lic.get("device_id")) for key, lic in licenses.items()]
+        )
+        conn.execute("INSERT INTO meta (name, value) VALUES ('json_migrated', ?)",
+                     (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        conn.execute("COMMIT")
+        return len(licenses)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _as_dict(row):
+    lic = {"user": row["user"], "expiry": row["expiry"], "created_at": row["created_at"]}
+    if row["device_id"] is not None:
+        lic["device_id"] = row["device_id"]
+    return lic
 
 def load_licenses():
-    init_licenses()
-    with open(LICENSE_FILE, "r") as f:
-        return json.load(f)
+    rows = _connect().execute("SELECT * FROM licenses ORDER BY created_at, key")
+    return {row["key"]: _as_dict(row) for row in rows}
 
-def save_licenses(licenses):
-    with open(LICENSE_FILE, "w") as f:
-        json.dump(licenses, f, indent=4)
+def list_licenses(page=1, per_page=50, expiring_before=None):
+    """
+    One page of licenses, newest first
+    expiring_before: only licenses expiring before this YYYY-MM-DD date
+    Returns: (dict of key -> license, total matching)
+    """
+    page = max(1, int(page))
+    per_page = max(1, min(int(per_page), 500))
+    where, params = "", []
+    if expiring_before:
+        where, params = "WHERE expiry < ?", [expiring_before]
 
-def generate_key(user_name, days=30):
-    import uuid
+    conn = _connect()
+    total = conn.execute(f"SELECT COUNT(*) FROM licenses {where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT * FROM licenses {where} ORDER BY created_at DESC, key LIMIT ? OFFSET ?",
+        params + [per_page, (page - 1) * per_page]
+    )
+    return {row["key"]: _as_dict(row) for row in rows}, total
+
+def _new_key(user_name):
     key = str(uuid.uuid4())[:8].upper()
-    full_key = f"PACPL-{user_name[:3].upper()}-{key}"
-    
+    return f"PACPL-{user_name[:3].upper()}-{key}"
+
+def generate_keys(user_name, count, days=30):
+    """
+    Issue `count` keys for one customer in a single transaction
+    Returns: list of keys, and their expiry date
+    """
     expiry_date = (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d")
-    
-    licenses = load_licenses()
-    licenses[full_key] = {
-        "user": user_name,
-        "expiry": expiry_date,
-        "created_at": datetime.now().strftime("%Y-%m-%d")
-    }
-    save_licenses(licenses)
-    return full_key, expiry_date
+    created_at = datetime.now().strftime("%Y-%m-%d")
+
+    conn = _connect()
+    keys = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        while len(keys) < count:
+            key = _new_key(user_name)
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO licenses (key, user, expiry, created_at) VALUES (?, ?, ?, ?)",
+                (key, user_name, expiry_date, created_at)
+            )
+            # A clash with an existing key is simply retried
+            if cur.rowcount == 1:
+                keys.append(key)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return keys, expiry_date
+
+def generate_key(user_name, days=30):
+    keys, expiry_date = generate_keys(user_name, 1, days)
+    return keys[0], expiry_date
 
 def validate_license(key, device_id=None):
-    licenses = load_licenses()
-    if key not in licenses:
+    conn = _connect()
+    lic = conn.execute("SELECT * FROM licenses WHERE key = ?", (key,)).fetchone()
+    if lic is None:
         return False, "Invalid License Key"
-    
-    lic = licenses[key]
+
     expiry_str = lic["expiry"]
     expiry_date = datetime.strptime(expiry_str, "%Y-%m-%d")
-    
+
     if datetime.now() > expiry_date:
         return False, "License Expired"
-    
+
     # Device Locking Logic
     if device_id:
-        if "device_id" not in lic:
-            # First time use, lock to this device
-            lic["device_id"] = device_id
-            save_licenses(licenses)
-            return True, "Success (Locked to Device)"
-        elif lic["device_id"] != device_id:
+        if lic["device_id"] is None:
+            # First time use, lock to this device. The update only succeeds
+            # if no other worker locked the key in the meantime
+            cur = conn.execute(
+                "UPDATE licenses SET device_id = ? WHERE key = ? AND device_id IS NULL",
+                (device_id, key)
+            )
+            if cur.rowcount == 1:
+                return True, "Success (Locked to Device)"
+            lic = conn.execute("SELECT * FROM licenses WHERE key = ?", (key,)).fetchone()
+        if lic["device_id"] != device_id:
             # Different device trying to use same key
             return False, "Key already in use on another device"
-    
+
     return True, "Success"
@@ -0,0 +1,368 @@
+"""
+PACPL Screener - Push Bar Ingestion
+Bars arrive as events instead of being polled: from a TCP line feed (a
+local stand-in for a broker websocket) or from the replay provider. Each
+update re-evaluates only its symbol, and newly triggered signals are
+published straight to the live stream (/api/live/stream).
+
+A bar message is one JSON object per line:
+
+    {"symbol": "RELIANCE.NS", "time": 1770954300, "open": 1402.5,
+     "high": 1404.0, "low": 1401.9, "close": 1403.2, "volume": 51234}
+
+time is the bar's start (epoch seconds or ISO 8601). Sending the same bar
+again replaces it, so a forming bar can be pushed as it updates.
+
+    python live_feed.py --port 9100 --speed 60           # push the latest recorded session
+    python live_feed.py --port 9100 --synthetic 180 --speed 0
+"""
+
+import argparse
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+import pandas as pd
+
+import config
+import screener_logic
+from bar_store import BarStore, OHLCV_COLUMNS
+from metrics import timed
+from scan_coordinator import ScanRun
+
+log = logging.getLogger(__name__)
+
+MESSAGE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+BAR = pd.Timedelta(minutes=1)
+
+
+def parse_bar(message, tz='Asia/Kolkata'):
+    """
+    One bar message -> (symbol, one-row OHLCV frame)
+    """
+    bar = json.loads(message)
+    stamp = bar['time']
+    if isinstance(stamp, (int, float)):
+        stamp = pd.Timestamp(stamp, unit='s', tz='UTC')
+    else:
+        stamp = pd.Timestamp(stamp)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize(tz)
+    index = pd.DatetimeIndex([stamp.tz_convert(tz)], name='Datetime')
+    values = {col: [float(bar[field])] for col, field in zip(OHLCV_COLUMNS, MESSAGE_FIELDS)}
+    return bar['symbol'], pd.DataFrame(values, index=index)
+
+
+def encode_bars(symbol, df):
+    """
+    Bar messages (newline terminated) for the rows of an OHLCV frame
+    """
+    stamps = df.index.as_unit('s').asi8
+    rows = df[OHLCV_COLUMNS].to_numpy()
+    return ''.join(
+        json.dumps({'symbol': symbol, 'time': int(stamp),
+                    **{field: float(value) for field, value in zip(MESSAGE_FIELDS, row)}}) + '\n'
+        for stamp, row in zip(stamps, rows))
+
+
+def _signals(result):
+    if result is None:
+        return {}
+    return {tf: (data.get('signal_type'), data.get('signal_dir'))
+            for tf, data in result['timeframes'].items() if data.get('has_signal')}
+
+
+class LiveScanner:
+    """
+    Event-driven evaluation of pushed 1m bars
+    Updates are queued per symbol and coalesced, so a burst of bars for
+    one symbol costs one evaluation; every other symbol is left alone.
+    Signals go to the session's live run, a ScanRun that stays open until
+    the day changes (subscribe / resume like a scan)
+    store: bar history to merge into (default: the scanner's BAR_STORE)
+    backfill: download a symbol's history from the data provider the first
+    time it is pushed
+    coordinator: ScanCoordinator to swap signal transitions with
+    (SIGNAL_STATE), so neither the live run nor the scans miss the ones
+    the other found first
+    """
+
+    def __init__(self, timeframes=None, store=None, backfill=True, clock=None, coordinator=None):
+        self.timeframes = list(timeframes or config.TIMEFRAMES)
+        if store is None:
+            store = screener_logic.BAR_STORE
+        self.store = store if store is not None else BarStore(clock=clock)
+        self.backfill = backfill
+        self.clock = clock or (lambda: pd.Timestamp.now(tz=self.store.tz))
+        self.coordinator = coordinator
+
+        self.results = {}
+        self.run = None
+        self.evaluations = 0
+        self.last_bar_at = None
+
+        self._pending = {}
+        self._busy = False
+        self._stop = False
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+
+    def push(self, symbol, bars):
+        """
+        Queue new or updated 1m bars of a symbol for evaluation
+        """
+        with self._cond:
+            self._pending.setdefault(symbol, []).append(bars)
+            self._cond.notify_all()
+
+    def push_message(self, message):
+        self.push(*parse_bar(message, self.store.tz))
+
+    def drain(self, timeout=None):
+        """
+        Wait until every queued update has been evaluated
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop)
+                if self._stop:
+                    return
+                pending, self._pending = self._pending, {}
+                self._busy = True
+            for symbol, updates in pending.items():
+                try:
+                    self.evaluate(symbol, pd.concat(updates) if len(updates) > 1 else updates[0])
+                except Exception:
+                    log.exception("Live evaluation of %s failed", symbol)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def current_run(self, day=None):
+        """
+        The live run of a session (default: today by the clock); the
+        previous session's run is finished when the day changes
+        """
+        day = (day if day is not None else self.clock()).normalize()
+        with self._lock:
+            if self.run is None or self.run.key[2] != day:
+                if self.run is not None:
+                    self.run.finish()
+                self.run = ScanRun(('live', tuple(self.timeframes), day))
+                if self.coordinator is not None:
+                    self.coordinator.follow(self.run)
+            return self.run
+
+    def _backfill(self, symbol):
+        try:
+            data = screener_logic.TICKER_HISTORY(symbol, "5d", "1m")
+        except Exception as e:
+            log.warning("Backfill of %s failed: %s", symbol, e)
+            return
+        if not data.empty:
+            self.store.merge(symbol, '1m', data)
+
+    def evaluate(self, symbol, bars):
+        """
+        Merge a symbol's new bars and re-evaluate just that symbol
+        Returns: the new result (its signal triggers and closes are published)
+        """
+        with timed('live'):
+            if self.backfill and self.store.last_timestamp(symbol, '1m') is None:
+                self._backfill(symbol)
+            df = self.store.merge(symbol, '1m', bars)
+            frames = {tf: df if tf == '1m' else screener_logic.resample_ohlcv(df, tf)
+                      for tf in self.timeframes}
+            if config.SIGNAL_STATE:
+                for tf, frame in frames.items():
+                    screener_logic.SIGNAL_STATES.observe(symbol, tf, frame)
+            result = screener_logic.scan_stock_dual_tf(symbol, self.timeframes, frames)
+            if config.SIGNAL_STATE:
+                result = screener_logic.apply_signal_state(result)
+
+        previous = self.results.get(symbol)
+        self.results[symbol] = result
+        self.evaluations += 1
+        self.last_bar_at = df.index[-1]
+
+        run = self.current_run(df.index[-1])
+        if config.SIGNAL_STATE:
+            for event in screener_logic.transition_events(result, result['transitions']):
+                run.publish(event)
+                if self.coordinator is not None:
+                    self.coordinator.share(event, exclude=(run,))
+            return result
+
+        # Publish only what is new: a timeframe that starts signalling or
+        # switches to a different signal
+        before = _signals(previous)
+        if any(before.get(tf) != signal for tf, signal in _signals(result).items()):
+            run.publish({'type': 'signal', 'data': result})
+        return result
+
+    def status(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            'active': self._thread is not None and self._thread.is_alive(),
+            'symbols': len(self.results),
+            'evaluations': self.evaluations,
+            'pending': pending,
+            'signals': sum(1 for r in self.results.values() if r['has_any_signal']),
+            'last_bar_at': self.last_bar_at.strftime('%Y-%m-%d %H:%M:%S') if self.last_bar_at is not None else None,
+        }
+
+
+class _BarHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                self.server.scanner.push_message(line)
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning("Bad bar message from %s: %s", self.client_address[0], e)
+
+
+class BarFeedServer(socketserver.ThreadingTCPServer):
+    """
+    TCP bar feed: each connection sends bar messages, one per line
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, scanner, host, port):
+        self.scanner = scanner
+        super().__init__((host, port), _BarHandler)
+
+
+def serve_tcp(scanner, host=None, port=None):
+    """
+    Accept pushed bars on a background thread
+    Returns: the server (server.server_address has the bound port)
+    """
+    server = BarFeedServer(scanner, host or config.LIVE_FEED_HOST,
+                           config.LIVE_FEED_PORT if port is None else port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info("Accepting pushed bars on %s:%d", *server.server_address[:2])
+    return server
+
+
+def iter_replay_bars(provider, symbols, stop):
+    """
+    Yield a list of (symbol, new bars) after every 1m bar close of a
+    replayed session, until the replay ends or `stop` is set
+    """
+    last = {}
+    while not stop.is_set():
+        batch = []
+        for symbol in symbols():
+            start = last.get(symbol)
+            df = provider.history(symbol, "1d", "1m", start=start + BAR if start is not None else None)
+            if not df.empty:
+                last[symbol] = df.index[-1]
+                batch.append((symbol, df))
+        yield batch
+        now = provider.now()
+        if provider.sleep((now.floor('1min') + BAR - now).total_seconds(), stop):
+            return
+
+
+class ReplayFeed:
+    """
+    Pushes a replayed session's bars into a LiveScanner as they close
+    At replay speed 0 the clock waits for each minute to be evaluated
+    """
+
+    def __init__(self, provider, symbols, scanner):
+        self.provider = provider
+        self.symbols = symbols
+        self.scanner = scanner
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        for batch in iter_replay_bars(self.provider, self.symbols, self._stop):
+            for symbol, bars in batch:
+                self.scanner.push(symbol, bars)
+            if not self.provider.speed:
+                self.scanner.drain()
+        self.scanner.drain()
+        log.info("Replay feed finished at %s", self.provider.now())
+
+
+def start_feed(scanner, provider, symbols):
+    """
+    Start the LIVE_FEED bar source for a scanner
+    symbols: callable returning the symbols to replay
+    """
+    scanner.start()
+    if config.LIVE_FEED == "tcp":
+        return serve_tcp(scanner)
+    if config.LIVE_FEED == "replay":
+        if provider.name != "replay":
+            raise ValueError('LIVE_FEED = "replay" needs DATA_PROVIDER = "replay"')
+        feed = ReplayFeed(provider, symbols, scanner)
+        feed.start()
+        return feed
+    raise ValueError(f"Unknown live feed: {config.LIVE_FEED!r}")
+
+
+def main():
+    from providers import RecordedProvider, ReplayProvider
+    from synthetic_market import SyntheticMarket
+
+    parser = argparse.ArgumentParser(description="Push a replayed session to a TCP bar feed")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=config.LIVE_FEED_PORT)
+    parser.add_argument('--speed', type=float, default=config.REPLAY_SPEED)
+    parser.add_argument('--date', default=config.REPLAY_DATE)
+    parser.add_argument('--start', default=config.REPLAY_START, help='Time of day to start at (HH:MM)')
+    parser.add_argument('--dir', default=config.REPLAY_DIR, help='Recorded bar cache to replay')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='Replay N synthetic symbols instead')
+    parser.add_argument('--symbols', nargs='*', help='Symbols to replay (default: the F&O list)')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        source = SyntheticMarket()
+        symbols = [f"SYN{i:03d}.NS" for i in range(args.synthetic)]
+    else:
+        source = RecordedProvider(args.dir, end=args.date)
+        symbols = args.symbols or config.DEFAULT_STOCKS
+    provider = ReplayProvider(source, day=args.date, speed=args.speed, start=args.start)
+
+    started, sent = time.perf_counter(), 0
+    with socket.create_connection((args.host, args.port)) as sock:
+        for batch in iter_replay_bars(provider, lambda: symbols, threading.Event()):
+            payload = ''.join(encode_bars(symbol, df) for symbol, df in batch)
+            sock.sendall(payload.encode())
+            sent += sum(len(df) for _, df in batch)
+    print(f"Pushed {sent} bars in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
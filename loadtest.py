@@ -0,0 +1,99 @@
+"""
+PACPL Screener - Scan Stream Load Test
+Opens many concurrent /api/scan/stream connections against a running
+server and reports how many streams were served to the end, and how fast
+
+    python loadtest.py --url http://127.0.0.1:5000 --clients 500 --license-key KEY
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+async def read_stream(host, port, path, timeout):
+    """
+    One client: (seconds to first event, seconds to end, events received)
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n"
+                     f"Connection: close\r\n\r\n".encode())
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), timeout)
+        if b' 200 ' not in status:
+            raise ConnectionError(status.decode(errors='replace').strip())
+
+        first_event, events = None, 0
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+            if not line:
+                break
+            if line.startswith(b'data:'):
+                events += 1
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+        return first_event, time.perf_counter() - started, events
+    finally:
+        writer.close()
+
+
+async def run_load(url, clients, params=None, timeout=300):
+    """
+    Open `clients` streams at once and wait for all of them
+    Returns a summary dict
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = f"{parts.path.rstrip('/')}/api/scan/stream?{urlencode(params or {})}"
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(read_stream(host, port, path, timeout) for _ in range(clients)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if not isinstance(r, BaseException) and r[2] > 0]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    first = sorted(r[0] for r in ok if r[0] is not None)
+    total = sorted(r[1] for r in ok)
+
+    def pct(values, q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3) if values else None
+
+    return {
+        'clients': clients,
+        'completed': len(ok),
+        'failed': len(errors),
+        'errors': sorted({f"{type(e).__name__}: {e}" for e in errors})[:5],
+        'events': sum(r[2] for r in ok),
+        'elapsed_secs': round(elapsed, 3),
+        'first_event_p50': pct(first, 0.5),
+        'first_event_p95': pct(first, 0.95),
+        'stream_p50': round(statistics.median(total), 3) if total else None,
+        'stream_p95': pct(total, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--license-key', default='')
+    parser.add_argument('--device-id', default='LOADTEST')
+    parser.add_argument('--compact', action='store_true')
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    params = {'license_key': args.license_key, 'device_id': args.device_id}
+    if args.compact:
+        params['compact'] = '1'
+    summary = asyncio.run(run_load(args.url, args.clients, params, args.timeout))
+    for key, value in summary.items():
+        print(f"{key:>16}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+PACPL Screener - Scan Metrics
+Per-stage timing counters (fetch, levels, ORB, signals, serialize, ...)
+so we can see where scan time goes. Exposed on /api/metrics.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+
+class StageMetrics:
+    """
+    Thread-safe call count, total and max seconds per named stage
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, stage, seconds, count=1):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, 0.0]
+            entry[0] += count
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            stages = {
+                stage: {
+                    'count': count,
+                    'total_secs': round(total, 6),
+                    'avg_ms': round(total / count * 1000, 3) if count else 0.0,
+                    'max_ms': round(worst * 1000, 3),
+                }
+                for stage, (count, total, worst) in self._stages.items()
+            }
+        return {
+            'uptime_secs': round(time.time() - self.started_at, 1),
+            'stages': stages,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.started_at = time.time()
+
+
+METRICS = StageMetrics()
+
+
+@contextmanager
+def timed(stage):
+    """
+    Time a block and add it to the stage's counters
+    Does nothing when METRICS_ENABLED is off
+    """
+    if not config.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.record(stage, time.perf_counter() - started)
+
+
+def snapshot():
+    return METRICS.snapshot()
+
+
+def reset():
+    METRICS.reset()
@@ -0,0 +1,261 @@
+"""
+PACPL Screener - Vectorized Panel Engine
+Evaluates the PACPL rules for a whole universe in one pass over stacked
+(symbol x bar) NumPy arrays instead of one frame at a time.
+Gives the same results as screener_logic.analyze_frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import *
+from metrics import timed
+from screener_logic import (
+    SessionIndex, new_scan_result, enrich_signals_with_targets, analyze_frame, combine_timeframes,
+    advance_indicators
+)
+
+# Signal flags in the order check_signals evaluates them; when several
+# fire, the last one decides signal_type and signal_dir
+SIGNAL_RULES = [
+    ('follow_long', 'Follow', 'LONG'),
+    ('follow_short', 'Follow', 'SHORT'),
+    ('fade_short', 'Fade', 'SHORT'),
+    ('fade_long', 'Fade', 'LONG'),
+    ('reversal_long', '3rd Condition', 'LONG'),
+    ('reversal_short', '3rd Condition', 'SHORT'),
+    ('trend_long', '3rd Condition', 'LONG'),
+    ('trend_short', '3rd Condition', 'SHORT'),
+    ('pdh_retest_long', 'PDH_Retest', 'LONG'),
+    ('pdl_retest_short', 'PDL_Retest', 'SHORT'),
+]
+
+ATR_LENGTH = 14
+
+
+def build_panel(frames):
+    """
+    Stack per-symbol OHLC frames into right-aligned (symbol x bar) arrays
+    Shorter histories are left-padded with NaN (day id -1)
+    """
+    symbols = list(frames)
+    n = len(symbols)
+    width = max(len(df) for df in frames.values())
+
+    ohlc = np.full((4, n, width), np.nan)
+    day = np.full((n, width), -1, dtype=np.int64)
+    length = np.zeros(n, dtype=np.int64)
+    last_mins = np.zeros(n, dtype=np.int64)
+    tf_mins = np.zeros(n, dtype=np.int64)
+
+    for i, df in enumerate(frames.values()):
+        k = len(df)
+        index = pd.DatetimeIndex(df.index)
+        ohlc[:, i, width - k:] = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float).T
+        # Session number of each bar
+        session = SessionIndex(index)
+        day[i, width - k:] = np.searchsorted(session.starts, np.arange(k), side='right') - 1
+        length[i] = k
+        last_mins[i] = index[-1].hour * 60 + index[-1].minute
+        tf_mins[i] = int((index[1] - index[0]).total_seconds() / 60) if k > 1 else 5
+
+    return {
+        'symbols': symbols,
+        'open': ohlc[0], 'high': ohlc[1], 'low': ohlc[2], 'close': ohlc[3],
+        'day': day,
+        'length': length,
+        'last_mins': last_mins,
+        'tf_mins': tf_mins,
+    }
+
+
+def wilder_atr(high, low, close, length=ATR_LENGTH):
+    """
+    Wilder's ATR (RMA of true range) for every row at once
+    Mirrors pandas ewm(alpha=1/length, adjust=False) step for step
+    Returns the value at the last bar of each row
+    """
+    prev_close = np.empty_like(close)
+    prev_close[:, 0] = np.nan
+    prev_close[:, 1:] = close[:, :-1]
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+    alpha = 1.0 / length
+    old_wt = 1.0 - alpha
+    weighted = np.full(close.shape[0], np.nan)
+    for j in range(tr.shape[1]):
+        cur = tr[:, j]
+        observed = cur == cur
+        started = weighted == weighted
+        update = started & observed & (weighted != cur)
+        weighted = np.where(
+            update,
+            (old_wt * weighted + alpha * cur) / (old_wt + alpha),
+            np.where(~started & observed, cur, weighted)
+        )
+    return weighted
+
+
+def evaluate_panel(panel, orb_mins=ORB_MINS, atr=None):
+    """
+    Gap classification, ORB, PDH/PDL breaks and ATR for every symbol
+    atr: optional per-symbol ATR (e.g. from the incremental indicator state)
+    Returns: dict of per-symbol arrays
+    """
+    o, h, l, c = panel['open'], panel['high'], panel['low'], panel['close']
+    day = panel['day']
+    n, width = c.shape
+    rows = np.arange(n)
+    pos = np.arange(width)
+
+    today = day[:, -1]
+    is_today = day == today[:, None]
+    has_prev = today >= 1
+    is_prev = (day == (today - 1)[:, None]) & has_prev[:, None]
+
+    # Previous day close / high / low
+    last_prev = width - 1 - np.argmax(is_prev[:, ::-1], axis=1)
+    pdc = np.where(has_prev, c[rows, last_prev], np.nan)
+    pdh = np.fmax.reduce(np.where(is_prev, h, -np.inf), axis=1)
+    pdl = np.fmin.reduce(np.where(is_prev, l, np.inf), axis=1)
+
+    # Opening range: first orb_bars bars of today
+    first_today = np.argmax(is_today, axis=1)
+    orb_bars = np.maximum(1, (orb_mins / panel['tf_mins']).astype(np.int64))
+    orb_mask = is_today & (pos[None, :] < (first_today + orb_bars)[:, None])
+    orb_high = np.fmax.reduce(np.where(orb_mask, h, -np.inf), axis=1)
+    orb_low = np.fmin.reduce(np.where(orb_mask, l, np.inf), axis=1)
+
+    today_open = o[rows, first_today]
+    close = c[:, -1]
+
+    # Gap classification (detect_gap treats pdc == 0 as no gap at all)
+    valid_gap = has_prev & (pdc != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap_pct = np.where(valid_gap, ((today_open - pdc) / pdc) * 100.0, 0.0)
+    large_up = valid_gap & (gap_pct >= LARGE_GAP)
+    large_down = valid_gap & (gap_pct <= -LARGE_GAP)
+    small = valid_gap & ~(large_up | large_down)
+
+    sustain_bars = max(1, SUSTAIN_MINS // 5)
+    beyond_sustain = is_today.sum(axis=1) >= sustain_bars
+    active = has_prev & (panel['last_mins'] >= AFTER_918_MINS)
+
+    above_orb = close > orb_high
+    below_orb = close < orb_low
+
+    with np.errstate(invalid='ignore'):
+        broke_pdh = (is_today & (c > pdh[:, None])).any(axis=1)
+        broke_pdl = (is_today & (c < pdl[:, None])).any(axis=1)
+    band_up = pdh * (1 + TOL_PCT / 100.0)
+    band_dn = pdl * (1 - TOL_PCT / 100.0)
+
+    flags = {
+        'follow_long': active & large_up & beyond_sustain & above_orb,
+        'follow_short': active & large_down & beyond_sustain & below_orb,
+        'fade_short': active & small & (gap_pct > 0) & below_orb,
+        'fade_long': active & small & (gap_pct < 0) & above_orb,
+        'reversal_long': active & large_down & beyond_sustain & above_orb,
+        'reversal_short': active & large_up & beyond_sustain & below_orb,
+        'trend_long': active & small & (gap_pct > 0) & above_orb,
+        'trend_short': active & small & (gap_pct < 0) & below_orb,
+        'pdh_retest_long': active & broke_pdh & (l[:, -1] <= band_up) & (close > pdh),
+        'pdl_retest_short': active & broke_pdl & (h[:, -1] >= band_dn) & (close < pdl),
+    }
+
+    if atr is None:
+        atr = wilder_atr(h, l, c)
+    atr = np.where(panel['length'] > ATR_LENGTH, atr, 0.0)
+
+    return {
+        'pdc': pdc, 'pdh': pdh, 'pdl': pdl,
+        'orb_high': orb_high, 'orb_low': orb_low,
+        'has_prev': has_prev,
+        'active': active,
+        'close': close, 'high': h[:, -1], 'low': l[:, -1],
+        'atr': atr,
+        'flags': flags,
+    }
+
+
+def scan_panel(frames, timeframe):
+    """
+    Scan many stocks on one timeframe at once
+    frames: dict of symbol -> DataFrame (or None)
+    Returns: dict of symbol -> result, same shape as analyze_frame
+    """
+    results = {}
+    panel_frames = {}
+
+    for symbol, df in frames.items():
+        if df is None or len(df) < 2:
+            results[symbol] = analyze_frame(symbol, timeframe, df)
+        elif (df.index[1] - df.index[0]).total_seconds() < 60:
+            # Irregular first bars, leave these to the per-frame path
+            results[symbol] = analyze_frame(symbol, timeframe, df)
+        else:
+            panel_frames[symbol] = df
+
+    if panel_frames:
+        atr = None
+        if INCREMENTAL_INDICATORS:
+            # O(new bars) per symbol instead of a pass over the whole panel
+            with timed('indicators'):
+                atr = np.array([advance_indicators(symbol, timeframe, df)['atr']
+                                for symbol, df in panel_frames.items()])
+        with timed('panel_build'):
+            panel = build_panel(panel_frames)
+        with timed('signals'):
+            out = evaluate_panel(panel, atr=atr)
+        for i, symbol in enumerate(panel_frames):
+            results[symbol] = _panel_result(symbol, timeframe, out, i)
+
+    return {symbol: results[symbol] for symbol in frames}
+
+
+def _panel_result(symbol, timeframe, out, i):
+    """
+    Per-symbol result dict from the evaluated panel arrays
+    """
+    result = new_scan_result(symbol, timeframe)
+    result['level_high'] = float(out['orb_high'][i])
+    result['level_low'] = float(out['orb_low'][i])
+
+    if not out['has_prev'][i]:
+        result['error'] = 'Cannot calculate daily levels'
+        return result
+
+    signals = {flag: False for flag, _, _ in SIGNAL_RULES}
+    signals['signal_type'] = None
+    signals['signal_dir'] = None
+    signals['price'] = float(out['close'][i])
+
+    if out['active'][i]:
+        for flag, signal_type, signal_dir in SIGNAL_RULES:
+            if out['flags'][flag][i]:
+                signals[flag] = True
+                signals['signal_type'] = signal_type
+                signals['signal_dir'] = signal_dir
+        signals = enrich_signals_with_targets(
+            signals, float(out['high'][i]), float(out['low'][i]), float(out['atr'][i])
+        )
+
+    result.update(signals)
+    result['has_signal'] = any(signals[flag] for flag, _, _ in SIGNAL_RULES)
+    return result
+
+
+def scan_panel_dual_tf(frames, timeframes):
+    """
+    Scan many stocks on several timeframes with one panel per timeframe
+    frames: dict of symbol -> {timeframe: DataFrame}
+    Returns: dict of symbol -> result, same shape as scan_stock_dual_tf
+    """
+    by_tf = {
+        tf: scan_panel({symbol: tf_frames.get(tf) for symbol, tf_frames in frames.items()}, tf)
+        for tf in timeframes
+    }
+    return {
+        symbol: combine_timeframes(symbol, {tf: by_tf[tf][symbol] for tf in timeframes})
+        for symbol in frames
+    }
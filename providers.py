@@ -0,0 +1,263 @@
+"""
+PACPL Screener - Market Data Providers
+Where the scanner gets its bars from (config.DATA_PROVIDER):
+
+    yfinance  live Yahoo Finance downloads
+    replay    a recorded session played back on a virtual clock, at 1x,
+              60x or as fast as the scans can go
+
+A provider serves history() and download() (screener_logic.TICKER_HISTORY
+and BATCH_DOWNLOADER) plus now() and sleep(), the market clock that the
+scheduler, the scan coordinator and the bar store run on.
+"""
+
+import logging
+import os
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+
+import config
+from bar_store import BarStore
+
+log = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _clock_offset(hhmm):
+    hour, minute = map(int, hhmm.split(':'))
+    return pd.Timedelta(hours=hour, minutes=minute)
+
+
+def window_bars(df, period, start, tz):
+    """
+    Bars from `start` on, or the last `period` sessions ("5d"), or all of them
+    """
+    if start is not None:
+        start = pd.Timestamp(start)
+        if start.tzinfo is None:
+            start = start.tz_localize(tz)
+        return df[df.index >= start]
+    if period and period.endswith('d'):
+        days = df.index.normalize().unique()[-int(period[:-1]):]
+        return df[df.index.normalize() >= days[0]] if len(days) else df
+    return df
+
+
+class MarketDataProvider:
+    """
+    Source of OHLCV bars and of the market clock
+    Subclasses implement history(); download() defaults to one history()
+    call per ticker
+    """
+
+    name = None
+    tz = 'Asia/Kolkata'
+
+    def history(self, symbol, period, interval, start=None):
+        """
+        One symbol's bars, like yfinance Ticker.history (empty if no data)
+        If start is given, only bars from start onwards are returned
+        """
+        raise NotImplementedError
+
+    def download(self, tickers, period, interval, start=None):
+        """
+        Several symbols as one (ticker, field) column frame, like yf.download
+        """
+        frames = {t: self.history(t, period, interval, start) for t in tickers}
+        frames = {t: df for t, df in frames.items() if not df.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1, sort=True)
+
+    def now(self):
+        """
+        Current market time (IST)
+        """
+        return pd.Timestamp.now(tz=self.tz)
+
+    def sleep(self, seconds, stop):
+        """
+        Wait `seconds` of market time
+        Returns: True if the wait was cut short by `stop` (a threading.Event)
+        or no more market time is coming
+        """
+        return stop.wait(seconds)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live bars from Yahoo Finance
+    """
+
+    name = "yfinance"
+
+    def history(self, symbol, period, interval, start=None):
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+    def download(self, tickers, period, interval, start=None):
+        window = {'start': start} if start is not None else {'period': period}
+        return yf.download(
+            tickers=tickers,
+            interval=interval,
+            group_by='ticker',
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            **window
+        )
+
+
+class RecordedProvider(MarketDataProvider):
+    """
+    Bars recorded in a bar store cache directory (the day files the live
+    scanner writes to BAR_STORE_DIR)
+    end: last day to serve (YYYY-MM-DD, default: every recorded day)
+    """
+
+    name = "recorded"
+
+    def __init__(self, cache_dir, end=None, tz='Asia/Kolkata'):
+        self.store = BarStore(cache_dir=cache_dir, tz=tz)
+        self.end = end
+        self.tz = tz
+
+    def last_day(self):
+        """
+        Latest recorded 1m session up to `end`, or None
+        """
+        try:
+            names = os.listdir(os.path.join(self.store.cache_dir, '1m'))
+        except FileNotFoundError:
+            return None
+        days = [d for name in names for d in self.store.stored_days(name, '1m')
+                if self.end is None or d <= self.end]
+        return max(days) if days else None
+
+    def history(self, symbol, period, interval, start=None):
+        days = [d for d in self.store.stored_days(symbol, interval)
+                if self.end is None or d <= self.end]
+        resample = not days and interval != '1m'
+        if resample:
+            # Build the interval from recorded 1m bars
+            days = [d for d in self.store.stored_days(symbol, '1m')
+                    if self.end is None or d <= self.end]
+        if not days:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        if start is None and period and period.endswith('d'):
+            days = days[-int(period[:-1]):]
+        elif start is not None:
+            first = pd.Timestamp(start)
+            first = (first.tz_localize(self.tz) if first.tzinfo is None else first.tz_convert(self.tz))
+            days = [d for d in days if d >= first.strftime('%Y-%m-%d')] or days[-1:]
+
+        df = self.store.history(symbol, '1m' if resample else interval, days[0], days[-1])
+        if resample:
+            from screener_logic import resample_ohlcv
+            df = resample_ohlcv(df, interval)
+        return window_bars(df, period, start, self.tz)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Plays back one session of another provider's 1m bars on a virtual clock
+    Only bars that have closed by the virtual time are served, like a live
+    feed during that session
+    source: provider holding the recorded bars (RecordedProvider,
+            SyntheticMarket, ...); it needs a last_day() when day is None
+    day: session to replay (default: the source's last day)
+    speed: virtual seconds per wall second (1 = real time, 60 = a minute
+           per second); 0 = as fast as possible, the clock only moves when
+           the scheduler sleeps, so every bar close is scanned back to back
+    start: time of day the replay begins (HH:MM, default: session open)
+    days: sessions of history loaded per symbol, the replayed one included
+    """
+
+    name = "replay"
+
+    def __init__(self, source, day=None, speed=60, start=None, days=5, wall=time.monotonic):
+        self.source = source
+        self.tz = getattr(source, 'tz', self.tz)
+        self.speed = speed
+        self.days = days
+
+        day = pd.Timestamp(day if day is not None else source.last_day()).normalize()
+        if day.tzinfo is None:
+            day = day.tz_localize(self.tz)
+        self.start = day + _clock_offset(start or config.SESSION_START)
+        # One bar past the close, so the scheduler still scans the last bar
+        self.end = day + _clock_offset(config.SESSION_END) + pd.Timedelta(minutes=1)
+
+        self._wall = wall
+        self._wall_start = wall()
+        self._skipped = 0.0     # Virtual seconds jumped over by sleep() at speed 0
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        source = RecordedProvider(config.REPLAY_DIR, end=config.REPLAY_DATE)
+        day = config.REPLAY_DATE or source.last_day()
+        if day is None:
+            raise ValueError(f"No recorded 1m bars to replay in {config.REPLAY_DIR!r}")
+        log.info("Replaying %s from %s at speed %s", day, config.REPLAY_DIR, config.REPLAY_SPEED or 'max')
+        return cls(source, day=day, speed=config.REPLAY_SPEED, start=config.REPLAY_START)
+
+    def now(self):
+        with self._lock:
+            elapsed = self._skipped + (self._wall() - self._wall_start) * self.speed
+        return min(self.start + pd.Timedelta(seconds=elapsed), self.end)
+
+    def sleep(self, seconds, stop):
+        if self.now() + pd.Timedelta(seconds=seconds) > self.end:
+            # The session is over: nothing left to scan
+            return True
+        if self.speed:
+            return stop.wait(seconds / self.speed)
+        with self._lock:
+            self._skipped += seconds
+        return stop.is_set()
+
+    def finished(self):
+        return self.now() >= self.end
+
+    def _recorded(self, symbol):
+        df = self._bars.get(symbol)
+        if df is None:
+            df = self.source.history(symbol, f"{self.days}d", '1m')
+            if df.empty:
+                df = pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float,
+                                  index=pd.DatetimeIndex([], tz=self.tz, name='Datetime'))
+            elif df.index.tz is None:
+                df = df.tz_localize(self.tz)
+            df = df[df.index < self.end]
+            df = self._bars.setdefault(symbol, df)
+        return df
+
+    def history(self, symbol, period, interval, start=None):
+        df = self._recorded(symbol)
+        # 1m bars that have closed by now
+        df = df.iloc[:df.index.searchsorted(self.now() - pd.Timedelta(minutes=1), side='right')]
+        df = window_bars(df, period, start, self.tz)
+        if interval == '1m' or df.empty:
+            return df
+        from screener_logic import resample_ohlcv
+        return resample_ohlcv(df, interval)
+
+
+def get_provider(name=None):
+    """
+    The provider selected by name (default: config.DATA_PROVIDER)
+    """
+    name = name or config.DATA_PROVIDER
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "replay":
+        return ReplayProvider.from_config()
+    raise ValueError(f"Unknown data provider: {name!r}")
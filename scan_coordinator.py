@@ -0,0 +1,298 @@
+"""
+PACPL Screener - Single-flight Scan Coordinator
+Runs at most one scan per (stock list, timeframes, bar) and lets every
+client subscribe to that scan's event stream. Several stock lists
+(universes) can be scanned together, their shared symbols only once
+
+Signal transitions (SIGNAL_STATE) are found once, by whichever scan
+evaluates a stock first, and shared with every other scan in progress
+that covers the stock (and with the live feed's run, see follow())
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import deque
+import pandas as pd
+
+import config
+from screener_logic import scan_events, timeframe_minutes
+from universes import event_symbol, fan_out, merge_universes
+
+log = logging.getLogger(__name__)
+
+_run_ids = itertools.count(1)
+
+
+def bar_boundary(timeframes, now=None):
+    """
+    Start of the current bar of the finest timeframe (IST)
+    Scans started within the same bar share their results
+    """
+    if now is None:
+        now = pd.Timestamp.now(tz='Asia/Kolkata')
+    minutes = [m for m in (timeframe_minutes(tf) for tf in timeframes) if m]
+    step = min(minutes) if minutes else 1
+    return now.floor(f"{step}min")
+
+
+def _resolve(futures):
+    for future in futures:
+        if not future.done():
+            future.set_result(None)
+
+
+class ScanRun:
+    """
+    One scan: its recorded events plus a condition for waiting subscribers
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.id = next(_run_ids)
+        self.events = []
+        self.done = False
+        self._cond = threading.Condition()
+        # Events shared by other scans before this one's start event
+        self._held = []
+        # Futures of async subscribers waiting for the next event, per event loop
+        self._waiters = {}
+
+    def publish(self, event):
+        with self._cond:
+            self.events.append(event)
+            if self._held:
+                self.events.extend(self._held)
+                self._held = []
+            self._cond.notify_all()
+            self._wake_async()
+
+    def share(self, event):
+        """
+        Publish an event found by another scan: after this run's start
+        event, and not once the run is done
+        """
+        with self._cond:
+            if self.done or (self.events and self.events[-1].get('type') == 'done'):
+                return
+            if not self.events:
+                self._held.append(event)
+                return
+            self.publish(event)
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+            self._wake_async()
+
+    def _wake_async(self):
+        # One callback per loop, however many subscribers are waiting on it
+        waiters, self._waiters = self._waiters, {}
+        for loop, futures in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_resolve, futures)
+            except RuntimeError:
+                pass    # Loop already closed
+
+    def event_id(self, index):
+        """
+        SSE id of the index-th event: "<run id>-<index>"
+        """
+        return f"{self.id}-{index}"
+
+    def subscribe(self, timeout=None, start=0):
+        """
+        Yield every event of the run from index `start`: the ones already
+        recorded first, then live ones as they are published
+        """
+        index = start
+        while True:
+            with self._cond:
+                while index >= len(self.events) and not self.done:
+                    if not self._cond.wait(timeout):
+                        return
+                if index >= len(self.events):
+                    return
+                pending = self.events[index:]
+            index += len(pending)
+            for event in pending:
+                yield event
+
+    async def subscribe_async(self, start=0):
+        """
+        subscribe() for asyncio: waiting subscribers hold no thread
+        """
+        loop = asyncio.get_running_loop()
+        index = start
+        while True:
+            with self._cond:
+                pending = self.events[index:]
+                done = self.done
+                if not pending and not done:
+                    waiter = loop.create_future()
+                    self._waiters.setdefault(loop, []).append(waiter)
+            if pending:
+                index += len(pending)
+                for event in pending:
+                    yield event
+            elif done:
+                return
+            else:
+                await waiter
+
+    def wait(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+    def signals(self):
+        """
+        Results of the stocks with signals found so far
+        """
+        return [e['data'] for e in self.events if e.get('type') == 'signal']
+
+
+class ScanCoordinator:
+    """
+    Shares scans between clients
+    A request for a (stock list, timeframes) pair joins the scan of the
+    current bar if one was already started, otherwise starts it
+    """
+
+    def __init__(self, scan_fn=scan_events, clock=None):
+        self.scan_fn = scan_fn
+        # Market time used to find the current bar (default: wall clock)
+        self.clock = clock
+        self._runs = {}
+        # Recent runs by id, so reconnecting clients can resume them
+        self._recent = deque(maxlen=config.SSE_REPLAY_RUNS)
+        # Runs of every symbol that get all shared transitions (live feed)
+        self._followers = []
+        self._lock = threading.Lock()
+
+    def get_run(self, stock_list, timeframes=None, now=None):
+        return self.get_universe_runs({None: stock_list}, timeframes, now)[None]
+
+    def get_universe_runs(self, universes, timeframes=None, now=None):
+        """
+        Runs of several universes (name -> stock list) for the current bar
+        The ones not started yet are scanned together: each symbol once,
+        its events fanned out to the run of every universe listing it.
+        Universes with the same stock list share a run
+        Returns: {name: ScanRun}
+        """
+        if timeframes is None:
+            timeframes = config.TIMEFRAMES
+        if now is None and self.clock is not None:
+            now = self.clock()
+        boundary = bar_boundary(timeframes, now)
+
+        runs, started = {}, {}
+        with self._lock:
+            # Forget finished scans of earlier bars, of any stock list
+            # (resume() finds recent ones in _recent)
+            for old_key, old_run in list(self._runs.items()):
+                if old_run.done and old_key[2] < boundary:
+                    del self._runs[old_key]
+            for name, stock_list in universes.items():
+                key = (tuple(stock_list), tuple(timeframes), boundary)
+                run = self._runs.get(key)
+                if run is None:
+                    run = self._runs[key] = ScanRun(key)
+                    self._recent.append(run)
+                    started[name] = run
+                runs[name] = run
+            # Keep SSE_REPLAY_RUNS scans of each universe resumable
+            if self._recent.maxlen < config.SSE_REPLAY_RUNS * len(started):
+                self._recent = deque(self._recent, maxlen=config.SSE_REPLAY_RUNS * len(started))
+
+        if started:
+            thread = threading.Thread(
+                target=self._run_scan,
+                args=(started, {name: list(universes[name]) for name in started}, list(timeframes)),
+                daemon=True
+            )
+            thread.start()
+        return runs
+
+    def _run_scan(self, runs, universes, timeframes):
+        try:
+            if len(runs) == 1:
+                (name, run), = runs.items()
+                for event in self._shared(self.scan_fn(universes[name], timeframes), runs.values()):
+                    run.publish(event)
+            else:
+                events = self._shared(self.scan_fn(merge_universes(universes), timeframes), runs.values())
+                for name, event in fan_out(events, universes):
+                    runs[name].publish(event)
+        except Exception as e:
+            log.exception("Scan failed")
+            for run in runs.values():
+                run.publish({'type': 'error', 'error': str(e)})
+                run.publish({'type': 'done'})
+        finally:
+            for run in runs.values():
+                run.finish()
+
+    def _shared(self, events, runs):
+        for event in events:
+            if 'seq' in event:
+                self.share(event, exclude=runs)
+            yield event
+
+    def share(self, event, exclude=()):
+        """
+        Publish a signal transition event (one with a 'seq') to every scan
+        in progress whose stock list has its stock and to the followed
+        runs, other than `exclude`
+        Signal state is applied once per stock, so a scan overlapping
+        another one would otherwise never see the transitions it found
+        """
+        symbol = event_symbol(event)
+        with self._lock:
+            runs = [run for run in self._runs.values() if not run.done and symbol in run.key[0]]
+            followers = [run for run in self._followers if not run.done]
+        for run in runs:
+            if run not in exclude:
+                run.share(event)
+        for run in followers:
+            if run not in exclude:
+                run.publish(event)
+
+    def follow(self, run):
+        """
+        Share the transitions of every scan with `run` too, until it is
+        done (the live feed's run, which covers every symbol)
+        """
+        with self._lock:
+            self._followers = [r for r in self._followers if not r.done] + [run]
+
+    def resume(self, last_event_id):
+        """
+        Run and index of the next event after an SSE Last-Event-ID
+        Returns None if the id is malformed or its run was already dropped
+        """
+        try:
+            run_id, index = map(int, (last_event_id or '').split('-'))
+        except ValueError:
+            return None
+        with self._lock:
+            run = next((r for r in self._recent if r.id == run_id), None)
+        if run is None:
+            return None
+        return run, index + 1
+
+    def stream(self, stock_list, timeframes=None):
+        """
+        Events of the shared scan, from its start, as they happen
+        """
+        return self.get_run(stock_list, timeframes).subscribe()
+
+    def results(self, stock_list, timeframes=None, timeout=None):
+        """
+        Wait for the shared scan to finish and return its signal results
+        """
+        run = self.get_run(stock_list, timeframes)
+        run.wait(timeout)
+        return run.signals()
@@ -0,0 +1,151 @@
+"""
+PACPL Screener - Background Scan Scheduler
+Pre-scans the stock list on every bar close during market hours so the
+API can serve a ready snapshot instead of scanning on request
+"""
+
+import logging
+import threading
+import time
+import pandas as pd
+
+import config
+from screener_logic import timeframe_minutes
+
+log = logging.getLogger(__name__)
+
+IST = 'Asia/Kolkata'
+
+
+def _session_bounds(day):
+    """
+    Session open and close timestamps for a given day
+    """
+    day = day.normalize()
+    open_h, open_m = map(int, config.SESSION_START.split(':'))
+    close_h, close_m = map(int, config.SESSION_END.split(':'))
+    return (day + pd.Timedelta(hours=open_h, minutes=open_m),
+            day + pd.Timedelta(hours=close_h, minutes=close_m))
+
+
+def in_session(now):
+    """
+    True during SESSION_START-SESSION_END on a weekday
+    """
+    session_open, session_close = _session_bounds(now)
+    return now.weekday() < 5 and session_open <= now <= session_close
+
+
+def next_bar_close(timeframes, now, delay=0):
+    """
+    Next close of a bar of the finest timeframe, inside a trading session
+    delay: seconds to wait after the close for the bar to be published
+    """
+    minutes = [m for m in (timeframe_minutes(tf) for tf in timeframes) if m]
+    step = pd.Timedelta(minutes=min(minutes) if minutes else 1)
+    lag = pd.Timedelta(seconds=delay)
+
+    day = now.normalize()
+    for _ in range(8):
+        session_open, session_close = _session_bounds(day)
+        if day.weekday() < 5 and now < session_close + lag:
+            # Bars close at open + step, open + 2*step, ... up to the session close
+            elapsed = max(now - lag - session_open, pd.Timedelta(0))
+            closes = elapsed // step + 1
+            candidate = session_open + closes * step
+            if candidate <= session_close:
+                return candidate + lag
+        day += pd.Timedelta(days=1)
+    return None
+
+
+class ScanScheduler:
+    """
+    Background thread that starts a shared scan after every bar close
+    and keeps the latest finished scan as a snapshot
+    get_stocks: callable returning the stock list, or several universes
+    (name -> stock list) to scan together; the first one is `snapshot`
+    """
+
+    def __init__(self, coordinator, get_stocks, timeframes=None, delay=None, clock=None, sleep=None):
+        self.coordinator = coordinator
+        self.get_stocks = get_stocks
+        self.timeframes = timeframes or config.TIMEFRAMES
+        self.delay = config.SCHEDULER_DELAY_SECS if delay is None else delay
+        self.clock = clock or (lambda: pd.Timestamp.now(tz=IST))
+        # sleep(seconds, stop_event) -> True to end the loop (a provider's sleep)
+        self.sleep = sleep or (lambda seconds, stop: stop.wait(seconds))
+
+        self.snapshot = None
+        self.snapshots = {}
+        self.snapshot_at = None
+        self.last_run_duration = None
+        self.next_run_at = None
+        self.running = False
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = self.clock()
+            self.next_run_at = next_bar_close(self.timeframes, now, self.delay)
+            if self.next_run_at is None:
+                return
+            # Idle until the next bar close (overnight and at weekends too)
+            wait = (self.next_run_at - now).total_seconds()
+            if wait > 0 and self.sleep(wait, self._stop):
+                return
+            self.run_once()
+
+    def run_once(self):
+        """
+        Run (or join) the scan for the current bar and keep it as the snapshot
+        """
+        self.running = True
+        started = time.perf_counter()
+        try:
+            stocks = self.get_stocks()
+            universes = stocks if isinstance(stocks, dict) else {None: stocks}
+            runs = self.coordinator.get_universe_runs(universes, self.timeframes, now=self.clock())
+            for run in runs.values():
+                run.wait()
+            self.snapshots = runs
+            self.snapshot = next(iter(runs.values()))
+            self.snapshot_at = self.clock()
+            self.last_run_duration = time.perf_counter() - started
+        except Exception:
+            log.exception("Scheduled scan failed")
+        finally:
+            self.running = False
+        return self.snapshot
+
+    def get_snapshot(self, stock_list, timeframes=None):
+        """
+        Latest finished scan for this stock list, or None if there isn't one
+        """
+        if timeframes is None:
+            timeframes = self.timeframes
+        wanted = (tuple(stock_list), tuple(timeframes))
+        return next((run for run in self.snapshots.values() if run.key[:2] == wanted), None)
+
+    def status(self):
+        now = self.clock()
+        return {
+            'active': self._thread is not None and self._thread.is_alive(),
+            'in_session': in_session(now),
+            'running': self.running,
+            'last_run_at': self.snapshot_at.strftime('%Y-%m-%d %H:%M:%S') if self.snapshot_at is not None else None,
+            'last_run_duration': round(self.last_run_duration, 3) if self.last_run_duration is not None else None,
+            'next_run_at': self.next_run_at.strftime('%Y-%m-%d %H:%M:%S') if self.next_run_at is not None else None,
+            'universes': [name for name in self.snapshots if name is not None],
+        }
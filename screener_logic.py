@@ -3,26 +3,64 @@ PACPL Screener Logic - Ported from Pine Script
 Implements gap analysis, ORB breakouts, and PDH/PDL retest signals
 """
 
+import logging
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import yfinance as yf
 from config import *
+from bar_store import BarStore
+from symbol_health import SymbolHealth
+from indicator_state import IndicatorState
+from metrics import timed
+from providers import get_provider
+from signal_state import SignalStateStore, transition_events
 
+log = logging.getLogger(__name__)
 
-# Cache for bad symbols to avoid repeated timeouts
-BAD_SYMBOLS = set()
+
+# Market data source (DATA_PROVIDER); its clock is the scanner's market time
+PROVIDER = get_provider()
+
+# A replay keeps its bars and symbol failures in memory, away from the
+# live recordings and health file
+_REPLAY = PROVIDER.name == "replay"
+
+# Symbols without data are skipped until their backoff expires
+SYMBOL_HEALTH = SymbolHealth(path=None if _REPLAY else SYMBOL_HEALTH_FILE)
+
+# Downloaded bar history; scans only fetch bars newer than what is stored
+BAR_STORE = BarStore(cache_dir=None if _REPLAY else BAR_STORE_DIR,
+                     clock=PROVIDER.now) if BAR_STORE_ENABLED else None
+
+# Previous day levels per (symbol, timeframe): (session date, (pdc, pdh, pdl))
+DAILY_LEVELS_CACHE = {}
+
+# Incremental ATR / ORB / PDH-PDL break state per (symbol, timeframe)
+INDICATOR_STATES = {}
+
+# Signal state machine per (symbol, timeframe): first trigger, SL / TP, re-arm
+SIGNAL_STATES = SignalStateStore()
 
 def get_stock_data(symbol, timeframe="5m", days=5):
     """
     Fetch intraday data for a stock
     Returns data for specified timeframe interval
     """
-    if symbol in BAD_SYMBOLS:
+    if symbol in SYMBOL_HEALTH:
         return None
         
     try:
-        ticker = yf.Ticker(symbol)
+        # Only ask for bars after the last stored one if we have history
+        start = BAR_STORE.fetch_start(symbol, timeframe) if BAR_STORE is not None else None
+        
+        if start is not None:
+            with timed('fetch'):
+                data = TICKER_HISTORY(symbol, None, timeframe, start=start)
+            if data.empty:
+                # Nothing new since the last scan
+                return BAR_STORE.get(symbol, timeframe)
+            SYMBOL_HEALTH.record_success(symbol)
+            return BAR_STORE.merge(symbol, timeframe, data)
         
         # Adjust period based on interval constraints
         # 1m data is available for last 7 days max
@@ -33,38 +71,286 @@ def get_stock_data(symbol, timeframe="5m", days=5):
             period = "5d"  # Request 5 days for 1m to ensure we trigger "last 7 days" range
             
         # Get data for specified timeframe
-        data = ticker.history(period=period, interval=timeframe)
+        with timed('fetch'):
+            data = TICKER_HISTORY(symbol, period, timeframe)
         
         if data.empty:
-            # print(f"DEBUG: No data for {symbol}, marking as bad")
-            BAD_SYMBOLS.add(symbol)
+            log.debug("No data for %s", symbol)
+            SYMBOL_HEALTH.record_failure(symbol, 'no_data', timeframe)
             return None
+        
+        SYMBOL_HEALTH.record_success(symbol)
+        if BAR_STORE is not None:
+            return BAR_STORE.merge(symbol, timeframe, data)
             
         return data
     except Exception as e:
-        print(f"Error fetching data for {symbol} ({timeframe}): {e}")
+        log.warning("Error fetching data for %s (%s): %s", symbol, timeframe, e)
         if "delisted" in str(e).lower() or "no data" in str(e).lower():
-            BAD_SYMBOLS.add(symbol)
+            SYMBOL_HEALTH.record_failure(symbol, 'not_found', str(e))
+        else:
+            SYMBOL_HEALTH.record_failure(symbol, 'error', str(e))
         return None
 
 
-def calculate_daily_levels(df):
+# Single-ticker downloader used by get_stock_data, same signature as
+# BATCH_DOWNLOADER but returning a plain OHLCV frame
+TICKER_HISTORY = PROVIDER.history
+
+
+# Bulk downloader used by get_stock_data_batch.
+# Any callable(tickers, period, interval, start=None) returning a
+# (ticker, field) column frame can be plugged in here, e.g. a fake
+# provider for offline tests.
+BATCH_DOWNLOADER = PROVIDER.download
+
+
+def split_batch_frame(data, symbols):
+    """
+    Split a bulk download into per-symbol OHLCV frames
+    Returns: dict of symbol -> DataFrame (symbols without data are omitted)
+    """
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # A single ticker download comes back with flat columns
+        if len(symbols) == 1:
+            df = data.dropna(how='all')
+            if not df.empty:
+                frames[symbols[0]] = df
+        return frames
+
+    tickers = set(data.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in tickers:
+            continue
+        # Rows are aligned across tickers, so drop the bars this symbol lacks
+        df = data[symbol].dropna(how='all')
+        if not df.empty:
+            df.columns.name = None
+            frames[symbol] = df
+
+    return frames
+
+
+def get_stock_data_batch(symbols, timeframe="5m", days=5, chunk_size=None):
+    """
+    Fetch intraday data for many stocks using chunked bulk requests
+    Returns: dict of symbol -> DataFrame (None for symbols without data)
+    """
+    if chunk_size is None:
+        chunk_size = BATCH_SIZE
+
+    period = f"{days}d"
+    if timeframe == "1m":
+        period = "5d"
+
+    wanted = [s for s in dict.fromkeys(symbols) if s not in SYMBOL_HEALTH]
+    frames = {symbol: None for symbol in symbols}
+
+    # Symbols with stored history only need a delta download, so keep
+    # them in separate chunks from the ones needing the full period
+    starts = {
+        s: BAR_STORE.fetch_start(s, timeframe) if BAR_STORE is not None else None
+        for s in wanted
+    }
+    cold = [s for s in wanted if starts[s] is None]
+    warm = [s for s in wanted if starts[s] is not None]
+
+    chunks = [cold[i:i + chunk_size] for i in range(0, len(cold), chunk_size)]
+    chunks += [warm[i:i + chunk_size] for i in range(0, len(warm), chunk_size)]
+
+    for chunk in chunks:
+        start = min(starts[s] for s in chunk) if starts[chunk[0]] is not None else None
+        try:
+            with timed('fetch'):
+                if start is None:
+                    data = BATCH_DOWNLOADER(chunk, period, timeframe)
+                else:
+                    data = BATCH_DOWNLOADER(chunk, period, timeframe, start=start)
+        except Exception as e:
+            log.warning("Error fetching batch of %d symbols (%s): %s", len(chunk), timeframe, e)
+            # Fall back to one request per symbol for this chunk only
+            for symbol in chunk:
+                frames[symbol] = get_stock_data(symbol, timeframe, days)
+            continue
+
+        chunk_frames = split_batch_frame(data, chunk)
+        for symbol in chunk:
+            df = chunk_frames.get(symbol)
+            if df is None:
+                if start is not None:
+                    # Nothing new since the last scan
+                    frames[symbol] = BAR_STORE.get(symbol, timeframe)
+                else:
+                    SYMBOL_HEALTH.record_failure(symbol, 'no_data', timeframe)
+                continue
+            SYMBOL_HEALTH.record_success(symbol)
+            frames[symbol] = BAR_STORE.merge(symbol, timeframe, df) if BAR_STORE is not None else df
+
+    return frames
+
+
+def timeframe_minutes(timeframe):
+    """
+    Parse an intraday interval string ("1m", "15m", "1h") into minutes
+    Returns None for non-intraday intervals
+    """
+    try:
+        if timeframe.endswith('m'):
+            return int(timeframe[:-1])
+        if timeframe.endswith('h'):
+            return int(timeframe[:-1]) * 60
+    except ValueError:
+        pass
+    return None
+
+
+def plan_timeframes(timeframes):
+    """
+    Decide which timeframes to download and which to build locally
+    Returns: (fetch_list, derived) where derived maps timeframe -> source timeframe
+    """
+    minutes = {tf: timeframe_minutes(tf) for tf in timeframes}
+    intraday = [tf for tf in timeframes if minutes[tf]]
+
+    if not DERIVE_TIMEFRAMES or not intraday:
+        return list(timeframes), {}
+
+    base = min(intraday, key=lambda tf: minutes[tf])
+    derived = {
+        tf: base for tf in intraday
+        if tf != base and minutes[tf] % minutes[base] == 0
+    }
+    fetch_list = [tf for tf in timeframes if tf not in derived]
+    return fetch_list, derived
+
+
+# Session open offset from midnight (09:15 IST) used to align resampled bars
+SESSION_OFFSET = pd.Timedelta(hours=int(SESSION_START[:2]), minutes=int(SESSION_START[3:]))
+
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def resample_ohlcv(df, timeframe):
+    """
+    Build higher timeframe bars from finer ones
+    Bins are aligned to the session open, so 2m bars start at 09:15, 09:17, ...
+    """
+    if df is None or df.empty:
+        return df
+
+    mins = timeframe_minutes(timeframe)
+    agg = {col: how for col, how in OHLCV_AGG.items() if col in df.columns}
+
+    out = df.resample(
+        f"{mins}min",
+        closed='left',
+        label='left',
+        origin='start_day',
+        offset=SESSION_OFFSET
+    ).agg(agg)
+
+    # Drop the empty bins between sessions
+    return out.dropna(subset=['Open'])
+
+
+def derive_timeframes(frames, derived):
+    """
+    Fill in derived timeframes of a {timeframe: DataFrame} dict by resampling
+    """
+    with timed('derive'):
+        for tf, source in derived.items():
+            base_df = frames.get(source)
+            frames[tf] = resample_ohlcv(base_df, tf) if base_df is not None else None
+    return frames
+
+
+def get_timeframe_frames(symbol, timeframes):
+    """
+    Fetch one stock on several timeframes with as few downloads as possible
+    Returns: dict of timeframe -> DataFrame (or None)
+    """
+    fetch_list, derived = plan_timeframes(timeframes)
+    frames = {tf: get_stock_data(symbol, tf) for tf in fetch_list}
+    return derive_timeframes(frames, derived)
+
+
+def iter_batched_frames(stock_list, timeframes, chunk_size=None):
+    """
+    Yield (chunk, frames) pairs where frames maps symbol -> {timeframe: DataFrame}
+    Each chunk costs one bulk request per downloaded timeframe
+    """
+    if chunk_size is None:
+        chunk_size = BATCH_SIZE
+
+    fetch_list, derived = plan_timeframes(timeframes)
+
+    for i in range(0, len(stock_list), chunk_size):
+        chunk = stock_list[i:i + chunk_size]
+        by_tf = {tf: get_stock_data_batch(chunk, tf, chunk_size=chunk_size) for tf in fetch_list}
+        frames = {
+            symbol: derive_timeframes({tf: by_tf[tf].get(symbol) for tf in fetch_list}, derived)
+            for symbol in chunk
+        }
+        yield chunk, frames
+
+
+def iter_scan_frames(stock_list, timeframes):
+    """
+    Yield (chunk, frames) pairs from the fetch stage selected by FETCH_MODE
+    """
+    if FETCH_MODE == "async" and PROVIDER.name == "yfinance":
+        # The chart API client talks to Yahoo directly
+        from async_fetch import iter_async_frames
+        return iter_async_frames(stock_list, timeframes)
+    return iter_batched_frames(stock_list, timeframes)
+
+
+class SessionIndex:
+    """
+    Session boundaries of a frame, computed once per frame and shared by
+    the daily level, ORB and signal calculations
+    day_ids: calendar day number (IST) of each bar
+    starts: position of the first bar of each session
+    """
+    __slots__ = ('day_ids', 'starts')
+
+    def __init__(self, index):
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            # Local wall-clock time, so days split at IST midnight
+            index = index.tz_localize(None)
+        self.day_ids = index.values.astype('datetime64[D]').astype(np.int64)
+        self.starts = np.searchsorted(self.day_ids, np.unique(self.day_ids))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def today(self):
+        return slice(int(self.starts[-1]), None)
+
+    def previous(self):
+        return slice(int(self.starts[-2]), int(self.starts[-1]))
+
+
+def calculate_daily_levels(df, session=None):
     """
     Calculate Previous Day Close (PDC), High (PDH), Low (PDL)
     """
     if df is None or len(df) < 2:
         return None, None, None
     
-    # Get yesterday's date
-    df['Date'] = pd.to_datetime(df.index).date
-    dates = df['Date'].unique()
+    if session is None:
+        session = SessionIndex(df.index)
     
-    if len(dates) < 2:
+    if len(session) < 2:
         return None, None, None
     
     # Get previous day's data
-    prev_date = dates[-2]
-    prev_day_data = df[df['Date'] == prev_date]
+    prev_day_data = df.iloc[session.previous()]
     
     if prev_day_data.empty:
         return None, None, None
@@ -76,7 +362,38 @@ def calculate_daily_levels(df):
     return pdc, pdh, pdl
 
 
-def calculate_orb(df, orb_mins=ORB_MINS):
+def get_daily_levels(symbol, timeframe, df, session=None):
+    """
+    Previous day levels, computed once per session and then served from cache
+    """
+    if df is None or len(df) < 2:
+        return None, None, None
+    
+    today = pd.Timestamp(df.index[-1]).date()
+    cached = DAILY_LEVELS_CACHE.get((symbol, timeframe))
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    
+    levels = calculate_daily_levels(df, session)
+    if levels[0] is not None:
+        DAILY_LEVELS_CACHE[(symbol, timeframe)] = (today, levels)
+    return levels
+
+
+def advance_indicators(symbol, timeframe, df):
+    """
+    Update the incremental indicator state of a series with df
+    Returns: dict with atr, orb_high, orb_low, pdc, pdh, pdl, broke_pdh, broke_pdl
+    """
+    key = (symbol, timeframe)
+    state = INDICATOR_STATES.get(key)
+    if state is None:
+        # Threads creating it at once end up sharing the first one
+        state = INDICATOR_STATES.setdefault(key, IndicatorState())
+    return state.advance(df)
+
+
+def calculate_orb(df, orb_mins=ORB_MINS, session=None):
     """
     Calculate Opening Range Breakout levels
     Returns ORB High and ORB Low
@@ -84,10 +401,11 @@ def calculate_orb(df, orb_mins=ORB_MINS):
     if df is None or len(df) < 1:
         return None, None
     
+    if session is None:
+        session = SessionIndex(df.index)
+    
     # Get today's data
-    df['Date'] = pd.to_datetime(df.index).date
-    today = df['Date'].iloc[-1]
-    today_data = df[df['Date'] == today]
+    today_data = df.iloc[session.today()]
     
     if today_data.empty:
         return None, None
@@ -152,13 +470,15 @@ def check_after_918(df):
     current_time = pd.to_datetime(df.index[-1])
     current_mins = current_time.hour * 60 + current_time.minute
     
-    print(f"DEBUG_TIME: Last={current_time} Mins={current_mins} Threshold={AFTER_918_MINS}")
+    log.debug("Last=%s Mins=%s Threshold=%s", current_time, current_mins, AFTER_918_MINS)
     return current_mins >= AFTER_918_MINS
 
 
-def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
+def check_signals(df, pdc, pdh, pdl, orb_high, orb_low, session=None, indicators=None):
     """
     Check for all PACPL trading signals
+    indicators: optional values from advance_indicators, used instead of
+    recomputing ATR and the PDH/PDL break flags over the whole frame
     Returns: dict with signal information
     """
     signals = {
@@ -180,10 +500,11 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
     if df is None or len(df) < 1:
         return signals
     
+    if session is None:
+        session = SessionIndex(df.index)
+    
     # Get today's data
-    df['Date'] = pd.to_datetime(df.index).date
-    today = df['Date'].iloc[-1]
-    today_data = df[df['Date'] == today].copy()
+    today_data = df.iloc[session.today()]
     
     if today_data.empty:
         return signals
@@ -200,7 +521,6 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
     # Check if after 9:18 AM
     after_918 = check_after_918(today_data)
     if not after_918:
-        # print(f"DEBUG {df.name if hasattr(df,'name') else ''}: before 9:18")
         return signals
     
     # Calculate gap
@@ -209,7 +529,10 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
     sustain_bars = max(1, SUSTAIN_MINS // 5)
     beyond_sustain = len(today_data) >= sustain_bars
 
-    print(f"DEBUG_SIG: {df.name if hasattr(df,'name') else 'Stock'} Gap={gap_pct:.2f} LUp={is_large_up} LDn={is_large_down} Sm={is_small_gap} Close={current_close} ORB_H={orb_high} ORB_L={orb_low} Sus={beyond_sustain}")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%s Gap=%.2f LUp=%s LDn=%s Sm=%s Close=%s ORB_H=%s ORB_L=%s Sus=%s",
+                  df.name if hasattr(df, 'name') else 'Stock', gap_pct, is_large_up, is_large_down,
+                  is_small_gap, current_close, orb_high, orb_low, beyond_sustain)
     
     # ===== FOLLOW SIGNALS (Large Gap) =====
     if is_large_up and beyond_sustain and orb_high is not None:
@@ -217,14 +540,14 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
             signals['follow_long'] = True
             signals['signal_type'] = 'Follow'
             signals['signal_dir'] = 'LONG'
-            print("DEBUG_SIG: Triggered Follow Long")
+            log.debug("Triggered Follow Long")
     
     if is_large_down and beyond_sustain and orb_low is not None:
         if current_close < orb_low:
             signals['follow_short'] = True
             signals['signal_type'] = 'Follow'
             signals['signal_dir'] = 'SHORT'
-            print("DEBUG_SIG: Triggered Follow Short")
+            log.debug("Triggered Follow Short")
     
     # ===== FADE SIGNALS (Small Gap) =====
     if is_small_gap and orb_low is not None and gap_pct > 0:
@@ -232,14 +555,14 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
             signals['fade_short'] = True
             signals['signal_type'] = 'Fade'
             signals['signal_dir'] = 'SHORT'
-            print("DEBUG_SIG: Triggered Fade Short")
+            log.debug("Triggered Fade Short")
     
     if is_small_gap and orb_high is not None and gap_pct < 0:
         if current_close > orb_high:
             signals['fade_long'] = True
             signals['signal_type'] = 'Fade'
             signals['signal_dir'] = 'LONG'
-            print("DEBUG_SIG: Triggered Fade Long")
+            log.debug("Triggered Fade Long")
 
     # ===== REVERSAL SIGNALS (3rd Condition) =====
     # Large Gap Down + Break ORB High -> Long
@@ -248,7 +571,7 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
             signals['reversal_long'] = True
             signals['signal_type'] = '3rd Condition'
             signals['signal_dir'] = 'LONG'
-            print("DEBUG_SIG: Triggered Reversal Long")
+            log.debug("Triggered Reversal Long")
             
     # Large Gap Up + Break ORB Low -> Short
     if is_large_up and beyond_sustain and orb_low is not None:
@@ -256,7 +579,7 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
             signals['reversal_short'] = True
             signals['signal_type'] = '3rd Condition'
             signals['signal_dir'] = 'SHORT'
-            print("DEBUG_SIG: Triggered Reversal Short")
+            log.debug("Triggered Reversal Short")
     
     # ===== 3rd CONDITION: TREND (Small Gap Continuation) =====
     if is_small_gap and orb_high is not None and gap_pct > 0: # Small Gap Up -> Break High (Trend)
@@ -264,20 +587,24 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
             signals['trend_long'] = True
             signals['signal_type'] = '3rd Condition'
             signals['signal_dir'] = 'LONG'
-            print("DEBUG_SIG: Triggered Trend Long")
+            log.debug("Triggered Trend Long")
             
     if is_small_gap and orb_low is not None and gap_pct < 0: # Small Gap Down -> Break Low (Trend)
         if current_close < orb_low:
             signals['trend_short'] = True
             signals['signal_type'] = '3rd Condition'
             signals['signal_dir'] = 'SHORT'
-            print("DEBUG_SIG: Triggered Trend Short")
+            log.debug("Triggered Trend Short")
 
     # ===== PDH/PDL RETEST SIGNALS =====
     if pdh is not None and pdl is not None:
         # Check if PDH was broken recently
-        broke_pdh = any(today_data['Close'] > pdh)
-        broke_pdl = any(today_data['Close'] < pdl)
+        if indicators is not None:
+            broke_pdh = indicators['broke_pdh']
+            broke_pdl = indicators['broke_pdl']
+        else:
+            broke_pdh = any(today_data['Close'] > pdh)
+            broke_pdl = any(today_data['Close'] < pdl)
         
         band_up = pdh * (1 + TOL_PCT / 100.0)
         band_dn = pdl * (1 - TOL_PCT / 100.0)
@@ -287,19 +614,21 @@ def check_signals(df, pdc, pdh, pdl, orb_high, orb_low):
             signals['pdh_retest_long'] = True
             signals['signal_type'] = 'PDH_Retest'
             signals['signal_dir'] = 'LONG'
-            print("DEBUG_SIG: Triggered PDH Retest")
+            log.debug("Triggered PDH Retest")
         
         # PDL Retest Short
         if broke_pdl and current_high >= band_dn and current_close < pdl:
             signals['pdl_retest_short'] = True
             signals['signal_type'] = 'PDL_Retest'
             signals['signal_dir'] = 'SHORT'
-            print("DEBUG_SIG: Triggered PDL Retest")
+            log.debug("Triggered PDL Retest")
     
     # Calculate ATR (14)
     # Calculate ATR (14) using Wilder's Smoothing (RMA) to match TradingView
     try:
-        if len(df) > 14:
+        if len(df) > 14 and indicators is not None:
+            atr = indicators['atr']
+        elif len(df) > 14:
             prev_close = df['Close'].shift(1)
             tr1 = df['High'] - df['Low']
             tr2 = (df['High'] - prev_close).abs()
@@ -320,9 +649,9 @@ def enrich_signals_with_targets(signals, current_high, current_low, atr):
     Compute Entry, SL, TP if signal is present
     """
     if signals['signal_type']:
-        buffer = 1.0
-        atr_mult_sl = 2.0
-        rr = 1.5
+        buffer = ENTRY_BUFFER
+        atr_mult_sl = SL_ATR_MULT
+        rr = REWARD_RISK
         
         is_long = signals['signal_dir'] == 'LONG'
         
@@ -345,12 +674,11 @@ def enrich_signals_with_targets(signals, current_high, current_low, atr):
     return signals
 
 
-def scan_stock(symbol, timeframe="5m"):
+def new_scan_result(symbol, timeframe):
     """
-    Main function to scan a single stock for PACPL signals
-    Returns: dict with stock name, price, and signal info
+    Empty per-timeframe scan result
     """
-    result = {
+    return {
         'symbol': symbol,
         'name': symbol.replace('.NS', ''),
         'price': None,
@@ -358,29 +686,56 @@ def scan_stock(symbol, timeframe="5m"):
         'signal_dir': None,
         'has_signal': False,
         'timeframe': timeframe,
+        'level_high': None,
+        'level_low': None,
         'error': None
     }
+
+
+def analyze_frame(symbol, timeframe, df):
+    """
+    Run the full PACPL pipeline on one (symbol, timeframe) frame
+    Daily levels, ORB, signals, ATR targets and display levels are all
+    derived from this single frame
+    Returns: dict with stock name, price, levels and signal info
+    """
+    result = new_scan_result(symbol, timeframe)
     
     try:
-        # Fetch data
-        df = get_stock_data(symbol, timeframe)
-        
         if df is None or len(df) < 2:
             result['error'] = 'Insufficient data'
             return result
         
-        # Calculate daily levels
-        pdc, pdh, pdl = calculate_daily_levels(df)
+        # Session boundaries, shared by every calculation below
+        session = SessionIndex(df.index)
+        
+        # Incremental ATR / ORB / break flags: only the new bars are processed
+        indicators = None
+        if INCREMENTAL_INDICATORS:
+            with timed('indicators'):
+                indicators = advance_indicators(symbol, timeframe, df)
+        
+        # Calculate ORB (also used as the level zone shown on the card)
+        if indicators is not None:
+            orb_high, orb_low = indicators['orb_high'], indicators['orb_low']
+        else:
+            with timed('orb'):
+                orb_high, orb_low = calculate_orb(df, session=session)
+        if orb_high is not None and orb_low is not None:
+            result['level_high'] = orb_high
+            result['level_low'] = orb_low
+        
+        # Calculate daily levels (cached for the rest of the session)
+        with timed('levels'):
+            pdc, pdh, pdl = get_daily_levels(symbol, timeframe, df, session)
         
         if pdc is None:
             result['error'] = 'Cannot calculate daily levels'
             return result
         
-        # Calculate ORB
-        orb_high, orb_low = calculate_orb(df)
-        
         # Check signals
-        signals = check_signals(df, pdc, pdh, pdl, orb_high, orb_low)
+        with timed('signals'):
+            signals = check_signals(df, pdc, pdh, pdl, orb_high, orb_low, session, indicators)
         
         # Merge all signal data including entry/sl/tp
         result.update(signals)
@@ -401,40 +756,30 @@ def scan_stock(symbol, timeframe="5m"):
     return result
 
 
-def scan_stock_dual_tf(symbol, timeframes):
+def scan_stock(symbol, timeframe="5m", df=None):
     """
-    Scan a stock on multiple timeframes
-    Returns: dict with results for each timeframe
+    Main function to scan a single stock for PACPL signals
+    Pass df to scan an already downloaded frame instead of fetching it
+    Returns: dict with stock name, price, and signal info
+    """
+    # Fetch data
+    if df is None:
+        df = get_stock_data(symbol, timeframe)
+    
+    return analyze_frame(symbol, timeframe, df)
+
+
+def combine_timeframes(symbol, tf_results):
+    """
+    Build the multi-timeframe result for a stock from its per-timeframe results
+    The first timeframe with a signal provides the top-level metadata
     """
     results = {
         'symbol': symbol,
         'name': symbol.replace('.NS', ''),
-        'timeframes': {}
+        'timeframes': tf_results
     }
     
-    for tf in timeframes:
-        # Get stock data
-        df = get_stock_data(symbol, tf)
-        
-        level_high = None
-        level_low = None
-        
-        if df is not None and len(df) >= 2:
-            # Calculate ORB for levels
-            orb_h, orb_l = calculate_orb(df)
-            if orb_h is not None and orb_l is not None:
-                level_high = orb_h
-                level_low = orb_l
-        
-        tf_result = scan_stock(symbol, tf)
-        
-        # Merge scan results with calculated levels
-        tf_data = tf_result.copy()
-        tf_data['level_high'] = level_high
-        tf_data['level_low'] = level_low
-        
-        results['timeframes'][tf] = tf_data
-    
     # Check if any timeframe has a signal and pull top-level metadata
     has_any = False
     for tf_data in results['timeframes'].values():
@@ -454,6 +799,98 @@ def scan_stock_dual_tf(symbol, timeframes):
     return results
 
 
+def scan_stock_dual_tf(symbol, timeframes, frames=None):
+    """
+    Scan a stock on multiple timeframes
+    Each frame is fetched (or derived) once and scanned from that frame
+    frames: optional dict of timeframe -> prefetched DataFrame (from a batch download)
+    Returns: dict with results for each timeframe
+    """
+    if frames is None:
+        frames = get_timeframe_frames(symbol, timeframes)
+    
+    # A missing frame means there was no data, don't refetch
+    tf_results = {tf: analyze_frame(symbol, tf, frames.get(tf)) for tf in timeframes}
+    
+    return combine_timeframes(symbol, tf_results)
+
+
+def evaluate_chunk(executor, chunk, frames, timeframes):
+    """
+    Evaluate the prefetched frames of one chunk of stocks
+    Uses the vectorized panel engine when PANEL_ENGINE is on, otherwise
+    scans each stock on the executor
+    Yields: (symbol, result) pairs, result is None if the stock failed
+    """
+    import concurrent.futures
+    
+    if PANEL_ENGINE:
+        from panel_engine import scan_panel_dual_tf
+        yield from scan_panel_dual_tf(frames, timeframes).items()
+        return
+    
+    future_to_stock = {
+        executor.submit(scan_stock_dual_tf, symbol, timeframes, frames[symbol]): symbol 
+        for symbol in chunk
+    }
+    
+    for future in concurrent.futures.as_completed(future_to_stock):
+        symbol = future_to_stock[future]
+        try:
+            yield symbol, future.result(timeout=10)
+        except Exception:
+            log.exception("%s generated an exception", symbol)
+            yield symbol, None
+
+
+
+def iter_scan_results(executor, stock_list, timeframes):
+    """
+    Two-stage scan: the fetch stage produces chunks of frames and the
+    evaluation stage turns them into results
+    With EVAL_PROCESSES set, evaluation runs on a process pool and overlaps
+    with fetching the next chunk
+    Yields: (symbol, result) pairs, result is None if the stock failed
+    """
+    chunks = iter_scan_frames(stock_list, timeframes)
+    if SIGNAL_STATE:
+        chunks = observe_chunks(chunks)
+    if EVAL_PROCESSES:
+        from eval_pool import evaluate_chunks
+        results = evaluate_chunks(chunks, timeframes, panel=PANEL_ENGINE)
+    else:
+        results = (pair for chunk, frames in chunks
+                   for pair in evaluate_chunk(executor, chunk, frames, timeframes))
+    for symbol, result in results:
+        if SIGNAL_STATE and result is not None:
+            result = apply_signal_state(result)
+        yield symbol, result
+
+
+def observe_chunks(chunks):
+    """
+    Pass fetched chunks through, checking each frame's new bars against
+    the SL / TP of its active signals
+    """
+    for chunk, frames in chunks:
+        for symbol in chunk:
+            for timeframe, df in (frames.get(symbol) or {}).items():
+                SIGNAL_STATES.observe(symbol, timeframe, df)
+        yield chunk, frames
+
+
+def apply_signal_state(result):
+    """
+    Run a stock's fresh result through its signal states (SIGNAL_STATE):
+    signals stay active from their first trigger until SL / TP, and
+    result['transitions'] lists what changed
+    """
+    transitions = SIGNAL_STATES.update(result)
+    result = combine_timeframes(result['symbol'], result['timeframes'])
+    result['transitions'] = transitions
+    SIGNAL_STATES.remember(result)
+    return result
+
 
 def scan_all_stocks(stock_list, timeframes=None):
     """
@@ -466,97 +903,88 @@ def scan_all_stocks(stock_list, timeframes=None):
     results = []
     
     # Use ThreadPoolExecutor for parallel scanning
-    # Adjust max_workers based on API limits and system capabilities
-    # 20 workers is a safe starting point for yfinance
     import concurrent.futures
     
-    print(f"Starting scan for {len(stock_list)} stocks on timeframes {timeframes}...")
+    log.info("Starting scan for %d stocks on timeframes %s", len(stock_list), timeframes)
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-        # Create a dictionary to map futures to stock symbols
-        future_to_stock = {
-            executor.submit(scan_stock_dual_tf, symbol, timeframes): symbol 
-            for symbol in stock_list
-        }
-        
-        # Process completed futures
-        for future in concurrent.futures.as_completed(future_to_stock):
-            symbol = future_to_stock[future]
-            try:
-                result = future.result()
-                # Only include stocks with active signals on any timeframe
-                if result['has_any_signal']:
-                    results.append(result)
-            except Exception as exc:
-                print(f'{symbol} generated an exception: {exc}')
+    with timed('scan'), concurrent.futures.ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        for symbol, result in iter_scan_results(executor, stock_list, timeframes):
+            # Only include stocks with active signals on any timeframe
+            if result is not None and result['has_any_signal']:
+                results.append(result)
                 
-    print(f"Scan complete. Found {len(results)} stocks with signals.")
+    log.info("Scan complete. Found %d stocks with signals.", len(results))
     return results
 
 
 
-def scan_stocks_generator(stock_list, timeframes=None):
+def scan_events(stock_list, timeframes=None):
     """
-    Generator that yields progress and results in real-time
-    Used for streaming responses to the frontend
+    Generator that yields scan events (start, progress, signal, done) as dicts
     """
     if timeframes is None:
         timeframes = TIMEFRAMES
     
     import concurrent.futures
-    import json
     import time
     
     total_stocks = len(stock_list)
     completed_count = 0
     
-    print(f"DEBUG: Starting generator for {total_stocks} stocks")
-    yield f"data: {json.dumps({'type': 'start', 'total': total_stocks})}\n\n"
+    log.info("Starting scan for %d stocks on timeframes %s", total_stocks, timeframes)
+    started = time.perf_counter()
+    yield {'type': 'start', 'total': total_stocks}
     
-# Use ThreadPoolExecutor for parallel scanning
-    # Reduced workers for Render Free Tier (Memory & CPU limits)
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_stock = {
-            executor.submit(scan_stock_dual_tf, symbol, timeframes): symbol 
-            for symbol in stock_list
-        }
-        
-        print("DEBUG: All tasks submitted to executor")
-        
-        for future in concurrent.futures.as_completed(future_to_stock):
-            symbol = future_to_stock[future]
+    # Use ThreadPoolExecutor for parallel scanning
+    # Keep SCAN_WORKERS low on Render Free Tier (Memory & CPU limits)
+    with timed('scan'), concurrent.futures.ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        # Fetch stage (FETCH_MODE) feeding the evaluation stage (EVAL_PROCESSES)
+        for symbol, result in iter_scan_results(executor, stock_list, timeframes):
             completed_count += 1
+            if result is None:
+                continue
             
-            try:
-                result = future.result(timeout=10)
-                # print(f"DEBUG: {symbol} completed")
-                
-                # Prepare progress update
-                progress_data = {
-                    'type': 'progress',
-                    'scanned': completed_count,
-                    'total': total_stocks,
-                    'symbol': symbol
+            # Prepare progress update
+            yield {
+                'type': 'progress',
+                'scanned': completed_count,
+                'total': total_stocks,
+                'symbol': symbol
+            }
+            
+            # With signal states only triggers and closes are sent
+            if SIGNAL_STATE:
+                yield from transition_events(result, result['transitions'])
+
+            # If signal found, yield signal data immediately
+            elif result.get('has_any_signal', False):
+                log.debug("Signal found in %s", symbol)
+                yield {
+                    'type': 'signal',
+                    'data': result
                 }
-                yield f"data: {json.dumps(progress_data)}\n\n"
-                
-                # If signal found, yield signal data immediately
-                if result.get('has_any_signal', False):
-                    print(f"DEBUG: SIGNAL FOUND in {symbol}")
-                    signal_data = {
-                        'type': 'signal',
-                        'data': result
-                    }
-                    yield f"data: {json.dumps(signal_data)}\n\n"
-                    
-            except Exception as exc:
-                print(f'{symbol} generated an exception: {exc}')
-                # trace back
-                import traceback
-                traceback.print_exc()
+    
+    log.info("Scan complete: %d stocks in %.2fs", completed_count, time.perf_counter() - started)
     
     # Send completion event
-    print("DEBUG: Generator finished")
-    yield f"data: {json.dumps({'type': 'done'})}\n\n"
+    yield {'type': 'done'}
+
+
+def format_sse(event, event_id=None):
+    """
+    Format a scan event as a Server-Sent Events message
+    """
+    import json
+    with timed('serialize'):
+        if event_id is not None:
+            return f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
+        return f"data: {json.dumps(event)}\n\n"
 
 
+def scan_stocks_generator(stock_list, timeframes=None):
+    """
+    Generator that yields progress and results in real-time
+    Used for streaming responses to the frontend
+    """
+    for event in scan_events(stock_list, timeframes):
+        yield format_sse(event)
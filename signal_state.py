@@ -0,0 +1,244 @@
+"""
+PACPL Screener - Signal State
+check_signals only says whether a condition holds on the latest bar, so
+the same signal would be reported on every scan. This keeps a small state
+machine per (symbol, timeframe) instead:
+
+    armed  --signal fires-->              active (first-trigger bar, entry / SL / TP frozen)
+    active --SL or TP hit once filled,--> closed
+             new session
+    active --a different signal fires-->  closed ("replaced"), then active again
+    closed --condition off, or another--> armed
+             signal, or a new session
+
+Every trigger and close is a transition with an increasing sequence
+number, so scans emit only transitions and clients catch up from the
+last sequence number they saw.
+
+A transition is returned once, by the update() call that applies it
+(SL / TP closes found by observe() by the next update() of the stock),
+so whichever scan path evaluates a stock first gets it. Scans overlapping
+in time and the live feed share theirs through ScanCoordinator.share().
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+
+from sse_codec import SIGNAL_FLAGS
+
+ARMED = 'armed'
+ACTIVE = 'active'
+CLOSED = 'closed'
+
+# Signal fields frozen at the first trigger; price and levels stay live
+FROZEN_FIELDS = [flag for flag, _, _ in SIGNAL_FLAGS] + [
+    'signal_type', 'signal_dir', 'entry', 'sl', 'tp', 'risk', 'atr']
+
+
+def _stamp(ts):
+    return ts.strftime('%Y-%m-%d %H:%M') if ts is not None else None
+
+
+class SignalState:
+    """
+    State of one (symbol, timeframe)
+    """
+
+    __slots__ = ('status', 'signal', 'first_at', 'filled_at', 'closed_at', 'outcome',
+                 'checked_from', 'last_bar', 'seq')
+
+    def __init__(self):
+        self.status = ARMED
+        self.signal = None          # Frozen signal fields while active / closed
+        self.first_at = None        # Bar the signal first fired on
+        self.filled_at = None       # Bar that reached the entry stop
+        self.closed_at = None
+        self.outcome = None         # 'sl', 'tp', 'replaced' or 'expired'
+        self.checked_from = None    # First bar not yet checked for SL / TP
+        self.last_bar = None        # Newest bar seen for this series
+        self.seq = 0                # Sequence number of the last transition
+
+    @property
+    def key(self):
+        return (self.signal['signal_type'], self.signal['signal_dir']) if self.signal else None
+
+
+class SignalStateStore:
+    """
+    Signal states of every (symbol, timeframe), plus the latest
+    state-applied result per symbol for catch-up snapshots
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._results = {}
+        self._pending = {}      # symbol -> transitions found by observe()
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def _state(self, symbol, timeframe):
+        state = self._states.get((symbol, timeframe))
+        if state is None:
+            state = self._states[(symbol, timeframe)] = SignalState()
+        return state
+
+    def _transition(self, symbol, timeframe, state, event, at):
+        self.seq += 1
+        state.seq = self.seq
+        transition = {
+            'event': event, 'seq': self.seq, 'symbol': symbol, 'timeframe': timeframe,
+            'signal_type': state.signal['signal_type'], 'signal_dir': state.signal['signal_dir'],
+            'first_at': _stamp(state.first_at), 'at': _stamp(at),
+        }
+        if event == 'closed':
+            transition['outcome'] = state.outcome
+        else:
+            transition.update(entry=state.signal.get('entry'), sl=state.signal.get('sl'),
+                              tp=state.signal.get('tp'))
+        return transition
+
+    def _close(self, symbol, timeframe, state, outcome, at):
+        state.status = CLOSED
+        state.outcome = outcome
+        state.closed_at = at
+        return self._transition(symbol, timeframe, state, 'closed', at)
+
+    def observe(self, symbol, timeframe, df):
+        """
+        Check the bars of a freshly fetched frame against the active
+        signal's entry, then SL and TP from the bar that filled it on, like
+        the backtest (the last bar again next time, it may still be
+        forming). A signal that never fills expires with its session
+        """
+        if df is None or df.empty:
+            return
+        with self._lock:
+            state = self._state(symbol, timeframe)
+            state.last_bar = df.index[-1]
+            if state.status != ACTIVE or state.signal.get('sl') is None:
+                return
+            start = df.index.searchsorted(state.checked_from) if state.checked_from is not None else len(df)
+            # Only the signal's own session, it expires at the next one
+            end = len(df)
+            if state.first_at is not None:
+                end = df.index.searchsorted(state.first_at.normalize() + pd.Timedelta(days=1))
+            high = df['High'].to_numpy()[start:end]
+            low = df['Low'].to_numpy()[start:end]
+            entry, sl, tp = state.signal.get('entry'), state.signal['sl'], state.signal['tp']
+            is_long = state.signal['signal_dir'] == 'LONG'
+            state.checked_from = df.index[-1]
+            if state.filled_at is None and entry is not None:
+                fills = np.flatnonzero(high >= entry if is_long else low <= entry)
+                if not len(fills):
+                    return
+                start += fills[0]
+                high, low = high[fills[0]:], low[fills[0]:]
+                state.filled_at = df.index[start]
+            if is_long:
+                hit_sl, hit_tp = low <= sl, high >= tp
+            else:
+                hit_sl, hit_tp = high >= sl, low <= tp
+            hits = np.flatnonzero(hit_sl | hit_tp)
+            if len(hits):
+                # Both in one bar counts as a loss, like the backtest
+                first = hits[0]
+                outcome = 'sl' if hit_sl[first] else 'tp'
+                transition = self._close(symbol, timeframe, state, outcome, df.index[start + first])
+                self._pending.setdefault(symbol, []).append(transition)
+
+    def update(self, result):
+        """
+        Apply a fresh scan result: trigger, replace, expire or re-arm each
+        timeframe's state, then make the result show the active signals
+        (frozen at their first trigger) rather than the latest bar's
+        Returns: the transitions, oldest first
+        """
+        symbol = result['symbol']
+        with self._lock:
+            transitions = self._pending.pop(symbol, [])
+            for timeframe, tf_data in result['timeframes'].items():
+                state = self._state(symbol, timeframe)
+                at = state.last_bar
+                day = at.normalize() if at is not None else None
+                fired = (tf_data['signal_type'], tf_data['signal_dir']) if tf_data.get('has_signal') else None
+
+                if state.status == ACTIVE and day is not None and state.first_at is not None \
+                        and state.first_at.normalize() != day:
+                    transitions.append(self._close(symbol, timeframe, state, 'expired', at))
+                if state.status == CLOSED and (fired != state.key or day is None or state.closed_at is None
+                                               or state.closed_at.normalize() != day):
+                    state.status = ARMED
+                if fired is not None and (state.status == ARMED or
+                                          (state.status == ACTIVE and fired != state.key)):
+                    if state.status == ACTIVE:
+                        transitions.append(self._close(symbol, timeframe, state, 'replaced', at))
+                    state.status = ACTIVE
+                    state.signal = {field: tf_data.get(field) for field in FROZEN_FIELDS}
+                    state.first_at = at
+                    state.outcome = state.closed_at = state.filled_at = None
+                    # From the bar after the trigger (bars are whole minutes)
+                    state.checked_from = at + pd.Timedelta(seconds=1) if at is not None else None
+                    transitions.append(self._transition(symbol, timeframe, state, 'trigger', at))
+
+                if state.status == ACTIVE:
+                    tf_data.update(state.signal)
+                    tf_data['has_signal'] = True
+                    tf_data['first_at'] = _stamp(state.first_at)
+                else:
+                    tf_data.update({field: None for field in FROZEN_FIELDS})
+                    tf_data.update({flag: False for flag, _, _ in SIGNAL_FLAGS})
+                    tf_data['has_signal'] = False
+        return transitions
+
+    def remember(self, result):
+        with self._lock:
+            self._results[result['symbol']] = result
+
+    def changes(self, since=None, symbols=None):
+        """
+        Catch-up events bringing a client from sequence number `since` to
+        now (everything active if since is None): a 'signal' event per
+        stock with a newly active signal, a 'closed' event per signal
+        closed since
+        Returns: (events, current sequence number)
+        """
+        wanted = set(symbols) if symbols is not None else None
+        with self._lock:
+            closed, active = [], {}
+            for (symbol, timeframe), state in self._states.items():
+                if wanted is not None and symbol not in wanted:
+                    continue
+                if since is not None and state.seq <= since:
+                    continue
+                if state.status == ACTIVE:
+                    active[symbol] = max(active.get(symbol, 0), state.seq)
+                elif since is not None and state.signal is not None:
+                    closed.append(closed_event(symbol, timeframe, state.outcome, state.seq))
+            signals = [{'type': 'signal', 'data': self._results[symbol], 'seq': seq}
+                       for symbol, seq in active.items() if symbol in self._results]
+            return closed + signals, self.seq
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._results.clear()
+            self._pending.clear()
+
+
+def closed_event(symbol, timeframe, outcome, seq):
+    return {'type': 'closed', 'symbol': symbol, 'name': symbol.replace('.NS', ''),
+            'timeframe': timeframe, 'outcome': outcome, 'seq': seq}
+
+
+def transition_events(result, transitions):
+    """
+    Scan events for one stock's transitions: 'closed' per closed signal,
+    then the stock's result if anything triggered
+    """
+    events = [closed_event(t['symbol'], t['timeframe'], t['outcome'], t['seq'])
+              for t in transitions if t['event'] == 'closed']
+    triggered = [t['seq'] for t in transitions if t['event'] == 'trigger']
+    if triggered:
+        events.append({'type': 'signal', 'data': result, 'seq': max(triggered)})
+    return events
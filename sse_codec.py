@@ -0,0 +1,229 @@
+"""
+PACPL Screener - Compact SSE Encoding
+Smaller scan stream for /api/scan/stream?compact=1:
+- signal flags packed into one bitmask per timeframe
+- progress batched every SSE_PROGRESS_EVERY stocks
+- with ?since=<scan id>, only new/changed signals are sent; price-only
+  changes and cleared signals arrive in one batch with the done event
+- with signal states (SIGNAL_STATE) only transitions are sent: 's' for a
+  triggered signal, 'x' for a closed one, each with its sequence number
+  ('q'), and ?since=<sequence number> catches up from there
+static/app.js decodes it (decodeCompactStock); decode_stock here is the
+Python reference for the same format.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import config
+from metrics import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# In check_signals order: when several flags are set, the last one decides
+# signal_type / signal_dir, so the decoder can derive them from the mask
+SIGNAL_FLAGS = [
+    ('follow_long', 'Follow', 'LONG'),
+    ('follow_short', 'Follow', 'SHORT'),
+    ('fade_short', 'Fade', 'SHORT'),
+    ('fade_long', 'Fade', 'LONG'),
+    ('reversal_long', '3rd Condition', 'LONG'),
+    ('reversal_short', '3rd Condition', 'SHORT'),
+    ('trend_long', '3rd Condition', 'LONG'),
+    ('trend_short', '3rd Condition', 'SHORT'),
+    ('pdh_retest_long', 'PDH_Retest', 'LONG'),
+    ('pdl_retest_short', 'PDL_Retest', 'SHORT'),
+]
+
+# Per-timeframe fields after the mask; field 0 (price) may change without
+# the signal itself changing
+TF_FIELDS = ['price', 'level_high', 'level_low', 'entry', 'sl', 'tp']
+
+# Signals of recent scans by scan id, the baselines for ?since= diffs
+HISTORY_SIZE = 8
+SIGNAL_HISTORY = OrderedDict()
+# Streams of several scans read and write it from their own threads
+_history_lock = threading.Lock()
+
+_encoder = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+
+def dumps(obj):
+    """
+    Compact JSON, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return _encoder.encode(obj)
+
+
+def _num(value):
+    return None if value is None else float(round(value, 2))
+
+
+def encode_timeframe(tf_result):
+    """
+    [mask, price, level_high, level_low, entry, sl, tp], or 0 without a signal
+    """
+    if not tf_result or not tf_result.get('has_signal'):
+        return 0
+    mask = 0
+    for bit, (flag, _, _) in enumerate(SIGNAL_FLAGS):
+        if tf_result.get(flag):
+            mask |= 1 << bit
+    return [mask] + [_num(tf_result.get(field)) for field in TF_FIELDS]
+
+
+def encode_stock(result, timeframes):
+    """
+    [name, tf0, tf1, ...] for a scan_stock_dual_tf result
+    """
+    tf_results = result.get('timeframes', {})
+    return [result['name']] + [encode_timeframe(tf_results.get(tf)) for tf in timeframes]
+
+
+def decode_timeframe(encoded, timeframe):
+    if not encoded:
+        return {'has_signal': False, 'timeframe': timeframe}
+    mask = encoded[0]
+    tf_result = {'has_signal': True, 'timeframe': timeframe,
+                 'signal_type': None, 'signal_dir': None}
+    for bit, (flag, signal_type, signal_dir) in enumerate(SIGNAL_FLAGS):
+        tf_result[flag] = bool(mask >> bit & 1)
+        if tf_result[flag]:
+            tf_result['signal_type'] = signal_type
+            tf_result['signal_dir'] = signal_dir
+    tf_result.update(zip(TF_FIELDS, encoded[1:]))
+    return tf_result
+
+
+def decode_stock(record, timeframes):
+    """
+    Rebuild the fields the frontend uses from an encoded stock
+    """
+    return {
+        'name': record[0],
+        'timeframes': {tf: decode_timeframe(enc, tf) for tf, enc in zip(timeframes, record[1:])},
+    }
+
+
+def _without_prices(record):
+    return [record[0]] + [enc and [enc[0]] + enc[2:] for enc in record[1:]]
+
+
+def _prices(record):
+    return [record[0]] + [enc and enc[1] for enc in record[1:]]
+
+
+def remember(scan_id, signals):
+    with _history_lock:
+        SIGNAL_HISTORY[scan_id] = signals
+        SIGNAL_HISTORY.move_to_end(scan_id)
+        while len(SIGNAL_HISTORY) > HISTORY_SIZE:
+            SIGNAL_HISTORY.popitem(last=False)
+
+
+def recall(scan_id):
+    """
+    Signals remembered for a scan id, or None
+    """
+    with _history_lock:
+        return SIGNAL_HISTORY.get(scan_id)
+
+
+class CompactStream:
+    """
+    Turns the scan events of one run into compact SSE messages
+    since: id of the last scan the client received in full; if we still
+    know its signals, only the differences are sent
+    seq: signal state sequence number the stream starts from (SIGNAL_STATE);
+    since is then the client's last sequence number and events carry theirs
+    """
+
+    def __init__(self, scan_id, timeframes, since=None, progress_every=None, seq=None):
+        self.scan_id = scan_id
+        self.timeframes = list(timeframes)
+        self.seq = seq
+        if seq is not None:
+            self.baseline = None
+            self.full = since is None
+        else:
+            self.baseline = recall(since) if since is not None else None
+            self.full = self.baseline is None
+        self.progress_every = progress_every or config.SSE_PROGRESS_EVERY
+        self.signals = {}
+        self.total = 0
+        self.scanned = 0
+        self.sent_scanned = 0
+
+    def encode(self, event, event_id=None):
+        """
+        Compact SSE messages for one scan event (possibly none)
+        """
+        payload = self._payload(event)
+        if payload is None:
+            return []
+        with timed('serialize'):
+            if event_id is not None:
+                return [f"id: {event_id}\ndata: {dumps(payload)}\n\n"]
+            return [f"data: {dumps(payload)}\n\n"]
+
+    def catch_up(self, events):
+        """
+        Update the stream state with events the client already received
+        (on a resumed connection), without serializing anything
+        """
+        for event in events:
+            self._payload(event)
+
+    def _payload(self, event):
+        kind = event.get('type')
+        if kind == 'start':
+            self.total = event['total']
+            start = {
+                't': 'start', 'id': self.scan_id, 'n': self.total, 'tfs': self.timeframes,
+                'full': self.full,
+            }
+            if self.seq is not None:
+                start['q'] = self.seq
+            return start
+
+        if kind == 'progress':
+            self.scanned = event['scanned']
+            if self.scanned - self.sent_scanned < self.progress_every:
+                return None
+            self.sent_scanned = self.scanned
+            return {'t': 'p', 'n': self.scanned}
+
+        if kind == 'signal':
+            record = encode_stock(event['data'], self.timeframes)
+            self.signals[record[0]] = record
+            old = self.baseline.get(record[0]) if self.baseline is not None else None
+            if old is not None and _without_prices(old) == _without_prices(record):
+                # Same signal as last scan; its new price goes out with done
+                return None
+            if 'seq' in event:
+                return {'t': 's', 'd': record, 'q': event['seq']}
+            return {'t': 's', 'd': record}
+
+        if kind == 'closed':
+            return {'t': 'x', 'd': [event['name'], event['timeframe']],
+                    'o': event['outcome'], 'q': event['seq']}
+
+        if kind == 'done':
+            remember(self.scan_id, self.signals)
+            done = {'t': 'done', 'n': self.scanned}
+            if self.baseline is not None:
+                done['cleared'] = [name for name in self.baseline if name not in self.signals]
+                done['px'] = [
+                    _prices(record) for name, record in self.signals.items()
+                    if name in self.baseline and record != self.baseline[name]
+                    and _without_prices(record) == _without_prices(self.baseline[name])
+                ]
+            return done
+
+        return {'t': kind, **{k: v for k, v in event.items() if k != 'type'}}
@@ -3,6 +3,49 @@
 let currentTab = 'ce'; // 'ce' (Call) or 'pe' (Put)
 let currentTimeframe = '1m'; // Default to 1 minute
 let autoRefreshTimer = null;
+// Universe to scan (see /api/universes), from the page URL: /?universe=nifty50
+const currentUniverse = new URLSearchParams(window.location.search).get('universe') || '';
+
+// Compact scan stream format (must match sse_codec.py)
+// Flags in check_signals order: the last set flag decides type / direction
+const SIGNAL_FLAGS = [
+    ['follow_long', 'Follow', 'LONG'],
+    ['follow_short', 'Follow', 'SHORT'],
+    ['fade_short', 'Fade', 'SHORT'],
+    ['fade_long', 'Fade', 'LONG'],
+    ['reversal_long', '3rd Condition', 'LONG'],
+    ['reversal_short', '3rd Condition', 'SHORT'],
+    ['trend_long', '3rd Condition', 'LONG'],
+    ['trend_short', '3rd Condition', 'SHORT'],
+    ['pdh_retest_long', 'PDH_Retest', 'LONG'],
+    ['pdl_retest_short', 'PDL_Retest', 'SHORT'],
+];
+const TF_FIELDS = ['price', 'level_high', 'level_low', 'entry', 'sl', 'tp'];
+
+// Expand a compact stock ([name, tf0, tf1, ...], each tf 0 or
+// [mask, price, level_high, level_low, entry, sl, tp]) into the
+// shape createSignalCard expects
+function decodeCompactStock(record, timeframes) {
+    const stock = { name: record[0], timeframes: {} };
+    timeframes.forEach((tf, i) => {
+        const enc = record[i + 1];
+        const tfData = { has_signal: !!enc, timeframe: tf, signal_type: null, signal_dir: null };
+        if (enc) {
+            SIGNAL_FLAGS.forEach(([flag, type, dir], bit) => {
+                tfData[flag] = ((enc[0] >> bit) & 1) === 1;
+                if (tfData[flag]) {
+                    tfData.signal_type = type;
+                    tfData.signal_dir = dir;
+                }
+            });
+            TF_FIELDS.forEach((field, j) => {
+                tfData[field] = enc[j + 1];
+            });
+        }
+        stock.timeframes[tf] = tfData;
+    });
+    return stock;
+}
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -127,6 +170,7 @@ async function checkLicense() {
             document.getElementById('licenseOverlay').style.display = 'none';
             performScan();
             startAutoRefresh();
+            followLiveSignals();
         } else {
             localStorage.removeItem('pacpl_license_key');
             document.getElementById('licenseOverlay').style.display = 'flex';
@@ -157,6 +201,7 @@ async function validateLicense(key) {
             document.getElementById('licenseOverlay').style.display = 'none';
             performScan();
             startAutoRefresh();
+            followLiveSignals();
         } else {
             errorEl.textContent = result.message || 'Activation Failed';
         }
@@ -194,25 +239,101 @@ async function performScan() {
     if (detectedEl) detectedEl.textContent = '0';
     if (totalScannedEl) totalScannedEl.textContent = '0';
 
-    container.innerHTML = `
+    const scanningHTML = `
         <div class="no-signals" id="scanning-msg">
             <div class="no-signals-icon">⏳</div>
             <h3>Scanning Nifty Stocks...</h3>
             <p>Processing: <span id="scan-progress">0</span> completed</p>
         </div>
     `;
+    container.innerHTML = scanningHTML;
 
     // Start EventSource with license key and device id
+    // Compact stream; after a finished scan ask only for what changed since
     const licenseKey = localStorage.getItem('pacpl_license_key');
     const deviceId = getDeviceId();
-    const url = `/api/scan/stream?timeframe=${currentTimeframe}&t=${Date.now()}&license_key=${licenseKey || ''}&device_id=${deviceId}`;
+    // (with signal states: since the last transition we got)
+    const last = window.lastSeq !== undefined ? window.lastSeq : window.lastScanId;
+    const since = last !== undefined && window.lastSignalsData ? `&since=${last}` : '';
+    const url = `/api/scan/stream?timeframe=${currentTimeframe}&t=${Date.now()}&license_key=${licenseKey || ''}&device_id=${deviceId}&compact=1${since}${currentUniverse ? `&universe=${encodeURIComponent(currentUniverse)}` : ''}`;
     const eventSource = new EventSource(url);
 
     // Used to remove the "Scanning..." message once first signal arrives
     let firstSignal = true;
 
+    // Compact stream state
+    let scanTotal = 0;
+    let scanTimeframes = [];
+    let diffMode = false;
+    const newSignals = new Set();
+
+    // Turn a compact message into the verbose event handled below
+    // (null if there is nothing more to do)
+    function fromCompact(msg) {
+        switch (msg.t) {
+            case 'start':
+                scanTotal = msg.n;
+                scanTimeframes = msg.tfs;
+                diffMode = !msg.full;
+                window.lastScanId = msg.id;
+                if (msg.q !== undefined) window.lastSeq = msg.q;
+                if (diffMode) {
+                    // Unchanged signals aren't sent again: show the ones we have
+                    renderSignals(window.lastSignalsData || []);
+                    firstSignal = !document.querySelector('.signals-grid');
+                    if (firstSignal) container.innerHTML = scanningHTML;
+                } else {
+                    window.lastSignalsData = [];
+                }
+                return null;
+            case 'p':
+                return { type: 'progress', scanned: msg.n, total: scanTotal };
+            case 's':
+                newSignals.add(msg.d[0]);
+                seenSeq(msg.q);
+                return { type: 'signal', data: decodeCompactStock(msg.d, scanTimeframes) };
+            case 'x':
+                seenSeq(msg.q);
+                closeSignal(msg.d[0], msg.d[1]);
+                return null;
+            case 'done':
+                stocksScanned = msg.n;
+                if (totalScannedEl) totalScannedEl.textContent = stocksScanned;
+                if (diffMode) applyCompactDiff(msg);
+                return { type: 'done' };
+            default:
+                console.error('Scan stream error:', msg);
+                return null;
+        }
+    }
+
+    // Drop cleared signals, update prices of unchanged ones and redraw
+    function applyCompactDiff(msg) {
+        const cleared = new Set(msg.cleared || []);
+        const stocks = (window.lastSignalsData || []).filter(s => !cleared.has(s.name));
+        for (const [name, ...prices] of (msg.px || [])) {
+            const stock = stocks.find(s => s.name === name);
+            if (!stock) continue;
+            scanTimeframes.forEach((tf, i) => {
+                if (prices[i] && stock.timeframes[tf]) stock.timeframes[tf].price = prices[i];
+            });
+        }
+        window.lastSignalsData = stocks;
+        renderSignals(stocks, newSignals);
+        signalsFound = document.querySelectorAll('.signal-card').length;
+        if (detectedEl) detectedEl.textContent = signalsFound;
+    }
+
+    function seenSeq(seq) {
+        if (seq !== undefined) window.lastSeq = Math.max(window.lastSeq || 0, seq);
+    }
+
     eventSource.onmessage = function (event) {
-        const data = JSON.parse(event.data);
+        let data = JSON.parse(event.data);
+        if (data.t !== undefined) {
+            data = fromCompact(data);
+            if (!data) return;
+        }
 
         if (data.type === 'progress') {
             // Update counts
@@ -262,7 +383,9 @@ async function performScan() {
                 // Get grid container
                 const grid = document.querySelector('.signals-grid') || container;
 
-                // Render card with NEW tag
+                // Render card with NEW tag, replacing the stock's old card
+                const oldCard = grid.querySelector(`[data-symbol="${CSS.escape(stock.name)}"]`);
+                if (oldCard) oldCard.remove();
                 const cardHTML = createSignalCard(stock, true);
                 grid.insertAdjacentHTML('afterbegin', cardHTML); // Add to TOP
             }
@@ -280,7 +403,15 @@ async function performScan() {
         }
     };
 
+    // Dropped connections are retried by the browser with Last-Event-ID,
+    // and the server carries on from the last event we got
+    let reconnects = 0;
+
     eventSource.onerror = function (err) {
+        if (eventSource.readyState === EventSource.CONNECTING && reconnects++ < 5) {
+            console.warn("Scan stream dropped, resuming...");
+            return;
+        }
         console.error("EventSource failed:", err);
         eventSource.close();
         if (stocksScanned === 0) {
@@ -325,6 +456,66 @@ async function performScan() {
     }
 }
 
+// Live feed (LIVE_FEED on the server): signals pushed as bars arrive
+let liveSource = null;
+
+async function followLiveSignals() {
+    if (liveSource) return;
+    try {
+        const status = await (await fetch('/api/live')).json();
+        if (!status.enabled) return;
+    } catch (err) {
+        return;
+    }
+    // The browser reconnects on its own and the server resumes after the
+    // last signal we got (Last-Event-ID)
+    const licenseKey = localStorage.getItem('pacpl_license_key');
+    liveSource = new EventSource(`/api/live/stream?license_key=${licenseKey || ''}&device_id=${getDeviceId()}`);
+    liveSource.onmessage = function (event) {
+        const data = JSON.parse(event.data);
+        if (data.type === 'signal') showLiveSignal(data.data);
+        else if (data.type === 'closed') closeSignal(data.name, data.timeframe);
+    };
+}
+
+// A signal hit its SL / TP (or expired): drop that timeframe, and the
+// stock's card once none of its signals is left
+function closeSignal(name, timeframe) {
+    const stock = (window.lastSignalsData || []).find(s => s.name === name);
+    if (stock && stock.timeframes[timeframe]) stock.timeframes[timeframe].has_signal = false;
+    const active = stock && Object.values(stock.timeframes).some(tf => tf.has_signal);
+    if (!active) window.lastSignalsData = (window.lastSignalsData || []).filter(s => s.name !== name);
+
+    const card = document.querySelector(`.signal-card[data-symbol="${CSS.escape(name)}"]`);
+    if (card && active) card.outerHTML = createSignalCard(stock);
+    else if (card) card.remove();
+    const detectedEl = document.getElementById('detectedSignals');
+    if (detectedEl) detectedEl.textContent = document.querySelectorAll('.signal-card').length;
+}
+
+function showLiveSignal(stock) {
+    // Always store for tab switching re-render
+    window.lastSignalsData = (window.lastSignalsData || []).filter(s => s.name !== stock.name);
+    window.lastSignalsData.push(stock);
+
+    const primaryTF = Object.values(stock.timeframes).find(tf => tf.has_signal);
+    const signalDir = primaryTF ? primaryTF.signal_dir : null;
+    if (!((currentTab === 'ce' && signalDir === 'LONG') || (currentTab === 'pe' && signalDir === 'SHORT'))) return;
+
+    const container = document.getElementById('signalsContainer');
+    let grid = container.querySelector('.signals-grid');
+    if (!grid) {
+        container.innerHTML = '<div class="signals-grid"></div>';
+        grid = container.querySelector('.signals-grid');
+    }
+    const oldCard = grid.querySelector(`[data-symbol="${CSS.escape(stock.name)}"]`);
+    if (oldCard) oldCard.remove();
+    grid.insertAdjacentHTML('afterbegin', createSignalCard(stock, true));
+
+    const detectedEl = document.getElementById('detectedSignals');
+    if (detectedEl) detectedEl.textContent = grid.querySelectorAll('.signal-card').length;
+}
+
 async function loadMockData() {
     console.log('🎭 Loading mock data...');
 
@@ -379,7 +570,7 @@ function updateDashboard(data) {
     }
 }
 
-function renderSignals(signals) {
+function renderSignals(signals, newSignals = null) {
     const container = document.getElementById('signalsContainer');
 
     if (!signals || signals.length === 0) {
@@ -427,7 +618,7 @@ function renderSignals(signals) {
     // Render cards
     container.innerHTML = `
         <div class="signals-grid">
-            ${filteredSignals.map(stock => createSignalCard(stock)).join('')}
+            ${filteredSignals.map(stock => createSignalCard(stock, !!newSignals && newSignals.has(stock.name))).join('')}
         </div>
     `;
 }
@@ -450,7 +641,7 @@ function createSignalCard(stock, isNew = false) {
     const distance = ((Math.abs(price - (isCE ? levelLow : levelHigh)) / price) * 100).toFixed(2);
 
     return `
-        <div class="signal-card ${isCE ? 'bullish' : 'bearish'}">
+        <div class="signal-card ${isCE ? 'bullish' : 'bearish'}" data-symbol="${stock.name}">
             ${isNew ? '<span class="new-tag">NEW</span>' : ''}
             <div class="card-badge ${isCE ? 'bullish' : 'bearish'}">
                 ${conditionLabel}
@@ -0,0 +1,173 @@
+"""
+PACPL Screener - Symbol Health
+Negative cache for symbols that return no data: each failure skips the
+symbol for a while, doubling with every consecutive failure, and a
+successful fetch clears it. With a state file the cache is shared by all
+gunicorn workers, so a dead ticker is only retried once per backoff period.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+import config
+
+log = logging.getLogger(__name__)
+
+# Failure kinds that mean "the provider has nothing for this symbol".
+# Other errors (timeouts, HTTP errors) are reported but never cause a skip.
+SKIP_REASONS = {'no_data', 'not_found'}
+
+
+def _lock_exclusive(lock_file):
+    """
+    Block until this process holds the lock file (released when it is closed)
+    """
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return
+    # msvcrt gives up after 10 tries a second apart; keep waiting
+    while True:
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            pass
+
+
+class SymbolHealth:
+    """
+    Failure counts and skip deadlines per symbol
+    `symbol in health` is True while the symbol is being skipped
+    """
+
+    def __init__(self, path=None, ttl=None, max_ttl=None, clock=time.time):
+        self.path = path
+        self.ttl = config.SYMBOL_FAIL_TTL if ttl is None else ttl
+        self.max_ttl = config.SYMBOL_FAIL_MAX_TTL if max_ttl is None else max_ttl
+        self.clock = clock
+        self._entries = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, symbol):
+        self._refresh()
+        entry = self._entries.get(symbol)
+        return entry is not None and entry['skip_until'] > self.clock()
+
+    def record_failure(self, symbol, reason='no_data', detail=None):
+        """
+        Count a failed fetch; no_data / not_found failures start (or extend) a skip
+        """
+        now = self.clock()
+
+        def apply(entries):
+            entry = entries.get(symbol) or {'failures': 0, 'skip_until': 0}
+            entry['last_failure'] = now
+            entry['reason'] = reason
+            entry['detail'] = detail
+            if reason in SKIP_REASONS:
+                entry['failures'] += 1
+                backoff = min(self.ttl * 2 ** (entry['failures'] - 1), self.max_ttl)
+                entry['skip_until'] = now + backoff
+            else:
+                entry['errors'] = entry.get('errors', 0) + 1
+            entries[symbol] = entry
+
+        self._update(apply)
+        log.debug("%s failed (%s: %s)", symbol, reason, detail)
+
+    def record_success(self, symbol):
+        """
+        A fetch returned data: forget earlier failures
+        """
+        self._refresh()
+        if symbol not in self._entries:
+            return
+        self._update(lambda entries: entries.pop(symbol, None))
+
+    def report(self):
+        """
+        Every symbol with recorded failures, the ones being skipped first
+        """
+        self._refresh(force=True)
+        now = self.clock()
+        with self._lock:
+            entries = dict(self._entries)
+        rows = [{
+            'symbol': symbol,
+            'skipping': entry['skip_until'] > now,
+            'reason': entry.get('reason'),
+            'detail': entry.get('detail'),
+            'failures': entry['failures'],
+            'errors': entry.get('errors', 0),
+            'last_failure': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_failure'])),
+            'retry_in_secs': max(0, round(entry['skip_until'] - now)),
+        } for symbol, entry in entries.items()]
+        rows.sort(key=lambda row: (not row['skipping'], row['symbol']))
+        return rows
+
+    def clear(self):
+        self._update(lambda entries: entries.clear())
+
+    # Shared state file
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            log.warning("Ignoring unreadable symbol health file %s: %s", self.path, e)
+            return {}
+
+    def _refresh(self, force=False):
+        """
+        Pick up changes written by other workers (checked at most once a second)
+        """
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked < 1.0:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            entries = self._read()
+            with self._lock:
+                self._entries = entries
+                self._mtime = mtime
+
+    def _update(self, apply):
+        """
+        Read-modify-write under an exclusive file lock, so concurrent
+        workers don't lose each other's updates
+        """
+        if not self.path:
+            with self._lock:
+                apply(self._entries)
+            return
+
+        with self._lock, open(self.path + '.lock', 'w') as lock_file:
+            _lock_exclusive(lock_file)
+            entries = self._read()
+            apply(entries)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+            self._entries = entries
+            self._mtime = os.stat(self.path).st_mtime_ns
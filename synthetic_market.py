@@ -0,0 +1,148 @@
+"""
+PACPL Screener - Synthetic Market Data
+Seeded intraday OHLCV for any symbol, shaped to exercise every PACPL
+rule: opening gaps of both sizes, ORB breakouts with follow-through or
+reversal, and PDH/PDL breaks that come back to retest the level.
+
+A SyntheticMarket is a market data provider (providers.py): it can stand
+in for yfinance directly, or be played back by a ReplayProvider.
+"""
+
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from config import SESSION_START
+from providers import MarketDataProvider, window_bars
+from screener_logic import resample_ohlcv, timeframe_minutes
+
+SESSION_BARS = 375      # 09:15-15:30 in 1m bars
+
+# Day shapes and how often they occur
+REGIMES = {
+    'follow': 0.3,      # Keeps moving in the direction of the gap
+    'reverse': 0.25,    # Breaks the other side of the opening range
+    'range': 0.15,
+    'retest_pdh': 0.15,
+    'retest_pdl': 0.15,
+}
+
+
+class SyntheticMarket(MarketDataProvider):
+    """
+    Deterministic market: the same seed and symbol always give the same bars
+    days: sessions of history ending at `end`
+    today_bars: bars of the last session so far (default: a full session)
+    missing: share of symbols that return no data, like delisted tickers
+    """
+
+    name = "synthetic"
+
+    def __init__(self, seed=0, days=5, end="2026-02-13", today_bars=SESSION_BARS,
+                 volatility=0.0007, missing=0.0, tz='Asia/Kolkata'):
+        self.seed = seed
+        self.days = days
+        self.end = pd.Timestamp(end)
+        self.today_bars = today_bars
+        self.volatility = volatility
+        self.missing = missing
+        self.tz = tz
+        self._bars = {}
+
+    def _rng(self, symbol):
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+
+    def last_day(self):
+        return self.end
+
+    def has_data(self, symbol):
+        return self._rng(symbol).random() >= self.missing
+
+    def bars(self, symbol):
+        """
+        1m bars of a symbol, generated on first use
+        """
+        df = self._bars.get(symbol)
+        if df is None:
+            df = self._bars[symbol] = self._generate(symbol)
+        return df
+
+    def _generate(self, symbol):
+        rng = self._rng(symbol)
+        rng.random()    # has_data draw
+        hour, minute = map(int, SESSION_START.split(':'))
+        sessions = pd.bdate_range(end=self.end, periods=self.days)
+        sizes = [SESSION_BARS] * (self.days - 1) + [self.today_bars]
+
+        index, columns = [], []
+        pdc = rng.uniform(50, 3000)
+        pdh = pdl = None
+        for day, size in zip(sessions, sizes):
+            start = day + pd.Timedelta(hours=hour, minutes=minute)
+            index.append(pd.date_range(start, periods=size, freq='1min'))
+            close = self._session_path(rng, pdc, pdh, pdl)[:size]
+            open_ = np.concatenate([[close[0]], close[:-1]])
+            open_[0] = close[0] * (1 + rng.normal(0, self.volatility / 2))
+            wick = np.abs(rng.normal(0, self.volatility / 3, (2, size))) * close
+            high = np.maximum(open_, close) + wick[0]
+            low = np.minimum(open_, close) - wick[1]
+            # U-shaped intraday volume
+            shape = 1 + 2 * ((np.arange(size) - SESSION_BARS / 2) / SESSION_BARS) ** 2
+            volume = (rng.lognormal(8, 0.4, size) * shape).round()
+            columns.append(np.vstack([open_, high, low, close, volume]))
+            pdc, pdh, pdl = close[-1], high.max(), low.min()
+
+        data = np.hstack(columns).T
+        return pd.DataFrame(data, columns=['Open', 'High', 'Low', 'Close', 'Volume'],
+                            index=pd.DatetimeIndex(np.concatenate(index), name='Datetime').tz_localize(self.tz))
+
+    def _session_path(self, rng, pdc, pdh, pdl):
+        """
+        Closes of one full session: waypoints for the day's shape joined by
+        random-walk bridges
+        """
+        large = rng.random() < 0.45
+        gap = rng.uniform(0.5, 2.0) if large else rng.uniform(0.03, 0.45)
+        gap *= rng.choice([-1, 1]) / 100.0
+        open_ = pdc * (1 + gap)
+        regime = rng.choice(list(REGIMES), p=list(REGIMES.values()))
+        if pdh is None and regime.startswith('retest'):
+            regime = 'follow'
+
+        side = 1 if gap > 0 else -1
+        move = rng.uniform(0.004, 0.015)
+        points = [(0, open_), (rng.integers(10, 20), open_ * (1 + rng.normal(0, 0.002)))]
+        if regime == 'follow':
+            points.append((SESSION_BARS - 1, open_ * (1 + side * move)))
+        elif regime == 'reverse':
+            points.append((SESSION_BARS - 1, open_ * (1 - side * move)))
+        elif regime == 'range':
+            points.append((SESSION_BARS - 1, open_ * (1 + rng.normal(0, 0.002))))
+        else:
+            level, sign = (pdh, 1) if regime == 'retest_pdh' else (pdl, -1)
+            broke = rng.integers(60, 180)
+            points += [
+                (broke, level * (1 + sign * rng.uniform(0.002, 0.006))),
+                (broke + rng.integers(15, 60), level * (1 + sign * rng.uniform(0.0001, 0.0004))),
+                (SESSION_BARS - 1, level * (1 + sign * rng.uniform(0.003, 0.01))),
+            ]
+
+        path = np.empty(SESSION_BARS)
+        for (a, pa), (b, pb) in zip(points, points[1:]):
+            steps = b - a
+            walk = np.cumsum(rng.normal(0, self.volatility, steps))
+            # Bridge: the walk starts at a and ends exactly on b's price
+            walk -= np.arange(1, steps + 1) / steps * walk[-1]
+            path[a + 1:b + 1] = np.exp(np.log(pa) + np.arange(1, steps + 1) / steps * np.log(pb / pa) + walk)
+        path[0] = open_
+        return path
+
+    def history(self, symbol, period, interval, start=None):
+        """
+        One symbol's bars, like yfinance Ticker.history (empty if no data)
+        """
+        if not self.has_data(symbol) or not timeframe_minutes(interval):
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        df = window_bars(self.bars(symbol), period, start, self.tz)
+        return df if interval == "1m" else resample_ohlcv(df, interval)
@@ -0,0 +1,180 @@
+"""
+Tests for the ASGI serving mode, including a concurrent-stream load test
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+import config
+import license_manager
+import loadtest
+from scan_coordinator import ScanCoordinator
+from test_scan_coordinator import SlowScan
+
+CLIENTS = 300
+
+
+@pytest.fixture(scope="module")
+def web(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(config, 'SCHEDULER_ENABLED', False)
+        mp.setattr(license_manager, 'LICENSE_DB', str(tmp_path_factory.mktemp('db') / 'licenses.db'))
+        import app
+        import asgi
+        yield app, asgi
+
+
+@pytest.fixture
+def scan(web, monkeypatch):
+    app, _ = web
+    scan = SlowScan(delay=0.001)
+    monkeypatch.setattr(app, 'coordinator', ScanCoordinator(scan_fn=scan))
+    monkeypatch.setattr(app, 'current_stocks', [f"S{i}.NS" for i in range(20)])
+    monkeypatch.setattr(license_manager, 'validate_license', lambda key, device_id=None: (True, "Success"))
+    return scan
+
+
+async def serve(asgi_app):
+    """
+    Bare-bones HTTP/1.1 server for an ASGI app (one request per connection)
+    """
+    server = None
+    open_streams = []
+
+    async def handle(reader, writer):
+        method, target, _ = (await reader.readline()).decode().split(' ', 2)
+        headers = []
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, value = line.decode().split(':', 1)
+            headers.append((name.strip().lower().encode(), value.strip().encode()))
+        path, _, query = target.partition('?')
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+                 'headers': headers, 'http_version': '1.1', 'scheme': 'http',
+                 'server': server.sockets[0].getsockname()[:2], 'client': ('127.0.0.1', 0)}
+        closed = asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                lines = [f"HTTP/1.1 {message['status']} OK", "Connection: close"]
+                lines += [f"{k.decode()}: {v.decode()}" for k, v in message['headers']]
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+                open_streams.append(writer)
+            else:
+                writer.write(message.get('body', b''))
+                await writer.drain()
+
+        try:
+            await asgi_app(scope, receive, send)
+        finally:
+            closed.set()
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0, backlog=1024)
+    return server, open_streams
+
+
+def call(asgi_app, path, query=b'', headers=()):
+    """
+    One request straight through the ASGI app: (status, body)
+    """
+    sent = []
+    received = []
+
+    async def receive():
+        if received:
+            await asyncio.Event().wait()     # Client stays connected
+        received.append(True)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+             'headers': list(headers), 'server': ('testserver', 80)}
+    asyncio.run(asgi_app(scope, receive, send))
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_hundreds_of_streams_without_a_thread_each(web, scan):
+    _, asgi = web
+    app = asgi.ScreenerASGI(asgi.web.app)
+    threads_before = threading.active_count()
+
+    async def main():
+        server, open_streams = await serve(app)
+        port = server.sockets[0].getsockname()[1]
+        load = asyncio.ensure_future(loadtest.run_load(f"http://127.0.0.1:{port}", CLIENTS,
+                                                       {'license_key': 'K'}, timeout=60))
+        # Every client is connected and waiting on the (paused) scan
+        while len(open_streams) < CLIENTS:
+            await asyncio.sleep(0.01)
+        extra_threads = threading.active_count() - threads_before
+        scan.release.set()
+        summary = await load
+        server.close()
+        return summary, extra_threads
+
+    summary, extra_threads = asyncio.run(main())
+    print(summary)
+
+    assert summary['completed'] == CLIENTS and summary['failed'] == 0
+    assert summary['events'] == CLIENTS * (2 + 2 * 20)
+    assert scan.runs == 1
+    # The scan thread and the small executor pool, not one thread per stream
+    assert extra_threads <= config.ASGI_THREADS + 2
+
+
+def test_resume_and_compact_over_asgi(web, scan):
+    _, asgi = web
+    scan.release.set()
+
+    status, body = call(asgi.app, '/api/scan/stream', b'license_key=K&device_id=D')
+    messages = body.decode().strip().split('\n\n')
+    assert status == 200 and json.loads(messages[-1].split('data: ')[1]) == {'type': 'done'}
+
+    last_id = messages[9].split('\n')[0][len('id: '):]
+    _, rest = call(asgi.app, '/api/scan/stream', b'license_key=K',
+                   [(b'last-event-id', last_id.encode())])
+    assert rest.decode().strip().split('\n\n') == messages[10:]
+    assert scan.runs == 1
+
+    _, compact = call(asgi.app, '/api/scan/stream', b'license_key=K&compact=1')
+    assert len(compact) < len(body) / 3
+
+
+def test_rejected_license_and_flask_routes(web, monkeypatch):
+    _, asgi = web
+    monkeypatch.setattr(license_manager, 'validate_license', lambda key, device_id=None: (False, "Invalid License Key"))
+
+    status, body = call(asgi.app, '/api/scan/stream', b'license_key=BAD')
+    assert status == 403 and json.loads(body)['error'] == "Invalid License Key"
+
+    status, body = call(asgi.app, '/api/metrics')
+    assert status == 200 and json.loads(body)['success'] is True
+
+
+def test_repeated_request_headers_are_joined(web):
+    _, asgi = web
+
+    def echo(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [json.dumps({k: environ.get(k) for k in ('HTTP_COOKIE', 'HTTP_FORWARDED')}).encode()]
+
+    status, body = call(asgi.ScreenerASGI(echo, threads=1), '/echo', headers=[
+        (b'cookie', b'a=1'), (b'forwarded', b'for=10.0.0.1'),
+        (b'cookie', b'b=2'), (b'forwarded', b'for=10.0.0.2')])
+
+    assert status == 200
+    assert json.loads(body) == {'HTTP_COOKIE': 'a=1; b=2', 'HTTP_FORWARDED': 'for=10.0.0.1, for=10.0.0.2'}
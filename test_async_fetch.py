@@ -0,0 +1,238 @@
+"""
+Tests for the async fetch pipeline against a local fake chart API server
+that adds latency and answers some requests with 429
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pandas as pd
+import pytest
+
+import screener_logic
+from async_fetch import AsyncFetcher, TokenBucket, iter_async_frames
+from bar_store import BarStore
+from test_batch_fetch import make_bars, install
+
+
+def chart_payload(df):
+    return {'chart': {'error': None, 'result': [{
+        'meta': {'exchangeTimezoneName': 'Asia/Kolkata'},
+        'timestamp': [int(ts.timestamp()) for ts in df.index],
+        'indicators': {'quote': [{
+            'open': df['Open'].tolist(),
+            'high': df['High'].tolist(),
+            'low': df['Low'].tolist(),
+            'close': df['Close'].tolist(),
+            'volume': df['Volume'].tolist(),
+        }]},
+    }]}}
+
+
+class FakeChartServer:
+    """Chart API stand-in: serves a universe of frames with some latency,
+    throttles the first `throttle` requests of every symbol with a 429 and
+    records concurrency and client connections"""
+
+    def __init__(self, universe, latency=0.02, throttle=1):
+        self.universe = universe
+        self.latency = latency
+        self.throttle = throttle
+        self.hits = {}
+        self.queries = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake.handle(self)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v8/finance/chart"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, request):
+        parts = urlsplit(request.path)
+        symbol = parts.path.rsplit('/', 1)[-1]
+        query = parse_qs(parts.query)
+        with self.lock:
+            self.connections.add(request.client_address)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            hits = self.hits[symbol] = self.hits.get(symbol, 0) + 1
+            self.queries.append(query)
+        try:
+            time.sleep(self.latency)
+            if hits <= self.throttle:
+                self.reply(request, 429, {}, {'Retry-After': '0'})
+            elif symbol not in self.universe:
+                self.reply(request, 404, {'chart': {'result': None, 'error': {'code': 'Not Found'}}})
+            else:
+                df = self.universe[symbol]
+                if 'period1' in query:
+                    since = pd.Timestamp(int(query['period1'][0]), unit='s', tz='UTC')
+                    df = df[df.index >= since]
+                self.reply(request, 200, chart_payload(df))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def reply(self, request, status, body, headers=None):
+        data = json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def universe():
+    return {f"S{i}.NS": make_bars(i) for i in range(12)}
+
+
+@pytest.fixture
+def server(universe):
+    fake = FakeChartServer(universe)
+    yield fake
+    fake.close()
+
+
+def make_fetcher(server, **kwargs):
+    options = dict(base_url=server.url, concurrency=4, rate=1000, burst=100, retries=3, backoff=0.01)
+    options.update(kwargs)
+    return AsyncFetcher(**options)
+
+
+def test_pipeline_retries_throttled_requests_within_limits(monkeypatch, server, universe):
+    install(monkeypatch, {})
+    fetcher = make_fetcher(server)
+
+    chunks = list(iter_async_frames(list(universe) + ['DEAD.NS'], ["1m", "2m"],
+                                    chunk_size=5, fetcher=fetcher))
+    fetcher.close()
+
+    assert [len(chunk) for chunk, _ in chunks] == [5, 5, 3]
+    frames = {s: f for _, chunk_frames in chunks for s, f in chunk_frames.items()}
+    for symbol, df in universe.items():
+        got = frames[symbol]["1m"]
+        pd.testing.assert_frame_equal(got, df, check_dtype=False, check_index_type=False, check_freq=False)
+        pd.testing.assert_frame_equal(frames[symbol]["2m"], screener_logic.resample_ohlcv(got, "2m"))
+    assert frames['DEAD.NS'] == {"1m": None, "2m": None}
+    assert 'DEAD.NS' in screener_logic.SYMBOL_HEALTH
+
+    # Every symbol was throttled once and retried; never more than 4 in flight
+    assert all(hits == 2 for hits in server.hits.values())
+    assert server.max_in_flight <= 4
+    # Keep-alive connections are reused instead of one per request
+    assert len(server.connections) <= 4
+
+
+def test_second_scan_only_fetches_new_bars(monkeypatch, server, universe):
+    install(monkeypatch, {})
+    monkeypatch.setattr(BarStore, 'fetch_start',
+                        lambda self, s, tf: self.last_timestamp(s, tf))
+    fetcher = make_fetcher(server)
+    symbols = list(universe)[:3]
+    full = {s: df.copy() for s, df in universe.items()}
+    for s in symbols:
+        universe[s] = full[s].iloc[:-10]
+
+    list(iter_async_frames(symbols, ["1m"], fetcher=fetcher))
+    server.queries.clear()
+    for s in symbols:
+        universe[s] = full[s]
+    chunks = list(iter_async_frames(symbols, ["1m"], fetcher=fetcher))
+    fetcher.close()
+
+    assert server.queries and all('period1' in q and 'range' not in q for q in server.queries)
+    for s in symbols:
+        pd.testing.assert_frame_equal(chunks[0][1][s]["1m"], full[s],
+                                      check_dtype=False, check_index_type=False, check_freq=False)
+
+
+def test_token_bucket_limits_request_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+
+    async def burst():
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(15)))
+        return time.monotonic() - started
+
+    # 5 tokens up front, the other 10 at 50/s
+    elapsed = asyncio.run(burst())
+    assert 0.18 <= elapsed < 1.0
+
+
+def test_each_live_loop_keeps_its_semaphore(server):
+    fetcher = make_fetcher(server)
+
+    async def semaphore():
+        return fetcher._semaphore()
+
+    loop = asyncio.new_event_loop()
+    first = loop.run_until_complete(semaphore())
+    # Another scan's loop does not take the first one's slots away
+    assert asyncio.run(semaphore()) is not first
+    assert loop.run_until_complete(semaphore()) is first
+    loop.close()
+    asyncio.run(semaphore())
+    assert len(fetcher._semaphores) == 1    # Closed loops are forgotten
+    fetcher.close()
+
+
+def test_gives_up_after_retries(monkeypatch, universe):
+    install(monkeypatch, {})
+    fake = FakeChartServer(universe, latency=0, throttle=100)
+    fetcher = make_fetcher(fake, retries=2)
+    try:
+        chunks = list(iter_async_frames(['S1.NS'], ["1m"], fetcher=fetcher))
+    finally:
+        fetcher.close()
+        fake.close()
+
+    assert chunks[0][1]['S1.NS']["1m"] is None
+    assert fake.hits['S1.NS'] == 3
+    # A temporary failure doesn't make later scans skip the symbol
+    assert 'S1.NS' not in screener_logic.SYMBOL_HEALTH
+
+
+def test_async_scan_matches_batch_scan(monkeypatch, server, universe):
+    monkeypatch.setattr(screener_logic, 'PANEL_ENGINE', False)
+    install(monkeypatch, universe)
+    batch = {e['data']['symbol']: e['data'] for e in screener_logic.scan_events(list(universe))
+             if e['type'] == 'signal'}
+
+    install(monkeypatch, {})
+    fetcher = make_fetcher(server)
+    monkeypatch.setattr(screener_logic, 'FETCH_MODE', "async")
+    monkeypatch.setattr('async_fetch.get_fetcher', lambda: fetcher)
+    events = list(screener_logic.scan_events(list(universe)))
+    fetcher.close()
+
+    signals = {e['data']['symbol']: e['data'] for e in events if e['type'] == 'signal'}
+    assert events[-1] == {'type': 'done'}
+    assert sum(e['type'] == 'progress' for e in events) == len(universe)
+    # Transitions are numbered in completion order, which differs
+    for result in list(batch.values()) + list(signals.values()):
+        result.pop('transitions', None)
+    assert batch and signals == batch
@@ -0,0 +1,105 @@
+"""
+Tests for the vectorized backtester
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import screener_logic
+from bar_store import BarStore
+from test_batch_fetch import make_bars
+from test_panel_engine import scenario
+
+
+@pytest.fixture
+def live_scan(monkeypatch):
+    """analyze_frame as a full (non-incremental) scan of a frame"""
+    monkeypatch.setattr(screener_logic, 'INCREMENTAL_INDICATORS', False)
+
+    def scan(df):
+        screener_logic.DAILY_LEVELS_CACHE.clear()
+        return screener_logic.analyze_frame('S.NS', '1m', df)
+    return scan
+
+
+def test_flags_match_check_signals_at_every_bar(live_scan):
+    for seed in range(8):
+        df = scenario(seed)
+        flags = backtest.signal_flags(backtest.build_sessions({'S.NS': df}, '1m'))
+        session = screener_logic.SessionIndex(df.index)
+        for t in range(0, len(df), 9):
+            result = live_scan(df.iloc[:t + 1])
+            day = np.searchsorted(session.starts, t, side='right') - 1
+            for flag in backtest.SIGNAL_TYPES:
+                assert flags[flag][day, t - session.starts[day]] == bool(result.get(flag)), (seed, t, flag)
+
+
+def test_trade_targets_match_the_signal_card(live_scan):
+    frames = {f"S{seed}.NS": scenario(seed) for seed in range(20)}
+    trades = backtest.run_backtest(frames, '1m', chunk_size=7)
+
+    assert trades['flag'].nunique() > 3
+    for trade in trades.itertuples():
+        df = frames[trade.symbol]
+        result = live_scan(df[df.index.tz_localize(None) <= trade.time])
+        assert result[trade.flag]
+        if result['signal_dir'] == trade.signal_dir:
+            assert (result['entry'], result['sl'], result['tp']) == (trade.entry, trade.sl, trade.tp)
+
+
+def test_simulated_outcomes():
+    # Long signals at bar 0 with entry 101, ATR 1: risk 2, SL 99, TP 104
+    high = np.array([
+        [100.0, 100.5, 101.5, 104.2, 102.0],   # fills at bar 2, TP at bar 3
+        [100.0, 101.2, 100.0, 98.9, np.nan],   # fills, then SL
+        [100.0, 100.2, 100.4, 100.1, 100.0],   # never reaches the entry
+        [100.0, 101.5, 102.0, 101.8, 101.6],   # open at the close
+        [100.0, 104.5, 100.0, 100.0, 100.0],   # SL and TP in the fill bar: a loss
+    ])
+    low = np.minimum(high - 0.5, [[99.0, 100.0, 100.5, 103.0, 101.0],
+                                  [99.0, 100.5, 99.5, 98.8, np.nan],
+                                  [99.0] * 5,
+                                  [99.0, 100.8, 101.0, 101.0, 101.0],
+                                  [99.0, 98.5, 99.5, 99.5, 99.5]])
+    close = (high + low) / 2
+    sessions = {
+        'high': high, 'low': low, 'close': close,
+        'count': np.array([5, 4, 5, 5, 5]),
+        'atr': np.ones_like(high),
+    }
+
+    out = backtest.simulate(sessions, 'follow_long', np.arange(5), np.zeros(5, dtype=int))
+
+    assert (out['entry'] == 101).all() and (out['sl'] == 99).all() and (out['tp'] == 104).all()
+    assert list(out['outcome']) == ['tp', 'sl', 'unfilled', 'close', 'sl']
+    np.testing.assert_allclose(out['r'], [1.5, -1.0, np.nan, (close[3, 4] - 101) / 2, -1.0])
+    assert list(out['bars_to_fill']) == [2, 1, -1, 1, 1]
+
+
+def test_summary_per_signal_type():
+    trades = pd.DataFrame({
+        'flag': ['follow_long', 'follow_long', 'follow_long', 'trend_short'],
+        'signal_type': ['Follow', 'Follow', 'Follow', '3rd Condition'],
+        'outcome': ['tp', 'sl', 'unfilled', 'close'],
+        'r': [1.5, -1.0, np.nan, 0.25],
+    })
+
+    summary = backtest.summarize(trades, 'signal_type')
+
+    follow = summary.loc['Follow']
+    assert (follow['signals'], follow['filled'], follow['tp'], follow['sl']) == (3, 2, 1, 1)
+    assert follow['hit_rate'] == 0.5 and follow['avg_r'] == 0.25 and follow['total_r'] == 0.5
+    assert summary.loc['3rd Condition', 'close'] == 1
+
+
+def test_loads_history_from_the_bar_cache(tmp_path):
+    store = BarStore(cache_dir=str(tmp_path))
+    store.save('A.NS', '1m', make_bars(1, days=4, bars_per_day=30))
+
+    frames = backtest.load_frames(['A.NS', 'B.NS'], '2m', start='2026-02-10', end='2026-02-11', store=store)
+
+    assert frames['B.NS'] is None
+    assert list(frames['A.NS'].index.normalize().unique().strftime('%Y-%m-%d')) == ['2026-02-10', '2026-02-11']
+    assert len(frames['A.NS']) == 30
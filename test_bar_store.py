@@ -0,0 +1,176 @@
+"""
+Offline tests for the incremental bar store
+"""
+
+import mmap
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import screener_logic
+from bar_store import BarStore
+from test_batch_fetch import make_bars, install
+
+
+def test_merge_replaces_updated_bars_and_trims_sessions():
+    store = BarStore(days=2)
+    full = make_bars(1, days=3, bars_per_day=10)
+
+    store.merge('A.NS', '1m', full.iloc[:25])
+    # The last bar was still forming when first fetched
+    update = full.iloc[24:].copy()
+    update.iloc[0, update.columns.get_loc('Close')] += 1.0
+    merged = store.merge('A.NS', '1m', update)
+
+    assert merged.index.is_unique
+    assert merged.index.normalize().nunique() == 2
+    assert merged['Close'].iloc[14] == update['Close'].iloc[0]
+    pd.testing.assert_frame_equal(merged, store.get('A.NS', '1m'))
+
+
+def test_snapshot_round_trip(tmp_path):
+    df = make_bars(2)
+    BarStore(cache_dir=str(tmp_path)).merge('M&M.NS', '1m', df)
+
+    reloaded = BarStore(cache_dir=str(tmp_path))
+
+    assert reloaded.stored_days('M&M.NS', '1m') == ['2026-02-09', '2026-02-10']
+    # Volume comes back as float, timestamps at second resolution
+    pd.testing.assert_frame_equal(reloaded.get('M&M.NS', '1m'), df, check_dtype=False,
+                                  check_index_type=False, check_freq=False)
+
+
+def test_disk_keeps_completed_days_and_rewrites_only_the_session(tmp_path):
+    full = make_bars(6, days=4, bars_per_day=20)
+    store = BarStore(days=2, cache_dir=str(tmp_path))
+    store.merge('A.NS', '1m', full.iloc[:-5])
+    series_dir = os.path.join(str(tmp_path), '1m', 'A.NS')
+    before = {name: os.stat(os.path.join(series_dir, name)).st_mtime_ns
+              for name in os.listdir(series_dir)}
+
+    store.merge('A.NS', '1m', full.iloc[-6:])
+    after = {name: os.stat(os.path.join(series_dir, name)).st_mtime_ns
+             for name in os.listdir(series_dir)}
+
+    # Memory holds the last 2 sessions, disk all 4
+    assert store.get('A.NS', '1m').index.normalize().nunique() == 2
+    assert len(after) == 4
+    changed = [name for name in after if after[name] != before[name]]
+    assert changed == ['2026-02-12.npy']
+
+    # A restart loads the last 2 sessions, today included in full
+    reloaded = BarStore(days=2, cache_dir=str(tmp_path)).get('A.NS', '1m')
+    pd.testing.assert_frame_equal(reloaded, full.iloc[-40:], check_dtype=False,
+                                  check_index_type=False, check_freq=False)
+
+
+def test_loaded_day_does_not_keep_its_file_mapped(tmp_path):
+    df = make_bars(4, days=1)
+    BarStore(cache_dir=str(tmp_path)).merge('A.NS', '1m', df)
+    store = BarStore(cache_dir=str(tmp_path))
+    store.load('A.NS', '1m')
+
+    values = store._bars[('A.NS', '1m')]['Close'].to_numpy()
+    while values is not None:
+        assert not isinstance(values, (np.memmap, mmap.mmap))
+        values = getattr(values, 'base', None)
+    # Rewriting the day replaces the file under the cached bars
+    store.merge('A.NS', '1m', df.iloc[-1:])
+
+
+def test_concurrent_merges_of_one_day(tmp_path):
+    full = make_bars(5, days=1, bars_per_day=40)
+    store = BarStore(cache_dir=str(tmp_path))
+    other = BarStore(cache_dir=str(tmp_path))     # Another worker process
+    errors = []
+
+    def merge(store, end):
+        try:
+            store.merge('A.NS', '1m', full.iloc[:end])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=merge, args=(s, end))
+               for end in range(10, 41, 3) for s in (store, other)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(store.get('A.NS', '1m')) == 40
+    series_dir = os.path.join(str(tmp_path), '1m', 'A.NS')
+    assert os.listdir(series_dir) == ['2026-02-09.npy']
+    assert len(BarStore(cache_dir=str(tmp_path)).get('A.NS', '1m')) in range(10, 41)
+
+
+def test_cache_write_failure_is_not_fatal(tmp_path, monkeypatch, caplog):
+    df = make_bars(6, days=1)
+    store = BarStore(cache_dir=str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, 'save', fail)
+    merged = store.merge('A.NS', '1m', df)
+
+    assert len(merged) == len(df)
+    assert "disk full" in caplog.text
+    assert os.listdir(os.path.join(str(tmp_path), '1m', 'A.NS')) == []
+
+
+def test_restart_only_fetches_the_current_session(tmp_path, monkeypatch):
+    full = make_bars(7, days=3, bars_per_day=60)
+    provider = install(monkeypatch, {'A.NS': full.iloc[:-10]})
+    monkeypatch.setattr(BarStore, 'fetch_start',
+                        lambda self, s, tf: self.last_timestamp(s, tf))
+    monkeypatch.setattr(screener_logic, 'BAR_STORE', BarStore(cache_dir=str(tmp_path)))
+    screener_logic.get_stock_data_batch(['A.NS'], "1m")
+
+    # New process: empty memory, same cache directory
+    monkeypatch.setattr(screener_logic, 'BAR_STORE', BarStore(cache_dir=str(tmp_path)))
+    provider.universe = {'A.NS': full}
+    frames = screener_logic.get_stock_data_batch(['A.NS'], "1m")
+
+    # Delta download from the last bar on disk
+    assert provider.starts == [None, full.index[-11]]
+    pd.testing.assert_frame_equal(frames['A.NS'], full, check_dtype=False,
+                                  check_index_type=False, check_freq=False)
+
+
+def test_second_scan_only_fetches_delta(monkeypatch):
+    full = make_bars(3, days=2, bars_per_day=60)
+    universe = {'A.NS': full.iloc[:-3], 'B.NS': make_bars(4, days=2, bars_per_day=60).iloc[:-3]}
+    provider = install(monkeypatch, universe)
+    monkeypatch.setattr(BarStore, 'fetch_start',
+                        lambda self, s, tf: self.last_timestamp(s, tf))
+
+    screener_logic.get_stock_data_batch(['A.NS', 'B.NS'], "1m")
+    provider.universe = {'A.NS': full}
+    frames = screener_logic.get_stock_data_batch(['A.NS', 'B.NS'], "1m")
+
+    assert len(provider.calls) == 2
+    pd.testing.assert_frame_equal(frames['A.NS'], full, check_freq=False)
+    # B had no new bars: served from the store, not skipped
+    assert len(frames['B.NS']) == len(universe['B.NS'])
+    assert 'B.NS' not in screener_logic.SYMBOL_HEALTH
+
+
+def test_daily_levels_computed_once_per_session(monkeypatch):
+    install(monkeypatch, {})
+    calls = []
+    real = screener_logic.calculate_daily_levels
+
+    def counting(df, session=None):
+        calls.append(1)
+        return real(df, session)
+    monkeypatch.setattr(screener_logic, 'calculate_daily_levels', counting)
+
+    df = make_bars(5, days=2, bars_per_day=30)
+    first = screener_logic.get_daily_levels('A.NS', '1m', df.iloc[:-5].copy())
+    second = screener_logic.get_daily_levels('A.NS', '1m', df.copy())
+
+    assert first == second
+    assert len(calls) == 1
@@ -0,0 +1,116 @@
+"""
+Offline tests for the batched OHLCV download layer
+Uses a fake bulk provider instead of Yahoo Finance
+"""
+
+import numpy as np
+import pandas as pd
+
+import providers
+import screener_logic
+from bar_store import BarStore
+from signal_state import SignalStateStore
+from symbol_health import SymbolHealth
+
+
+def make_bars(seed=0, days=2, bars_per_day=30, freq_mins=1):
+    """Build a small tz-aware intraday frame starting at 09:15 IST each day"""
+    rng = np.random.default_rng(seed)
+    index = []
+    for d in range(days):
+        start = pd.Timestamp("2026-02-09 09:15", tz="Asia/Kolkata") + pd.Timedelta(days=d)
+        index.extend(start + pd.Timedelta(minutes=freq_mins * i) for i in range(bars_per_day))
+    close = 100 + rng.normal(0, 0.3, len(index)).cumsum()
+    open_ = close + rng.normal(0, 0.1, len(index))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + 0.2,
+        'Low': np.minimum(open_, close) - 0.2,
+        'Close': close,
+        'Volume': rng.integers(1000, 5000, len(index)),
+    }, index=pd.DatetimeIndex(index, name='Datetime'))
+
+
+class FakeProvider:
+    """Bulk downloader stand-in that records every request"""
+
+    def __init__(self, universe):
+        self.universe = universe
+        self.calls = []
+        self.starts = []
+
+    def __call__(self, tickers, period, interval, start=None):
+        self.calls.append((list(tickers), period, interval))
+        self.starts.append(start)
+        present = {t: self.universe[t] for t in tickers if t in self.universe}
+        if start is not None:
+            present = {t: df[df.index >= start] for t, df in present.items()}
+            present = {t: df for t, df in present.items() if not df.empty}
+        if not present:
+            return pd.DataFrame()
+        return pd.concat(present, axis=1, sort=True)
+
+
+def install(monkeypatch, universe):
+    provider = FakeProvider(universe)
+    monkeypatch.setattr(screener_logic, 'BATCH_DOWNLOADER', provider)
+    monkeypatch.setattr(screener_logic, 'SYMBOL_HEALTH', SymbolHealth())
+    monkeypatch.setattr(screener_logic, 'BAR_STORE', BarStore())
+    monkeypatch.setattr(screener_logic, 'DAILY_LEVELS_CACHE', {})
+    monkeypatch.setattr(screener_logic, 'INDICATOR_STATES', {})
+    monkeypatch.setattr(screener_logic, 'SIGNAL_STATES', SignalStateStore())
+
+    def no_single_fetch(*args, **kwargs):
+        raise AssertionError("per-ticker fetch should not be used")
+    monkeypatch.setattr(providers.yf, 'Ticker', no_single_fetch)
+    return provider
+
+
+def test_split_batch_frame_drops_alignment_gaps():
+    a = make_bars(1)
+    b = make_bars(2).iloc[5:]
+    wide = pd.concat({'A.NS': a, 'B.NS': b}, axis=1)
+
+    frames = screener_logic.split_batch_frame(wide, ['A.NS', 'B.NS', 'C.NS'])
+
+    assert set(frames) == {'A.NS', 'B.NS'}
+    assert len(frames['A.NS']) == len(a)
+    assert len(frames['B.NS']) == len(b)
+    assert list(frames['B.NS'].columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def test_batch_fetch_is_chunked(monkeypatch):
+    universe = {f"S{i}.NS": make_bars(i) for i in range(7)}
+    provider = install(monkeypatch, universe)
+
+    frames = screener_logic.get_stock_data_batch(list(universe) + ['DEAD.NS'], "1m", chunk_size=3)
+
+    assert len(provider.calls) == 3
+    assert all(len(tickers) <= 3 for tickers, _, _ in provider.calls)
+    assert frames['DEAD.NS'] is None
+    assert 'DEAD.NS' in screener_logic.SYMBOL_HEALTH
+    pd.testing.assert_frame_equal(frames['S4.NS'], universe['S4.NS'], check_freq=False)
+
+
+def test_scan_all_stocks_uses_bulk_requests(monkeypatch):
+    universe = {f"S{i}.NS": make_bars(i) for i in range(5)}
+    provider = install(monkeypatch, universe)
+    monkeypatch.setattr(screener_logic, 'BATCH_SIZE', 2)
+
+    screener_logic.scan_all_stocks(list(universe), ["1m", "2m"])
+
+    # 3 chunks x 1 downloaded timeframe (2m is resampled from 1m),
+    # independent of the number of symbols per chunk
+    assert len(provider.calls) == 3
+    assert {interval for _, _, interval in provider.calls} == {"1m"}
+
+
+def test_prefetched_frames_match_single_scan(monkeypatch):
+    df = make_bars(3)
+    install(monkeypatch, {'A.NS': df})
+
+    batched = screener_logic.scan_stock_dual_tf('A.NS', ["1m"], {"1m": df.copy()})
+    single = screener_logic.scan_stock('A.NS', "1m", df=df.copy())
+
+    assert batched['timeframes']['1m']['price'] == single['price']
+    assert batched['timeframes']['1m']['error'] is None
@@ -0,0 +1,89 @@
+"""
+Tests for the process-pool evaluation stage and its shared-memory frames
+"""
+
+import concurrent.futures
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+import eval_pool
+import screener_logic
+from eval_pool import evaluate_chunks, pack_frames, unpack_frames
+from test_batch_fetch import install
+from test_panel_engine import scenario, assert_same
+
+TIMEFRAMES = ["1m", "2m"]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    workers = concurrent.futures.ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+    yield workers
+    workers.shutdown()
+
+
+@pytest.fixture
+def frames():
+    out = {}
+    for seed in range(40):
+        df = scenario(seed)
+        out[f"S{seed}.NS"] = {"1m": df, "2m": screener_logic.resample_ohlcv(df, "2m")}
+    out['DEAD.NS'] = {"1m": None, "2m": None}
+    return out
+
+
+def test_shared_memory_round_trip(frames):
+    shm, layout = pack_frames(frames)
+    try:
+        unpacked = unpack_frames(shm.buf, layout)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert unpacked.keys() == frames.keys()
+    assert unpacked['DEAD.NS'] == {"1m": None, "2m": None}
+    for symbol, tf_frames in frames.items():
+        for tf, df in tf_frames.items():
+            if df is not None:
+                pd.testing.assert_frame_equal(unpacked[symbol][tf], df, check_dtype=False,
+                                              check_index_type=False, check_freq=False,
+                                              check_names=False)
+
+
+@pytest.mark.parametrize("panel", [True, False])
+def test_pool_matches_in_thread_evaluation(monkeypatch, pool, frames, panel):
+    monkeypatch.setattr(screener_logic, 'DAILY_LEVELS_CACHE', {})
+    monkeypatch.setattr(screener_logic, 'INDICATOR_STATES', {})
+    symbols = list(frames)
+    chunks = [(symbols[i:i + 15], {s: frames[s] for s in symbols[i:i + 15]})
+              for i in range(0, len(symbols), 15)]
+
+    results = dict(evaluate_chunks(iter(chunks), TIMEFRAMES, pool=pool, panel=panel))
+
+    assert results.keys() == frames.keys()
+    for symbol, tf_frames in frames.items():
+        expected = screener_logic.scan_stock_dual_tf(symbol, TIMEFRAMES, tf_frames)
+        assert results[symbol]['has_any_signal'] == expected['has_any_signal']
+        for tf in TIMEFRAMES:
+            assert_same(expected['timeframes'][tf], results[symbol]['timeframes'][tf])
+
+
+def test_scan_events_with_process_pool(monkeypatch, pool, frames):
+    universe = {s: tf_frames["1m"] for s, tf_frames in frames.items() if tf_frames["1m"] is not None}
+    install(monkeypatch, universe)
+    baseline = list(screener_logic.scan_events(list(universe), TIMEFRAMES))
+
+    install(monkeypatch, universe)
+    monkeypatch.setattr(screener_logic, 'EVAL_PROCESSES', 2)
+    monkeypatch.setattr(eval_pool, 'get_pool', lambda: pool)
+    events = list(screener_logic.scan_events(list(universe), TIMEFRAMES))
+
+    def signals(evs):
+        return {e['data']['symbol']: e['data'] for e in evs if e['type'] == 'signal'}
+
+    assert events[-1] == {'type': 'done'}
+    assert sum(e['type'] == 'progress' for e in events) == len(universe)
+    assert signals(events) and signals(events) == signals(baseline)
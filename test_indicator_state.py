@@ -0,0 +1,110 @@
+"""
+Tests for the incremental indicator state against full recomputation
+"""
+
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import screener_logic
+from indicator_state import IndicatorState
+from test_panel_engine import scenario
+
+
+def full_recompute(df):
+    prev_close = df['Close'].shift(1)
+    tr = pd.concat([df['High'] - df['Low'], (df['High'] - prev_close).abs(),
+                    (df['Low'] - prev_close).abs()], axis=1).max(axis=1)
+    atr = tr.ewm(alpha=1/14, adjust=False).mean().iloc[-1]
+    orb_high, orb_low = screener_logic.calculate_orb(df)
+    pdc, pdh, pdl = screener_logic.calculate_daily_levels(df)
+    today = df.iloc[screener_logic.SessionIndex(df.index).today()]
+    return {
+        'atr': atr,
+        'orb_high': orb_high,
+        'orb_low': orb_low,
+        'pdc': pdc, 'pdh': pdh, 'pdl': pdl,
+        'broke_pdh': pdh is not None and bool((today['Close'] > pdh).any()),
+        'broke_pdl': pdl is not None and bool((today['Close'] < pdl).any()),
+    }
+
+
+def assert_matches(values, expected):
+    for key, value in expected.items():
+        assert values[key] == pytest.approx(value, rel=1e-12, abs=1e-12), key
+
+
+def test_streaming_matches_full_recompute():
+    df = scenario(11)
+    state = IndicatorState()
+
+    # Scan after every few bars, with the last bar still forming
+    for end in range(2, len(df) + 1, 7):
+        frame = df.iloc[:end].copy()
+        forming = frame.iloc[-1].copy()
+        frame.iloc[-1] = forming * [1, 1.001, 0.999, 1, 1]
+        state.advance(frame)
+        values = state.advance(df.iloc[:end])
+
+        assert_matches(values, full_recompute(df.iloc[:end]))
+
+
+def test_only_new_bars_are_processed(monkeypatch):
+    df = scenario(12)
+    state = IndicatorState()
+    state.advance(df.iloc[:-10])
+    calls = []
+    real_update = IndicatorState.update
+    monkeypatch.setattr(IndicatorState, 'update',
+                        lambda self, *args: calls.append(1) or real_update(self, *args))
+
+    state.advance(df)
+
+    # The bar that was forming last time, 9 newer closed bars and the
+    # forming bar (applied to a copy)
+    assert len(calls) == 11
+
+
+def test_rebuilds_when_history_does_not_continue():
+    state = IndicatorState()
+    state.advance(scenario(13))
+
+    other = scenario(14)
+    assert_matches(state.advance(other), full_recompute(other))
+
+
+def test_state_survives_json_round_trip():
+    df = scenario(15)
+    state = IndicatorState()
+    state.advance(df.iloc[:-5])
+
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+    assert restored.advance(df) == state.advance(df)
+
+
+def test_concurrent_advances_apply_new_bars_once(monkeypatch):
+    df = scenario(16)
+    state = IndicatorState()
+    state.advance(df.iloc[:-10])
+    real_update = IndicatorState.update
+
+    def slow_update(self, *args):
+        time.sleep(0.001)    # Let the other thread catch up mid-replay
+        real_update(self, *args)
+
+    monkeypatch.setattr(IndicatorState, 'update', slow_update)
+    threads = [threading.Thread(target=state.advance, args=(df,)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert state.count == len(df) - 1
+    assert_matches(state.advance(df), full_recompute(df))
+    # An older frame leaves the state where it is
+    state.advance(df.iloc[:-20])
+    assert state.last_ts == df.index[-2]
@@ -0,0 +1,133 @@
+"""
+Tests for the SQLite license store
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+import license_manager
+
+
+@pytest.fixture
+def license_db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'licenses.db')
+    monkeypatch.setattr(license_manager, 'LICENSE_DB', path)
+    monkeypatch.setattr(license_manager, 'LICENSE_FILE', str(tmp_path / 'licenses.json'))
+    license_manager.init_licenses()
+    return path
+
+
+def lock_devices(path, keys, worker, results):
+    """One 'gunicorn worker': first-time device locks for every key"""
+    license_manager.LICENSE_DB = path
+    for key in keys:
+        valid, message = license_manager.validate_license(key, f"DEV-{worker}")
+        results.put((key, worker, valid, message))
+
+
+def test_migrates_json_licenses_once(tmp_path, monkeypatch):
+    old = {
+        "PACPL-MAY-380D01E9": {"user": "Mayur", "expiry": "2099-03-15", "created_at": "2026-02-12"},
+        "PACPL-MAY-2FC39DF2": {"user": "mayur", "expiry": "2099-03-14", "created_at": "2026-02-12",
+                               "device_id": "DEV-GNQHW5JP0"},
+    }
+    (tmp_path / 'licenses.json').write_text(json.dumps(old))
+    monkeypatch.setattr(license_manager, 'LICENSE_DB', str(tmp_path / 'licenses.db'))
+    monkeypatch.setattr(license_manager, 'LICENSE_FILE', str(tmp_path / 'licenses.json'))
+
+    license_manager.init_licenses()
+
+    assert license_manager.load_licenses() == old
+    assert license_manager.validate_license("PACPL-MAY-2FC39DF2", "DEV-OTHER")[0] is False
+    assert license_manager.validate_license("PACPL-MAY-2FC39DF2", "DEV-GNQHW5JP0") == (True, "Success")
+    # Restarts don't import the file again
+    assert license_manager.migrate_json() == 0
+
+
+def test_bulk_generate_and_paginated_listing(license_db):
+    keys, expiry = license_manager.generate_keys("acme", 120, days=10)
+    short, _ = license_manager.generate_keys("trial", 5, days=1)
+
+    assert len(set(keys)) == 120
+    first, total = license_manager.list_licenses(page=1, per_page=50)
+    last, _ = license_manager.list_licenses(page=3, per_page=50)
+    assert total == 125
+    assert len(first) == 50 and len(last) == 25
+    assert not set(first) & set(last)
+
+    expiring, count = license_manager.list_licenses(expiring_before=expiry)
+    assert count == 5 and set(expiring) == set(short)
+
+
+def test_lookups_use_indexes(license_db):
+    conn = license_manager._connect()
+    by_key = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM licenses WHERE key = ?", ("X",)).fetchall()
+    by_expiry = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM licenses WHERE expiry < ?", ("X",)).fetchall()
+
+    assert 'USING INDEX' in by_key[0]['detail']
+    assert 'idx_licenses_expiry' in by_expiry[0]['detail']
+
+
+def test_simultaneous_first_time_device_locks(license_db):
+    keys, _ = license_manager.generate_keys("user", 10)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    workers = [ctx.Process(target=lock_devices, args=(license_db, keys, w, results))
+               for w in range(6)]
+    for p in workers:
+        p.start()
+    outcomes = [results.get(timeout=60) for _ in range(len(keys) * len(workers))]
+    for p in workers:
+        p.join(30)
+
+    stored = license_manager.load_licenses()
+    for key in keys:
+        winners = [(w, m) for k, w, valid, m in outcomes if k == key and valid]
+        # Exactly one worker locked each key, and the database agrees
+        assert len(winners) == 1
+        assert winners[0][1] == "Success (Locked to Device)"
+        assert stored[key]['device_id'] == f"DEV-{winners[0][0]}"
+
+
+def test_concurrent_generation_loses_no_keys(license_db):
+    keys = []
+
+    def generate(i):
+        keys.append(license_manager.generate_key(f"thread{i}")[0])
+
+    threads = [threading.Thread(target=generate, args=(i,)) for i in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert set(license_manager.load_licenses()) == set(keys)
+
+
+def test_admin_generate_validates_count(license_db, monkeypatch):
+    import config
+    monkeypatch.setattr(config, 'SCHEDULER_ENABLED', False)
+    import app
+    client = app.app.test_client()
+    headers = {'Admin-Password': "PACPL-ADMIN-99"}
+
+    def generate(count):
+        return client.post('/api/admin/generate', json={'username': "acme", 'count': count}, headers=headers)
+
+    for count in [0, -3, 1001, 2.5, "ten", None, True]:
+        response = generate(count)
+        assert response.status_code == 400, count
+        assert response.get_json()['success'] is False
+    assert license_manager.load_licenses() == {}
+
+    assert len(generate("3").get_json()['keys']) == 3
+    assert 'key' in generate(1).get_json()
+
+
+def test_database_is_found_from_any_directory():
+    assert license_manager.LICENSE_DB == os.path.join(os.path.dirname(license_manager.__file__), "licenses.db")
@@ -0,0 +1,180 @@
+"""
+Tests for push bar ingestion and event-driven evaluation
+"""
+
+import socket
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import benchmark
+import config
+import license_manager
+import live_feed
+import screener_logic
+from bar_store import BarStore
+from live_feed import LiveScanner, ReplayFeed
+from providers import ReplayProvider
+from scan_coordinator import ScanCoordinator
+from signal_state import closed_event
+from synthetic_market import SyntheticMarket
+
+TIMEFRAMES = ["1m", "2m"]
+
+
+@pytest.fixture
+def market():
+    market = SyntheticMarket(seed=7, days=3)
+    with benchmark.use_market(market):
+        yield market
+
+
+def test_bar_messages_round_trip():
+    df = SyntheticMarket(days=1).bars('ABC.NS').iloc[:3]
+
+    lines = live_feed.encode_bars('ABC.NS', df).splitlines()
+
+    assert len(lines) == 3
+    symbol, bar = live_feed.parse_bar(lines[1])
+    assert symbol == 'ABC.NS'
+    pd.testing.assert_frame_equal(bar, df.iloc[1:2], check_freq=False, check_index_type=False)
+    _, bar = live_feed.parse_bar('{"symbol": "X.NS", "time": "2026-02-13 09:20", "open": 1, '
+                                 '"high": 2, "low": 0.5, "close": 1.5, "volume": 10}')
+    assert bar.index[0] == pd.Timestamp("2026-02-13 09:20", tz='Asia/Kolkata')
+
+
+def test_updates_evaluate_only_their_symbol(market, monkeypatch):
+    # Raw results, to compare with a plain scan
+    monkeypatch.setattr(config, 'SIGNAL_STATE', False)
+    scanner = LiveScanner(TIMEFRAMES, store=BarStore(), backfill=False)
+    bars = {s: market.bars(s) for s in ('A.NS', 'B.NS')}
+    for symbol, df in bars.items():
+        scanner.evaluate(symbol, df.iloc[:-5])
+
+    scanner.start()
+    for i in range(4, 0, -1):
+        scanner.push('A.NS', bars['A.NS'].iloc[-i - 1:-i])
+    assert scanner.drain(timeout=10)
+    scanner.stop()
+
+    # Queued bars of one symbol coalesce into one evaluation
+    assert 3 <= scanner.evaluations <= 6
+    assert scanner.store.last_timestamp('A.NS', '1m') == bars['A.NS'].index[-2]
+    assert scanner.store.last_timestamp('B.NS', '1m') == bars['B.NS'].index[-6]
+    expected = screener_logic.scan_stock_dual_tf('A.NS', TIMEFRAMES, {
+        '1m': bars['A.NS'].iloc[:-1],
+        '2m': screener_logic.resample_ohlcv(bars['A.NS'].iloc[:-1], '2m'),
+    })
+    assert scanner.results['A.NS']['timeframes'] == expected['timeframes']
+
+
+def test_replayed_session_publishes_signal_transitions(market):
+    replay = ReplayProvider(market, speed=0, start="14:30")
+    symbols = benchmark.symbols_for(12)
+    scanner = LiveScanner(TIMEFRAMES, store=BarStore(clock=replay.now), clock=replay.now)
+    scanner.start()
+    screener_logic.TICKER_HISTORY = replay.history
+
+    feed = ReplayFeed(replay, lambda: symbols, scanner)
+    feed._loop()
+    scanner.stop()
+
+    assert replay.finished()
+    run = scanner.current_run()
+    events = list(run.subscribe(timeout=0))
+    assert {e['type'] for e in events} == {'signal', 'closed'}
+    # One evaluation per symbol and bar; only transitions are published
+    assert scanner.evaluations == len(symbols) * 61
+    assert sum(e['type'] == 'signal' for e in events) < scanner.evaluations / 5
+    assert [e['seq'] for e in events] == sorted(e['seq'] for e in events)
+    assert {e['outcome'] for e in events if e['type'] == 'closed'} <= {'sl', 'tp', 'replaced'}
+
+    # Following the transitions ends at the signals the scanner shows
+    active = {}
+    for event in events:
+        if event['type'] == 'closed':
+            del active[(event['symbol'], event['timeframe'])]
+        else:
+            for t in event['data']['transitions']:
+                if t['event'] == 'trigger':
+                    active[(t['symbol'], t['timeframe'])] = (t['signal_type'], t['signal_dir'])
+    assert active == {(symbol, tf): signal for symbol, result in scanner.results.items()
+                      for tf, signal in live_feed._signals(result).items()}
+
+
+def test_live_run_and_scans_share_transitions(market):
+    replay = ReplayProvider(market, speed=0, start="14:30")
+    symbols = benchmark.symbols_for(12)
+    fed = threading.Event()
+
+    def scan(stock_list, timeframes):
+        yield {'type': 'start', 'total': len(stock_list)}
+        fed.wait(30)
+        # A close this scan found first
+        yield closed_event(stock_list[0], '1m', 'tp', 10**6)
+        yield {'type': 'done'}
+
+    coordinator = ScanCoordinator(scan_fn=scan, clock=replay.now)
+    scan_run = coordinator.get_run(symbols, TIMEFRAMES)
+    scanner = LiveScanner(TIMEFRAMES, store=BarStore(clock=replay.now), clock=replay.now,
+                          coordinator=coordinator)
+    scanner.start()
+    screener_logic.TICKER_HISTORY = replay.history
+    ReplayFeed(replay, lambda: symbols, scanner)._loop()
+    scanner.stop()
+    fed.set()
+    assert scan_run.wait(10)
+
+    live_events = list(scanner.current_run().subscribe(timeout=0))
+    assert len(live_events) > 1 and live_events[-1]['seq'] == 10**6
+    assert scan_run.events[1:-1] == live_events
+
+
+def test_tcp_feed_ingests_pushed_bars(market):
+    scanner = LiveScanner(TIMEFRAMES, store=BarStore(), backfill=False)
+    scanner.start()
+    server = live_feed.serve_tcp(scanner, '127.0.0.1', 0)
+    df = market.bars('TCP.NS')
+    try:
+        with socket.create_connection(server.server_address) as sock:
+            sock.sendall(live_feed.encode_bars('TCP.NS', df.iloc[:-1]).encode())
+            sock.sendall(b'not json\n')
+            sock.sendall(live_feed.encode_bars('TCP.NS', df.iloc[-1:]).encode())
+        deadline = time.monotonic() + 10
+        while scanner.store.last_timestamp('TCP.NS', '1m') != df.index[-1] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        scanner.drain(timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+        scanner.stop()
+
+    assert len(scanner.store.get('TCP.NS', '1m')) == len(df)
+    assert 'TCP.NS' in scanner.results
+
+
+def test_live_stream_route(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'SCHEDULER_ENABLED', False)
+    monkeypatch.setattr(license_manager, 'LICENSE_DB', str(tmp_path / 'licenses.db'))
+    import app
+    monkeypatch.setattr(license_manager, 'validate_license', lambda key, device_id=None: (True, "Success"))
+    client = app.app.test_client()
+
+    monkeypatch.setattr(app, 'live', None)
+    assert client.get('/api/live/stream').status_code == 404
+    assert client.get('/api/live').get_json()['enabled'] is False
+
+    scanner = LiveScanner(TIMEFRAMES, store=BarStore(), backfill=False)
+    monkeypatch.setattr(app, 'live', scanner)
+    run = scanner.current_run()
+    for symbol in ('A.NS', 'B.NS', 'C.NS'):
+        run.publish({'type': 'signal', 'data': {'symbol': symbol}})
+    run.finish()
+
+    body = client.get('/api/live/stream').get_data(as_text=True)
+    assert body.count('data: ') == 3 and f"id: {run.id}-2" in body
+    resumed = client.get('/api/live/stream', headers={'Last-Event-ID': f"{run.id}-0"}).get_data(as_text=True)
+    assert 'A.NS' not in resumed and 'C.NS' in resumed
+    assert client.get('/api/live').get_json()['live']['symbols'] == 0
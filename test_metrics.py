@@ -0,0 +1,45 @@
+"""
+Tests for scan logging and stage metrics
+"""
+
+import logging
+
+import metrics
+import screener_logic
+from test_batch_fetch import make_bars, install
+
+
+def test_scan_records_stage_timings(monkeypatch):
+    install(monkeypatch, {'A.NS': make_bars(1), 'B.NS': make_bars(2)})
+    monkeypatch.setattr(screener_logic, 'PANEL_ENGINE', False)
+    metrics.reset()
+
+    for event in screener_logic.scan_events(['A.NS', 'B.NS'], ["1m", "2m"]):
+        screener_logic.format_sse(event)
+
+    stages = metrics.snapshot()['stages']
+    for stage in ['fetch', 'derive', 'indicators', 'levels', 'signals', 'serialize', 'scan']:
+        assert stages[stage]['count'] > 0, stage
+    assert stages['scan']['count'] == 1
+
+
+def test_metrics_can_be_disabled(monkeypatch):
+    install(monkeypatch, {'A.NS': make_bars(1)})
+    monkeypatch.setattr(metrics.config, 'METRICS_ENABLED', False)
+    metrics.reset()
+
+    with metrics.timed('fetch'):
+        pass
+    for event in screener_logic.scan_events(['A.NS'], ["1m"]):
+        pass
+
+    assert metrics.snapshot()['stages'] == {}
+
+
+def test_signal_checks_do_not_print(monkeypatch, capsys):
+    install(monkeypatch, {})
+    logging.getLogger('screener_logic').setLevel(logging.INFO)
+
+    screener_logic.analyze_frame('A.NS', "1m", make_bars(3, bars_per_day=60))
+
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,107 @@
+"""
+Parity tests: vectorized panel engine vs the per-symbol scan path
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import screener_logic
+from panel_engine import scan_panel, scan_panel_dual_tf, wilder_atr
+
+
+def scenario(seed):
+    """Two full sessions plus a partial one, with a random opening gap and
+    intraday drift so that every kind of signal shows up across seeds"""
+    rng = np.random.default_rng(seed)
+    today_bars = int(rng.integers(1, 150))
+    gap = rng.uniform(-0.015, 0.015)
+    drift = rng.uniform(-0.0008, 0.0008)
+
+    days = [375, 375, today_bars]
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(pd.Timestamp("2026-02-09 09:15", tz="Asia/Kolkata") + pd.Timedelta(days=d),
+                      periods=bars, freq="1min")
+        for d, bars in enumerate(days)
+    ]))
+    session_starts = np.cumsum([0] + days[:-1])
+
+    steps = 1 + rng.normal(0, 0.0008, len(index))
+    steps[session_starts[2]:] += drift
+    steps[session_starts[2]] *= 1 + gap
+    close = 100.0 * np.cumprod(steps)
+
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    # Sessions open at the gapped price
+    open_[session_starts[2]] = close[session_starts[2] - 1] * (1 + gap)
+    spread = np.abs(rng.normal(0, 0.05, len(close)))
+    df = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 1000, len(close)),
+    }, index=pd.DatetimeIndex(index))
+    # Occasionally a symbol with only today's session or a few missing bars
+    if seed % 17 == 0:
+        df = df[df.index.normalize() == df.index[-1].normalize()]
+    elif seed % 5 == 0:
+        df = df.drop(df.index[rng.choice(len(df) - 1, 20, replace=False)])
+    return df
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    monkeypatch.setattr(screener_logic, 'DAILY_LEVELS_CACHE', {})
+    monkeypatch.setattr(screener_logic, 'INDICATOR_STATES', {})
+    return {f"S{seed}.NS": scenario(seed) for seed in range(150)}
+
+
+def assert_same(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        if isinstance(value, float) and value == value:
+            assert actual[key] == pytest.approx(value, rel=1e-12), key
+        else:
+            assert actual[key] == value, key
+
+
+@pytest.mark.parametrize("timeframe", ["1m", "2m"])
+def test_panel_matches_per_symbol_scan(universe, timeframe):
+    frames = {s: screener_logic.resample_ohlcv(df, timeframe) if timeframe != "1m" else df
+              for s, df in universe.items()}
+
+    panel = scan_panel(frames, timeframe)
+
+    for symbol, df in frames.items():
+        assert_same(screener_logic.analyze_frame(symbol, timeframe, df.copy()), panel[symbol])
+
+    # The scenarios must actually exercise the signal rules
+    fired = {flag for r in panel.values() for flag in r if r[flag] is True and flag != 'has_signal'}
+    assert {'follow_long', 'follow_short', 'fade_long', 'fade_short', 'trend_long', 'trend_short'} <= fired
+
+
+def test_panel_dual_tf_matches_scan_stock_dual_tf(universe):
+    frames = {s: {"1m": df, "2m": screener_logic.resample_ohlcv(df, "2m")} for s, df in universe.items()}
+    frames['NONE.NS'] = {"1m": None, "2m": None}
+
+    panel = scan_panel_dual_tf(frames, ["1m", "2m"])
+
+    for symbol, tf_frames in frames.items():
+        expected = screener_logic.scan_stock_dual_tf(
+            symbol, ["1m", "2m"], {tf: None if df is None else df.copy() for tf, df in tf_frames.items()})
+        assert expected['has_any_signal'] == panel[symbol]['has_any_signal']
+        for tf in ["1m", "2m"]:
+            assert_same(expected['timeframes'][tf], panel[symbol]['timeframes'][tf])
+
+
+def test_wilder_atr_matches_pandas_ewm():
+    df = scenario(3)
+    prev_close = df['Close'].shift(1)
+    tr = pd.concat([df['High'] - df['Low'], (df['High'] - prev_close).abs(),
+                    (df['Low'] - prev_close).abs()], axis=1).max(axis=1)
+    expected = tr.ewm(alpha=1/14, adjust=False).mean().iloc[-1]
+
+    atr = wilder_atr(df[['High']].to_numpy().T, df[['Low']].to_numpy().T, df[['Close']].to_numpy().T)
+
+    assert atr[0] == expected
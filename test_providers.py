@@ -0,0 +1,118 @@
+"""
+Tests for the market data providers and session replay
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+import benchmark
+import config
+import providers
+import screener_logic
+from bar_store import BarStore
+from providers import RecordedProvider, ReplayProvider
+from scan_coordinator import ScanCoordinator
+from scan_scheduler import ScanScheduler
+from synthetic_market import SyntheticMarket
+from test_batch_fetch import make_bars
+
+
+def ist(text):
+    return pd.Timestamp(text, tz='Asia/Kolkata')
+
+
+def test_replay_serves_only_closed_bars():
+    replay = ReplayProvider(SyntheticMarket(days=3), speed=0, start="10:00")
+
+    df = replay.history('ABC.NS', '5d', '1m')
+    assert replay.now() == ist("2026-02-13 10:00")
+    assert df.index[-1] == ist("2026-02-13 09:59")
+    assert len(df) == 2 * 375 + 45
+
+    assert not replay.sleep(90, threading.Event())
+    assert replay.history('ABC.NS', None, '1m', start=df.index[-1]).index[-1] == ist("2026-02-13 10:00")
+    wide = replay.download(['ABC.NS', 'XYZ.NS'], '1d', '2m')
+    frames = screener_logic.split_batch_frame(wide, ['ABC.NS', 'XYZ.NS'])
+    assert frames['XYZ.NS'].index[-1] == ist("2026-02-13 09:59")  # Holds the 09:59 and 10:00 bars
+
+
+def test_replay_clock_speed_and_end():
+    wall = [0.0]
+    replay = ReplayProvider(SyntheticMarket(), speed=60, start="15:00", wall=lambda: wall[0])
+
+    wall[0] = 2.5
+    assert replay.now() == ist("2026-02-13 15:02:30")
+    wall[0] = 3600
+    assert replay.now() == replay.end == ist("2026-02-13 15:31")
+    assert replay.finished()
+    assert replay.sleep(5, threading.Event())
+
+    fast = ReplayProvider(SyntheticMarket(), speed=6000, start="15:00")
+    stop = threading.Event()
+    assert not fast.sleep(60, stop)
+    assert fast.now() >= ist("2026-02-13 15:01")
+    stop.set()
+    assert fast.sleep(60, stop)
+
+
+def test_recorded_provider_reads_the_bar_cache(tmp_path):
+    store = BarStore(cache_dir=str(tmp_path))
+    store.save('A.NS', '1m', make_bars(1, days=4, bars_per_day=30))
+
+    recorded = RecordedProvider(str(tmp_path))
+    assert recorded.last_day() == '2026-02-12'
+    assert RecordedProvider(str(tmp_path), end='2026-02-10').last_day() == '2026-02-10'
+
+    df = recorded.history('A.NS', '2d', '1m')
+    assert list(df.index.normalize().unique().strftime('%d')) == ['11', '12']
+    assert len(recorded.history('A.NS', '1d', '2m')) == 15
+    assert len(recorded.history('A.NS', None, '1m', start=df.index[-3])) == 3
+    assert recorded.history('B.NS', '5d', '1m').empty
+
+    replay = ReplayProvider(RecordedProvider(str(tmp_path), end='2026-02-11'), speed=0, start="09:30")
+    assert replay.history('A.NS', '5d', '1m').index[-1] == ist("2026-02-11 09:29")
+
+
+def test_provider_selection(tmp_path, monkeypatch):
+    assert isinstance(providers.get_provider('yfinance'), providers.YFinanceProvider)
+    with pytest.raises(ValueError):
+        providers.get_provider('carrier-pigeon')
+
+    monkeypatch.setattr(config, 'REPLAY_DIR', str(tmp_path))
+    with pytest.raises(ValueError):
+        providers.get_provider('replay')
+
+    BarStore(cache_dir=str(tmp_path)).save('A.NS', '1m', make_bars(1, days=2))
+    monkeypatch.setattr(config, 'REPLAY_SPEED', 0)
+    replay = providers.get_provider('replay')
+    assert replay.now() == ist("2026-02-10 09:15")
+
+
+def test_session_replay_drives_scheduled_scans_and_streams():
+    replay = ReplayProvider(SyntheticMarket(seed=5, days=3), speed=0, start="15:15")
+    symbols = benchmark.symbols_for(20)
+    scanned_at = []
+
+    def scan(stock_list, timeframes):
+        scanned_at.append(replay.now())
+        return screener_logic.scan_events(stock_list, timeframes)
+
+    with benchmark.use_market(replay):
+        coordinator = ScanCoordinator(scan, clock=replay.now)
+        scheduler = ScanScheduler(coordinator, lambda: symbols, ["1m", "2m"],
+                                  clock=replay.now, sleep=replay.sleep)
+        scheduler.start()
+        scheduler._thread.join(timeout=120)
+        last_bar = screener_logic.BAR_STORE.last_timestamp(symbols[0], '1m')
+
+    assert not scheduler._thread.is_alive()
+    # Every bar close from 15:15 to the session close, each scanned once
+    assert scanned_at == list(pd.date_range(ist("2026-02-13 15:15:05"), periods=16, freq='1min'))
+    assert last_bar == ist("2026-02-13 15:29")
+    assert len(coordinator._recent) == 16
+    for run in coordinator._recent:
+        events = list(run.subscribe(timeout=1))
+        assert events[0] == {'type': 'start', 'total': 20} and events[-1] == {'type': 'done'}
+    assert scheduler.snapshot is coordinator._recent[-1]
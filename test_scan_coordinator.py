@@ -0,0 +1,150 @@
+"""
+Offline tests for the single-flight scan coordinator
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+from scan_coordinator import ScanCoordinator, bar_boundary
+
+
+class SlowScan:
+    """scan_events stand-in that counts how often a scan is started"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.runs = 0
+        self.release = threading.Event()
+
+    def __call__(self, stock_list, timeframes):
+        self.runs += 1
+        yield {'type': 'start', 'total': len(stock_list)}
+        for i, symbol in enumerate(stock_list, 1):
+            if i == 2:
+                self.release.wait(5)
+            time.sleep(self.delay)
+            yield {'type': 'progress', 'scanned': i, 'total': len(stock_list), 'symbol': symbol}
+            yield {'type': 'signal', 'data': {'symbol': symbol, 'has_any_signal': True}}
+        yield {'type': 'done'}
+
+
+STOCKS = [f"S{i}.NS" for i in range(6)]
+
+
+def test_concurrent_clients_share_one_scan():
+    scan = SlowScan()
+    coordinator = ScanCoordinator(scan_fn=scan)
+    received = [None] * 10
+
+    def client(i):
+        received[i] = list(coordinator.stream(STOCKS, ["1m"]))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    scan.release.set()
+    for t in threads:
+        t.join(10)
+
+    assert scan.runs == 1
+    assert all(events == received[0] for events in received)
+    assert received[0][-1] == {'type': 'done'}
+
+
+def test_late_joiner_gets_cached_then_live_events():
+    scan = SlowScan()
+    coordinator = ScanCoordinator(scan_fn=scan)
+
+    early = coordinator.get_run(STOCKS, ["1m"])
+    while len(early.events) < 3:
+        time.sleep(0.001)
+    late = coordinator.stream(STOCKS, ["1m"])
+    first = next(late)
+    scan.release.set()
+    rest = list(late)
+
+    assert scan.runs == 1
+    assert first['type'] == 'start'
+    assert [first] + rest == early.events
+
+
+def test_results_waits_for_scan():
+    scan = SlowScan(delay=0)
+    scan.release.set()
+    coordinator = ScanCoordinator(scan_fn=scan)
+
+    results = coordinator.results(STOCKS, ["1m"], timeout=5)
+
+    assert [r['symbol'] for r in results] == STOCKS
+
+
+def test_new_bar_starts_new_scan():
+    scan = SlowScan(delay=0)
+    scan.release.set()
+    coordinator = ScanCoordinator(scan_fn=scan)
+    t0 = pd.Timestamp("2026-02-10 10:00:10", tz="Asia/Kolkata")
+
+    coordinator.get_run(STOCKS, ["1m", "2m"], now=t0).wait(5)
+    coordinator.get_run(STOCKS, ["1m", "2m"], now=t0 + pd.Timedelta(seconds=30)).wait(5)
+    coordinator.get_run(STOCKS, ["1m", "2m"], now=t0 + pd.Timedelta(seconds=60)).wait(5)
+
+    assert scan.runs == 2
+    assert bar_boundary(["2m", "5m"], t0) == pd.Timestamp("2026-02-10 10:00", tz="Asia/Kolkata")
+
+
+def test_finished_runs_of_earlier_bars_are_dropped():
+    scan = SlowScan(delay=0)
+    scan.release.set()
+    coordinator = ScanCoordinator(scan_fn=scan)
+    t0 = pd.Timestamp("2026-02-10 10:00:10", tz="Asia/Kolkata")
+    minute = lambda i: t0 + pd.Timedelta(minutes=i)
+
+    # A custom stock list per request, each scanned once
+    for i in range(5):
+        last = coordinator.get_run([f"C{i}.NS", "S0.NS"], ["1m"], now=minute(i))
+        assert last.wait(5)
+    assert list(coordinator._runs.values()) == [last]
+
+    # A scan of an earlier bar still in progress is kept until it is done
+    scan.release.clear()
+    slow = coordinator.get_run(STOCKS, ["1m"], now=minute(5))
+    current = coordinator.get_run(["C9.NS"], ["1m"], now=minute(6))
+    assert set(coordinator._runs.values()) == {slow, current}
+    scan.release.set()
+    assert slow.wait(5) and current.wait(5)
+    coordinator.get_run(["C9.NS"], ["1m"], now=minute(7))
+    assert slow not in coordinator._runs.values()
+
+
+def test_resume_continues_after_last_event_id():
+    scan = SlowScan()
+    coordinator = ScanCoordinator(scan_fn=scan)
+    run = coordinator.get_run(STOCKS, ["1m"])
+    first = coordinator.stream(STOCKS, ["1m"])
+    received = [next(first) for _ in range(3)]   # Connection drops here
+    last_id = run.event_id(2)
+
+    resumed_run, start = coordinator.resume(last_id)
+    scan.release.set()
+    rest = list(resumed_run.subscribe(start=start))
+
+    assert resumed_run is run and scan.runs == 1
+    assert received + rest == run.events
+
+
+def test_resume_unknown_or_evicted_ids(monkeypatch):
+    import config
+    monkeypatch.setattr(config, 'SSE_REPLAY_RUNS', 2)
+    scan = SlowScan(delay=0)
+    scan.release.set()
+    coordinator = ScanCoordinator(scan_fn=scan)
+    runs = [coordinator.get_run([f"X{i}.NS"], ["1m"]) for i in range(3)]
+    for run in runs:
+        run.wait(5)
+
+    assert coordinator.resume(None) is None
+    assert coordinator.resume("garbage") is None
+    assert coordinator.resume(runs[0].event_id(1)) is None
+    assert coordinator.resume(runs[2].event_id(1)) == (runs[2], 2)
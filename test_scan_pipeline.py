@@ -0,0 +1,57 @@
+"""
+Offline tests for the per-timeframe scan pipeline
+"""
+
+import pandas as pd
+
+import screener_logic
+from test_batch_fetch import make_bars
+
+
+def test_dual_tf_fetches_each_timeframe_once(monkeypatch):
+    frames = {"1m": make_bars(5), "2m": make_bars(6, freq_mins=2)}
+    calls = []
+
+    def fake_get_stock_data(symbol, timeframe="5m", days=5):
+        calls.append((symbol, timeframe))
+        return frames[timeframe].copy()
+    monkeypatch.setattr(screener_logic, 'get_stock_data', fake_get_stock_data)
+    monkeypatch.setattr(screener_logic, 'DERIVE_TIMEFRAMES', False)
+
+    result = screener_logic.scan_stock_dual_tf('A.NS', ["1m", "2m"])
+
+    assert sorted(calls) == [('A.NS', "1m"), ('A.NS', "2m")]
+    for tf, df in frames.items():
+        orb_high, orb_low = screener_logic.calculate_orb(df.copy())
+        assert result['timeframes'][tf]['level_high'] == orb_high
+        assert result['timeframes'][tf]['level_low'] == orb_low
+
+
+def test_missing_prefetched_frame_is_not_refetched(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("should not fetch")
+    monkeypatch.setattr(screener_logic, 'get_stock_data', fail)
+
+    result = screener_logic.scan_stock_dual_tf('A.NS', ["1m"], {"1m": None})
+
+    assert result['timeframes']['1m']['error'] == 'Insufficient data'
+    assert result['has_any_signal'] is False
+
+
+def test_session_index_boundaries():
+    df = make_bars(9, days=3, bars_per_day=20)
+
+    session = screener_logic.SessionIndex(df.index)
+
+    assert list(session.starts) == [0, 20, 40]
+    assert len(df.iloc[session.today()]) == 20
+    assert df.iloc[session.previous()].index[0].day == df.index[20].day
+
+
+def test_scan_does_not_modify_frame():
+    df = make_bars(10, days=2, bars_per_day=40)
+    before = df.copy()
+
+    screener_logic.analyze_frame('A.NS', "1m", df)
+
+    pd.testing.assert_frame_equal(df, before)
@@ -0,0 +1,48 @@
+"""
+Offline tests for the background scan scheduler
+"""
+
+import pandas as pd
+
+from scan_coordinator import ScanCoordinator
+from scan_scheduler import ScanScheduler, next_bar_close, in_session
+
+
+def ist(text):
+    return pd.Timestamp(text, tz="Asia/Kolkata")
+
+
+def test_next_bar_close_during_session():
+    assert next_bar_close(["1m", "2m"], ist("2026-02-10 10:00:30")) == ist("2026-02-10 10:01")
+    assert next_bar_close(["2m"], ist("2026-02-10 10:00:30")) == ist("2026-02-10 10:01")
+    assert next_bar_close(["2m"], ist("2026-02-10 10:01:00")) == ist("2026-02-10 10:03")
+    assert next_bar_close(["1m"], ist("2026-02-10 10:01:02"), delay=5) == ist("2026-02-10 10:01:05")
+
+
+def test_next_bar_close_outside_session():
+    # Before the open: first bar close of the day
+    assert next_bar_close(["1m"], ist("2026-02-10 07:00")) == ist("2026-02-10 09:16")
+    # After the close on Friday: Monday's first bar
+    assert next_bar_close(["1m"], ist("2026-02-13 15:45")) == ist("2026-02-16 09:16")
+    assert not in_session(ist("2026-02-14 10:00"))
+    assert in_session(ist("2026-02-10 10:00"))
+
+
+def test_run_once_keeps_snapshot():
+    def scan(stock_list, timeframes):
+        yield {'type': 'start', 'total': len(stock_list)}
+        yield {'type': 'signal', 'data': {'symbol': stock_list[0]}}
+        yield {'type': 'done'}
+
+    clock = lambda: ist("2026-02-10 10:01:05")
+    stocks = ['A.NS', 'B.NS']
+    scheduler = ScanScheduler(ScanCoordinator(scan_fn=scan), lambda: stocks, ["1m"], clock=clock)
+
+    scheduler.run_once()
+
+    snapshot = scheduler.get_snapshot(stocks, ["1m"])
+    assert snapshot.signals() == [{'symbol': 'A.NS'}]
+    assert scheduler.get_snapshot(['C.NS'], ["1m"]) is None
+    status = scheduler.status()
+    assert status['last_run_duration'] is not None
+    assert status['last_run_at'] == '2026-02-10 10:01:05'
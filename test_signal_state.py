@@ -0,0 +1,183 @@
+"""
+Tests for the per-(symbol, timeframe) signal state machine
+"""
+
+import json
+import threading
+
+import pandas as pd
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import config
+import license_manager
+import screener_logic
+from scan_coordinator import ScanCoordinator
+from signal_state import SignalStateStore, transition_events
+
+LONG = ('follow_long', 'Follow', 'LONG')
+SHORT = ('fade_short', 'Fade', 'SHORT')
+
+
+def at(hhmm, day="2026-02-13"):
+    return pd.Timestamp(f"{day} {hhmm}", tz='Asia/Kolkata')
+
+
+def tf_result(symbol, timeframe, signal=None, entry=100.0, sl=99.0, tp=102.0):
+    """A check_signals-style timeframe result, firing `signal` if given"""
+    result = screener_logic.new_scan_result(symbol, timeframe)
+    result['price'] = entry
+    if signal is not None:
+        flag, signal_type, signal_dir = signal
+        result.update({flag: True, 'signal_type': signal_type, 'signal_dir': signal_dir,
+                       'has_signal': True, 'entry': entry, 'sl': sl, 'tp': tp})
+    return result
+
+
+class Series:
+    """One symbol's 1m bars, fed to a store one scan at a time"""
+
+    def __init__(self, store, symbol='A.NS'):
+        self.store = store
+        self.symbol = symbol
+        self.df = pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'], dtype=float)
+
+    def step(self, stamp, signal=None, high=100.5, low=99.5, **levels):
+        bar = pd.DataFrame({'Open': [100.0], 'High': [high], 'Low': [low], 'Close': [100.0],
+                            'Volume': [1000.0]}, index=pd.DatetimeIndex([stamp], name='Datetime'))
+        self.df = pd.concat([self.df, bar]) if len(self.df) else bar
+        self.store.observe(self.symbol, '1m', self.df)
+        result = {'symbol': self.symbol,
+                  'timeframes': {'1m': tf_result(self.symbol, '1m', signal, **levels)}}
+        self.transitions = self.store.update(result)
+        self.result = screener_logic.combine_timeframes(self.symbol, result['timeframes'])
+        self.store.remember(self.result)
+        return [(t['event'], t.get('outcome')) for t in self.transitions]
+
+
+def test_signal_stays_active_until_tp_then_rearms():
+    series = Series(SignalStateStore())
+
+    assert series.step(at("09:20"), LONG) == [('trigger', None)]
+    # The condition goes off, the signal stays with its first levels
+    assert series.step(at("09:21"), None, high=101.5) == []
+    tf = series.result['timeframes']['1m']
+    assert series.result['has_any_signal'] and tf['follow_long']
+    assert (tf['entry'], tf['sl'], tf['tp'], tf['first_at']) == (100.0, 99.0, 102.0, "2026-02-13 09:20")
+    assert series.step(at("09:22"), LONG, entry=101.0) == []
+    assert series.result['timeframes']['1m']['entry'] == 100.0
+
+    assert series.step(at("09:23"), LONG, high=102.5) == [('closed', 'tp')]
+    assert not series.result['has_any_signal']
+    # Not again while the same condition still holds; after it went off
+    assert series.step(at("09:24"), LONG) == []
+    assert series.step(at("09:25"), None) == []
+    assert series.step(at("09:26"), LONG) == [('trigger', None)]
+
+
+def test_sl_wins_a_bar_that_reaches_both():
+    series = Series(SignalStateStore())
+    series.step(at("09:20"), LONG, high=105, low=95)     # The trigger bar itself is not checked
+    assert series.step(at("09:21"), None, high=102.5, low=98.5) == [('closed', 'sl')]
+
+
+def test_unfilled_signal_expires_instead_of_losing():
+    series = Series(SignalStateStore())
+    series.step(at("09:20"), LONG)
+
+    # Through the SL, but the entry stop at 100 was never reached
+    assert series.step(at("09:21"), None, high=99.8, low=98.0) == []
+    assert series.result['has_any_signal']
+    # Nor do the next session's bars
+    assert series.step(at("09:15", day="2026-02-16"), None, high=100.5, low=98.0) == [('closed', 'expired')]
+
+
+def test_sl_and_tp_count_from_the_fill_bar():
+    series = Series(SignalStateStore())
+    series.step(at("09:20"), LONG)
+    assert series.step(at("09:21"), None, high=99.9, low=98.5) == []
+    # Fills at 100 and reaches the TP in the same bar
+    assert series.step(at("09:22"), None, high=102.5, low=99.5) == [('closed', 'tp')]
+
+
+def test_other_signal_replaces_and_new_session_expires():
+    series = Series(SignalStateStore())
+    series.step(at("09:20"), LONG)
+
+    assert series.step(at("09:21"), SHORT, sl=101.0, tp=98.0) == [('closed', 'replaced'), ('trigger', None)]
+    assert series.result['signal_dir'] == 'SHORT'
+    assert series.step(at("09:15", day="2026-02-16"), None) == [('closed', 'expired')]
+    assert not series.result['has_any_signal']
+
+
+def test_changes_since_a_sequence_number():
+    store = SignalStateStore()
+    a, b = Series(store, 'A.NS'), Series(store, 'B.NS')
+    a.step(at("09:20"), LONG)
+    b.step(at("09:20"), SHORT, sl=101.0, tp=98.0)
+    seen = store.seq
+
+    b.step(at("09:21"), None, high=101.5)
+    events, seq = store.changes()
+    assert seq == seen + 1
+    assert [(e['type'], e['data']['symbol']) for e in events] == [('signal', 'A.NS')]
+    events, _ = store.changes(since=seen)
+    assert [(e['type'], e['symbol'], e['outcome']) for e in events] == [('closed', 'B.NS', 'sl')]
+    assert store.changes(since=seq) == ([], seq)
+    assert store.changes(symbols=['B.NS']) == ([], seq)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'SCHEDULER_ENABLED', False)
+    monkeypatch.setattr(config, 'SIGNAL_STATE', True)
+    monkeypatch.setattr(license_manager, 'LICENSE_DB', str(tmp_path / 'licenses.db'))
+    import app
+    return app
+
+
+def read(app, args):
+    run, start, encode = app.open_scan_stream(MultiDict(args))
+    return [json.loads(message[message.index('data: ') + 6:])
+            for index, event in enumerate(run.subscribe(start=start, timeout=10), start)
+            for message in encode(index, event)]
+
+
+def test_scan_stream_opens_with_active_signals(app, monkeypatch):
+    store = SignalStateStore()
+    monkeypatch.setattr(screener_logic, 'SIGNAL_STATES', store)
+    a, b = Series(store, 'A.NS'), Series(store, 'B.NS')
+    a.step(at("09:20"), LONG)
+    b.step(at("09:20"), SHORT, sl=101.0, tp=98.0)
+    go = threading.Event()
+
+    def scan(stock_list, timeframes):
+        yield {'type': 'start', 'total': len(stock_list)}
+        go.wait(5)
+        # B hits its SL during this scan
+        b.step(at("09:21"), None, high=101.5)
+        yield from transition_events(b.result, b.transitions)
+        yield {'type': 'done'}
+
+    monkeypatch.setattr(app, 'coordinator', ScanCoordinator(scan_fn=scan, clock=lambda: at("09:21:30")))
+    monkeypatch.setattr(app, 'current_stocks', ['A.NS', 'B.NS'])
+    threading.Timer(0.2, go.set).start()
+
+    # A full snapshot after start, then only the scan's transitions
+    messages = read(app, {'compact': '1'})
+    assert messages[0]['t'] == 'start' and messages[0]['full'] and messages[0]['q'] == 2
+    assert [(m['t'], m['d'][0]) for m in messages[1:3]] == [('s', 'A'), ('s', 'B')]
+    assert messages[3] == {'t': 'x', 'd': ['B', '1m'], 'o': 'sl', 'q': 3}
+    assert messages[-1]['t'] == 'done' and len(messages) == 5
+
+    # Catching up from the snapshot sends the close only
+    messages = read(app, {'compact': '1', 'since': '2'})
+    assert not messages[0]['full'] and messages[0]['q'] == 3
+    assert [m['t'] for m in messages] == ['start', 'x', 'done']
+    verbose = read(app, {'since': '3'})
+    assert [m['type'] for m in verbose] == ['start', 'done'] and verbose[0]['seq'] == 3
+
+    # /api/scan lists every active signal, not just this scan's triggers
+    monkeypatch.setattr(license_manager, 'validate_license', lambda key, device_id=None: (True, "Success"))
+    signals = app.app.test_client().get('/api/scan').get_json()['signals']
+    assert [s['symbol'] for s in signals] == ['A.NS']
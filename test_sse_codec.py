@@ -0,0 +1,145 @@
+"""
+Tests for the compact scan stream encoding
+"""
+
+import json
+import sys
+import threading
+
+import pytest
+
+import screener_logic
+import sse_codec
+from sse_codec import CompactStream, decode_stock
+from test_batch_fetch import install
+from test_panel_engine import scenario
+
+TIMEFRAMES = ["1m", "2m"]
+
+
+@pytest.fixture(autouse=True)
+def history(monkeypatch):
+    monkeypatch.setattr(sse_codec, 'SIGNAL_HISTORY', sse_codec.OrderedDict())
+
+
+@pytest.fixture
+def events(monkeypatch):
+    universe = {f"S{seed}.NS": scenario(seed) for seed in range(60)}
+    install(monkeypatch, universe)
+    return [{'type': 'start', 'total': len(universe)}] + \
+        list(screener_logic.scan_events(list(universe), TIMEFRAMES))
+
+
+def payloads(messages):
+    return [json.loads(m[len("data: "):]) for m in messages]
+
+
+def run(stream, events):
+    return payloads([m for event in events for m in stream.encode(event)])
+
+
+def signal(name, mask_flag='follow_long', price=100.0, entry=99.5):
+    tf = {'has_signal': True, 'timeframe': '1m', 'signal_type': 'Follow', 'signal_dir': 'LONG',
+          'price': price, 'level_high': 101.0, 'level_low': 98.0, 'entry': entry, 'sl': 97.0,
+          'tp': 105.0, mask_flag: True}
+    return {'type': 'signal', 'data': {'name': name, 'symbol': name + '.NS',
+                                       'timeframes': {'1m': tf}}}
+
+
+def test_round_trip_keeps_what_the_frontend_shows(events):
+    messages = run(CompactStream(1, TIMEFRAMES), events)
+    signals = {e['data']['name']: e['data'] for e in events if e['type'] == 'signal'}
+    decoded = {m['d'][0]: decode_stock(m['d'], TIMEFRAMES) for m in messages if m['t'] == 's'}
+
+    assert signals and decoded.keys() == signals.keys()
+    for name, stock in signals.items():
+        for tf in TIMEFRAMES:
+            expected, actual = stock['timeframes'][tf], decoded[name]['timeframes'][tf]
+            assert actual['has_signal'] == expected['has_signal']
+            if not expected['has_signal']:
+                continue
+            for key in ['signal_type', 'signal_dir'] + [f for f, _, _ in sse_codec.SIGNAL_FLAGS]:
+                assert actual[key] == expected[key], key
+            for key in sse_codec.TF_FIELDS:
+                assert actual[key] == pytest.approx(expected[key], abs=0.005), key
+
+
+def test_compact_stream_is_much_smaller(events):
+    verbose = sum(len(screener_logic.format_sse(e)) for e in events)
+    stream = CompactStream(1, TIMEFRAMES, progress_every=25)
+    compact = sum(len(m) for e in events for m in stream.encode(e))
+
+    assert compact * 4 < verbose
+
+
+def test_progress_is_batched():
+    stream = CompactStream(1, TIMEFRAMES, progress_every=25)
+    events = [{'type': 'start', 'total': 100}] + \
+        [{'type': 'progress', 'scanned': i, 'total': 100} for i in range(1, 101)]
+
+    progress = [m['n'] for m in run(stream, events) if m['t'] == 'p']
+
+    assert progress == [25, 50, 75, 100]
+
+
+def test_since_sends_only_differences():
+    first = [{'type': 'start', 'total': 3}, signal('AAA'), signal('BBB'), signal('CCC'),
+             {'type': 'progress', 'scanned': 3, 'total': 3}, {'type': 'done'}]
+    assert run(CompactStream(1, ["1m"]), first)[0]['full'] is True
+
+    second = [{'type': 'start', 'total': 4},
+              signal('AAA'),                       # unchanged
+              signal('BBB', price=100.7),          # only the price moved
+              signal('DDD'),                       # new
+              {'type': 'progress', 'scanned': 4, 'total': 4}, {'type': 'done'}]
+    messages = run(CompactStream(2, ["1m"], since=1), second)
+
+    assert messages[0] == {'t': 'start', 'id': 2, 'n': 4, 'tfs': ["1m"], 'full': False}
+    assert [m['d'][0] for m in messages if m['t'] == 's'] == ['DDD']
+    assert messages[-1] == {'t': 'done', 'n': 4, 'cleared': ['CCC'], 'px': [['BBB', 100.7]]}
+
+    # A changed signal is sent again in full, and unknown baselines mean a full stream
+    third = [{'type': 'start', 'total': 1}, signal('AAA', entry=99.0), {'type': 'done'}]
+    assert [m['t'] for m in run(CompactStream(3, ["1m"], since=2), third)] == ['start', 's', 'done']
+    assert run(CompactStream(4, ["1m"], since=99), third)[0]['full'] is True
+
+
+def test_resumed_compact_stream_matches_uninterrupted(events):
+    stream = CompactStream(1, TIMEFRAMES)
+    uninterrupted = [m for i, e in enumerate(events) for m in stream.encode(e, f"1-{i}")]
+    cut = len(events) // 2
+
+    before = CompactStream(1, TIMEFRAMES)
+    received = [m for i, e in enumerate(events[:cut]) for m in before.encode(e, f"1-{i}")]
+    after = CompactStream(1, TIMEFRAMES)
+    after.catch_up(events[:cut])
+    received += [m for i, e in enumerate(events[cut:], cut) for m in after.encode(e, f"1-{i}")]
+
+    assert received == uninterrupted
+    assert all(m.startswith("id: 1-") for m in received)
+
+
+def test_history_shared_by_concurrent_streams():
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    errors = []
+
+    def stream(worker):
+        try:
+            for i in range(500):
+                sse_codec.remember(worker * 10000 + i % 20, {})
+                sse_codec.recall(worker * 10000 + (i + 7) % 20)
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=stream, args=(worker,)) for worker in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(switch)
+
+    assert errors == []
+    assert len(sse_codec.SIGNAL_HISTORY) == sse_codec.HISTORY_SIZE
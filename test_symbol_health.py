@@ -0,0 +1,93 @@
+"""
+Tests for the symbol health negative cache
+"""
+
+import importlib.util
+import sys
+import threading
+import types
+
+import symbol_health
+from symbol_health import SymbolHealth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_failures_back_off_and_success_clears():
+    clock = Clock()
+    health = SymbolHealth(ttl=60, max_ttl=200, clock=clock)
+
+    health.record_failure('A.NS', 'no_data')
+    assert 'A.NS' in health
+    clock.now += 61
+    assert 'A.NS' not in health
+
+    # Second failure in a row: twice as long, then capped
+    health.record_failure('A.NS', 'no_data')
+    clock.now += 119
+    assert 'A.NS' in health
+    health.record_failure('A.NS', 'no_data')
+    assert health.report()[0]['retry_in_secs'] == 200
+
+    health.record_success('A.NS')
+    assert 'A.NS' not in health
+    assert health.report() == []
+
+
+def test_transient_errors_are_reported_but_not_skipped():
+    health = SymbolHealth(ttl=60)
+
+    health.record_failure('B.NS', 'error', 'timed out')
+    health.record_failure('C.NS', 'not_found', 'delisted')
+
+    assert 'B.NS' not in health
+    assert 'C.NS' in health
+    report = health.report()
+    assert [row['symbol'] for row in report] == ['C.NS', 'B.NS']
+    assert report[1]['errors'] == 1 and report[1]['detail'] == 'timed out'
+
+
+def test_workers_share_the_state_file(tmp_path):
+    path = str(tmp_path / 'health.json')
+    workers = [SymbolHealth(path=path, ttl=60) for _ in range(4)]
+
+    def fail_many(i, health):
+        for n in range(25):
+            health.record_failure(f"W{i}-{n}.NS", 'no_data')
+
+    threads = [threading.Thread(target=fail_many, args=(i, h)) for i, h in enumerate(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # A fresh worker sees every failure, none lost to concurrent writes
+    other = SymbolHealth(path=path, ttl=60)
+    assert len(other.report()) == 100
+    assert 'W3-24.NS' in other
+
+    other.record_success('W3-24.NS')
+    assert 'W3-24.NS' not in SymbolHealth(path=path)
+
+
+def test_state_file_without_fcntl(tmp_path, monkeypatch):
+    # Windows has no fcntl: the state file is locked with msvcrt instead
+    locks = []
+    msvcrt = types.SimpleNamespace(LK_LOCK=1, locking=lambda fd, mode, size: locks.append(mode))
+    monkeypatch.setitem(sys.modules, 'fcntl', None)
+    monkeypatch.setitem(sys.modules, 'msvcrt', msvcrt)
+    spec = importlib.util.spec_from_file_location('symbol_health_windows', symbol_health.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    path = str(tmp_path / 'health.json')
+    module.SymbolHealth(path=path).record_failure('DEAD.NS', 'no_data')
+
+    assert module.fcntl is None and locks == [1]
+    assert 'DEAD.NS' in SymbolHealth(path=path)
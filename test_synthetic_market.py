@@ -0,0 +1,89 @@
+"""
+Tests for the synthetic market data source and the offline benchmarks
+"""
+
+import pandas as pd
+
+import backtest
+import benchmark
+import screener_logic
+from synthetic_market import SyntheticMarket
+
+
+def test_bars_are_deterministic_per_seed_and_symbol():
+    a = SyntheticMarket(seed=3, days=4, today_bars=120)
+    b = SyntheticMarket(seed=3, days=4, today_bars=120)
+
+    df = a.bars('ABC.NS')
+    pd.testing.assert_frame_equal(df, b.bars('ABC.NS'))
+    assert not df.equals(SyntheticMarket(seed=4, days=4, today_bars=120).bars('ABC.NS'))
+    assert len(df) == 3 * 375 + 120
+    assert df.index.normalize().nunique() == 4
+    assert (df['High'] >= df[['Open', 'Close']].max(axis=1)).all()
+    assert (df['Low'] <= df[['Open', 'Close']].min(axis=1)).all()
+
+
+def test_history_and_download_windows():
+    market = SyntheticMarket(days=5)
+    full = market.bars('ABC.NS')
+
+    assert market.history('ABC.NS', '2d', '1m').index[0] == full.index[-2 * 375]
+    since = market.history('ABC.NS', None, '1m', start=full.index[-3])
+    assert len(since) == 3
+    assert len(market.history('ABC.NS', '5d', '5m')) == 5 * 75
+
+    wide = market.download(['ABC.NS', 'XYZ.NS'], '5d', '2m')
+    frames = screener_logic.split_batch_frame(wide, ['ABC.NS', 'XYZ.NS'])
+    assert set(frames) == {'ABC.NS', 'XYZ.NS'}
+    assert len(frames['XYZ.NS']) == 5 * 188
+
+
+def test_missing_symbols_have_no_data():
+    market = SyntheticMarket(missing=0.5)
+    symbols = benchmark.symbols_for(40)
+    dead = [s for s in symbols if not market.has_data(s)]
+
+    assert 5 < len(dead) < 35
+    assert market.history(dead[0], '5d', '1m').empty
+    with benchmark.use_market(market):
+        assert screener_logic.get_stock_data(dead[0], '1m') is None
+        assert dead[0] in screener_logic.SYMBOL_HEALTH
+
+
+def test_every_signal_shows_up():
+    market = SyntheticMarket(seed=1, days=5)
+    frames = {s: market.bars(s) for s in benchmark.symbols_for(60)}
+
+    trades = backtest.run_backtest(frames, '1m')
+
+    assert set(trades['flag']) == set(backtest.SIGNAL_TYPES)
+
+
+def test_scan_paths_agree_offline():
+    market = SyntheticMarket(seed=2, today_bars=200)
+    symbols = benchmark.symbols_for(30)
+
+    with benchmark.use_market(market):
+        batch = {r['symbol']: r for r in screener_logic.scan_all_stocks(symbols, ["1m", "2m"])}
+    with benchmark.use_market(market):
+        single = [screener_logic.scan_stock_dual_tf(s, ["1m", "2m"]) for s in symbols]
+
+    assert batch
+    assert batch.keys() == {r['symbol'] for r in single if r['has_any_signal']}
+    for result in single:
+        if result['has_any_signal']:
+            assert batch[result['symbol']]['signal_type'] == result['signal_type']
+
+
+def test_benchmark_results_and_regression_check():
+    current = benchmark.run(['scan_all_stocks', 'scan_stock'], [5], repeat=1, log=lambda line: None)
+
+    timing = current['results']['scan_all_stocks']['5']
+    assert timing['cold_s'] > 0 and timing['warm_s'] > 0
+    assert benchmark.compare(current, current) == []
+
+    baseline = {'results': {'scan_all_stocks': {'5': {'cold_s': timing['cold_s'] / 10 - 0.1,
+                                                      'warm_s': timing['warm_s'] * 10}}}}
+    assert benchmark.compare(current, baseline) == [
+        ('scan_all_stocks', 5, 'cold', baseline['results']['scan_all_stocks']['5']['cold_s'], timing['cold_s'])
+    ]
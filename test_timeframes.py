@@ -0,0 +1,70 @@
+"""
+Offline tests for deriving higher timeframes from 1m bars
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import screener_logic
+from test_batch_fetch import make_bars
+
+
+def provider_bars(df_1m, mins):
+    """Reference N-minute bars built the way the exchange/provider does:
+    fixed buckets counted from the 09:15 open of each session"""
+    local = df_1m.index
+    since_open = (local.hour * 60 + local.minute) - (9 * 60 + 15)
+    bucket_start = local - pd.to_timedelta(since_open % mins, unit='min')
+    grouped = df_1m.groupby(bucket_start)
+    out = pd.DataFrame({
+        'Open': grouped['Open'].first(),
+        'High': grouped['High'].max(),
+        'Low': grouped['Low'].min(),
+        'Close': grouped['Close'].last(),
+        'Volume': grouped['Volume'].sum(),
+    })
+    out.index.name = df_1m.index.name
+    return out
+
+
+@pytest.mark.parametrize("timeframe", ["2m", "3m", "5m", "15m"])
+def test_resample_matches_provider_bars(timeframe):
+    # Full 375-bar sessions with a few missing minutes, like real 1m feeds
+    df_1m = make_bars(7, days=3, bars_per_day=375)
+    df_1m = df_1m.drop(df_1m.index[[3, 100, 101, 400]])
+
+    derived = screener_logic.resample_ohlcv(df_1m, timeframe)
+    expected = provider_bars(df_1m, screener_logic.timeframe_minutes(timeframe))
+
+    pd.testing.assert_frame_equal(derived, expected, check_freq=False, check_dtype=False)
+    assert derived.index[0].strftime('%H:%M') == '09:15'
+
+
+def test_plan_fetches_only_finest_interval():
+    fetch_list, derived = screener_logic.plan_timeframes(["1m", "2m", "5m", "1d"])
+
+    assert fetch_list == ["1m", "1d"]
+    assert derived == {"2m": "1m", "5m": "1m"}
+
+
+def test_non_multiple_timeframes_are_downloaded():
+    fetch_list, derived = screener_logic.plan_timeframes(["2m", "3m"])
+
+    assert fetch_list == ["2m", "3m"]
+    assert derived == {}
+
+
+def test_dual_tf_downloads_base_interval_only(monkeypatch):
+    calls = []
+
+    def fake_get_stock_data(symbol, timeframe="5m", days=5):
+        calls.append(timeframe)
+        return make_bars(8, bars_per_day=60)
+    monkeypatch.setattr(screener_logic, 'get_stock_data', fake_get_stock_data)
+
+    result = screener_logic.scan_stock_dual_tf('A.NS', ["1m", "2m"])
+
+    assert calls == ["1m"]
+    assert result['timeframes']['2m']['error'] is None
+    assert np.isclose(result['timeframes']['2m']['price'], result['timeframes']['1m']['price'])
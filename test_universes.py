@@ -0,0 +1,167 @@
+"""
+Tests for named universes scanned together
+"""
+
+import threading
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+import benchmark
+import config
+import license_manager
+import screener_logic
+import universes
+from scan_coordinator import ScanCoordinator
+from scan_scheduler import ScanScheduler
+from signal_state import SignalStateStore, transition_events
+from synthetic_market import SyntheticMarket
+from test_scan_coordinator import SlowScan
+from test_signal_state import LONG, at, tf_result
+
+CLOCK = lambda: pd.Timestamp("2026-02-13 10:01:05", tz="Asia/Kolkata")
+
+
+def test_universe_lists():
+    assert universes.get_universe('fno') == config.DEFAULT_STOCKS
+    assert len(universes.get_universe('nifty50')) == 50
+    it = universes.get_universe('sector:IT')
+    assert it and 'TCS.NS' in it and set(it) <= set(universes.get_universe('nifty500'))
+    assert 'sector:IT' in universes.universe_names()
+    for name in ('sp500', 'sector:Nope'):
+        with pytest.raises(ValueError):
+            universes.get_universe(name)
+
+    merged = universes.merge_universes({'a': ['X.NS', 'Y.NS'], 'b': ['Y.NS', 'Z.NS']})
+    assert merged == ['X.NS', 'Y.NS', 'Z.NS']
+    views = universes.sector_views(['TCS.NS', 'SBIN.NS', 'INFY.NS', 'UNLISTED.NS'])
+    assert views == {'sector:IT': ['TCS.NS', 'INFY.NS'], 'sector:Banking': ['SBIN.NS']}
+
+
+def test_universes_share_one_scan():
+    scanned = []
+
+    def scan(stock_list, timeframes):
+        scanned.append(stock_list)
+        yield {'type': 'start', 'total': len(stock_list)}
+        for i, symbol in enumerate(stock_list, 1):
+            yield {'type': 'progress', 'scanned': i, 'total': len(stock_list), 'symbol': symbol}
+            yield {'type': 'signal', 'data': {'symbol': symbol, 'has_any_signal': True}}
+        yield {'type': 'done'}
+
+    coordinator = ScanCoordinator(scan_fn=scan, clock=CLOCK)
+    runs = coordinator.get_universe_runs({
+        'ab': ['A.NS', 'B.NS'], 'bc': ['B.NS', 'C.NS'], 'same': ['A.NS', 'B.NS']}, ["1m"])
+    for run in runs.values():
+        assert run.wait(5)
+
+    # One scan of every symbol, fanned out per universe
+    assert scanned == [['A.NS', 'B.NS', 'C.NS']]
+    assert runs['same'] is runs['ab']
+    events = list(runs['bc'].subscribe(timeout=0))
+    assert events[0] == {'type': 'start', 'total': 2} and events[-1] == {'type': 'done'}
+    assert [(e['scanned'], e['symbol']) for e in events if e['type'] == 'progress'] == [(1, 'B.NS'), (2, 'C.NS')]
+    assert [s['symbol'] for s in runs['bc'].signals()] == ['B.NS', 'C.NS']
+    assert [s['symbol'] for s in runs['ab'].signals()] == ['A.NS', 'B.NS']
+
+    # A plain request for a universe's stocks joins its run
+    assert coordinator.get_run(['B.NS', 'C.NS'], ["1m"]) is runs['bc']
+    assert len(scanned) == 1
+
+
+def test_overlapping_scans_share_signal_transitions():
+    store = SignalStateStore()
+    adhoc_saw_b = threading.Event()
+
+    def scan(stock_list, timeframes):
+        yield {'type': 'start', 'total': len(stock_list)}
+        for symbol in stock_list:
+            if symbol == 'B.NS' and 'D.NS' not in stock_list:
+                # The ad-hoc scan gets to B first and applies its trigger
+                adhoc_saw_b.wait(5)
+            bars = pd.DataFrame({'High': [100.5], 'Low': [99.5]}, index=pd.DatetimeIndex([at("10:00")]))
+            store.observe(symbol, '1m', bars)
+            result = {'symbol': symbol, 'timeframes': {'1m': tf_result(symbol, '1m', LONG)}}
+            yield from transition_events(result, store.update(result))
+            if symbol == 'B.NS' and 'D.NS' in stock_list:
+                adhoc_saw_b.set()
+        yield {'type': 'done'}
+
+    coordinator = ScanCoordinator(scan_fn=scan, clock=CLOCK)
+    runs = coordinator.get_universe_runs({'ab': ['A.NS', 'B.NS'], 'bc': ['B.NS', 'C.NS']}, ["1m"])
+    adhoc = coordinator.get_run(['B.NS', 'D.NS'], ["1m"])
+    for run in [*runs.values(), adhoc]:
+        assert run.wait(5)
+
+    # B triggered once, and every run listing it says so
+    assert store.seq == 4
+    triggered = lambda run: [e['data']['symbol'] for e in run.events if e['type'] == 'signal']
+    assert triggered(runs['ab']) == ['A.NS', 'B.NS']
+    assert triggered(runs['bc']) == ['B.NS', 'C.NS']
+    assert triggered(adhoc) == ['B.NS', 'D.NS']
+    assert all(run.events[0]['type'] == 'start' and run.events[-1] == {'type': 'done'}
+               for run in [*runs.values(), adhoc])
+
+
+def test_shared_symbols_are_fetched_once():
+    market = SyntheticMarket(seed=3, days=2)
+    symbols = benchmark.symbols_for(30)
+    fetched = Counter()
+
+    def download(tickers, period, interval, start=None):
+        fetched.update(tickers)
+        return market.download(tickers, period, interval, start)
+
+    with benchmark.use_market(market):
+        screener_logic.BATCH_DOWNLOADER = download
+        coordinator = ScanCoordinator(clock=market.now)
+        runs = coordinator.get_universe_runs(
+            {'first': symbols[:20], 'last': symbols[10:], 'all': symbols}, ["1m", "2m"])
+        for run in runs.values():
+            run.wait(60)
+
+    assert set(fetched) == set(symbols) and set(fetched.values()) == {1}
+    signals = {name: {s['symbol'] for s in run.signals()} for name, run in runs.items()}
+    assert signals['all'] and signals['all'] == signals['first'] | signals['last']
+    assert signals['first'] == {s for s in signals['all'] if s in symbols[:20]}
+
+
+def test_scheduler_keeps_a_snapshot_per_universe():
+    stocks = {'default': ['A.NS', 'B.NS'], 'other': ['B.NS', 'C.NS']}
+    scan = SlowScan(delay=0)
+    scan.release.set()
+    scheduler = ScanScheduler(ScanCoordinator(scan_fn=scan), lambda: stocks, ["1m"], clock=CLOCK)
+
+    scheduler.run_once()
+
+    assert scan.runs == 1
+    assert scheduler.snapshot is scheduler.snapshots['default']
+    assert scheduler.get_snapshot(['B.NS', 'C.NS'], ["1m"]) is scheduler.snapshots['other']
+    assert scheduler.status()['universes'] == ['default', 'other']
+
+
+def test_stream_by_universe_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'SCHEDULER_ENABLED', False)
+    monkeypatch.setattr(license_manager, 'LICENSE_DB', str(tmp_path / 'licenses.db'))
+    import app
+    monkeypatch.setattr(license_manager, 'validate_license', lambda key, device_id=None: (True, "Success"))
+    monkeypatch.setattr(config, 'SCAN_UNIVERSES', ["nifty50"])
+    monkeypatch.setattr(app, 'current_stocks', ['TCS.NS', 'XYZ.NS'])
+    scan = SlowScan(delay=0)
+    scan.release.set()
+    monkeypatch.setattr(app, 'coordinator', ScanCoordinator(scan_fn=scan))
+    client = app.app.test_client()
+
+    # Sector views cover the pre-scanned stocks of the sector
+    scanned = app.scan_universes()
+    assert list(scanned)[:2] == ['default', 'nifty50']
+    assert 'TCS.NS' in scanned['sector:IT'] and 'XYZ.NS' not in scanned['sector:IT']
+    listed = {u['name']: u for u in client.get('/api/universes').get_json()['universes']}
+    assert listed['nifty50'] == {'name': 'nifty50', 'stocks': 50, 'scheduled': True}
+    assert listed['nifty500']['scheduled'] is False
+
+    body = client.get('/api/scan/stream?universe=sector:IT').get_data(as_text=True)
+    assert f'"total": {len(scanned["sector:IT"])}' in body
+    assert client.get('/api/scan/stream?universe=nope').status_code == 404
+    assert client.get('/api/scan?universe=nope').status_code == 404
@@ -0,0 +1,98 @@
+"""
+PACPL Screener - Stock Universes
+Named stock lists that can be scanned and streamed (?universe=<name>):
+
+    fno                         F&O stocks (config.DEFAULT_STOCKS)
+    nifty50, nifty500           Nifty indices
+    largecap, midcap, smallcap  Nifty 500 cap buckets
+    sector:<sector>             Nifty 500 stocks of one sector (sector:IT, ...)
+
+Universes scanned together share one scan of their combined symbols:
+each ticker is fetched and evaluated once, and fan_out() sends its
+events to every universe that lists it.
+"""
+
+import config
+import nifty500_stocks
+
+SECTOR_PREFIX = "sector:"
+
+UNIVERSES = {
+    'fno': lambda: list(config.DEFAULT_STOCKS),
+    'nifty50': nifty500_stocks.get_nifty_50_list,
+    'nifty500': nifty500_stocks.get_nifty_500_list,
+    'largecap': nifty500_stocks.get_large_cap_stocks,
+    'midcap': nifty500_stocks.get_mid_cap_stocks,
+    'smallcap': nifty500_stocks.get_small_cap_stocks,
+}
+
+
+def get_universe(name):
+    """
+    Symbols of a named universe
+    """
+    if name in UNIVERSES:
+        return UNIVERSES[name]()
+    if name.startswith(SECTOR_PREFIX):
+        sector = name[len(SECTOR_PREFIX):]
+        if sector in nifty500_stocks.get_all_sectors():
+            return nifty500_stocks.get_stocks_by_sector(sector)
+    raise ValueError(f"Unknown universe: {name!r}")
+
+
+def universe_names():
+    return list(UNIVERSES) + [SECTOR_PREFIX + sector for sector in nifty500_stocks.get_all_sectors()]
+
+
+def merge_universes(universes):
+    """
+    Symbols of several universes (name -> symbols), each once, in the
+    order they first appear
+    """
+    return list(dict.fromkeys(symbol for symbols in universes.values() for symbol in symbols))
+
+
+def sector_views(symbols):
+    """
+    A universe per sector of `symbols`: sector:<sector> -> its symbols among them
+    """
+    views = {}
+    for symbol in symbols:
+        info = nifty500_stocks.get_stock_info(symbol)
+        if info is not None:
+            views.setdefault(SECTOR_PREFIX + info['sector'], []).append(symbol)
+    return views
+
+
+def event_symbol(event):
+    data = event.get('data')
+    return event.get('symbol') or (data.get('symbol') if isinstance(data, dict) else None)
+
+
+def fan_out(events, universes):
+    """
+    Split the events of one scan of merge_universes(universes) into the
+    scans of each universe: a stock's events go to every universe listing
+    it, start / progress are counted per universe, the rest goes to all
+    Yields: (universe name, event)
+    """
+    members = {name: set(symbols) for name, symbols in universes.items()}
+    scanned = dict.fromkeys(universes, 0)
+    for event in events:
+        kind = event.get('type')
+        symbol = event_symbol(event)
+        if kind == 'start':
+            for name, symbols in universes.items():
+                yield name, {**event, 'total': len(symbols)}
+        elif symbol is None:
+            for name in universes:
+                yield name, event
+        else:
+            for name in universes:
+                if symbol not in members[name]:
+                    continue
+                if kind == 'progress':
+                    scanned[name] += 1
+                    yield name, {**event, 'scanned': scanned[name], 'total': len(universes[name])}
+                else:
+                    yield name, event